@@ -0,0 +1,33 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, status
+
+from backend.api.dependencies import get_current_active_user
+from backend.database.models import User as DBUser
+from backend.database.schemas import ActivityCreate, StudyPing
+from backend.services.activity import activity_buffer
+
+router = APIRouter()
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+def record_activity(
+    activity_in: ActivityCreate,
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """记录一次学习活动（写入历史并累加统计，批量异步落库）"""
+    activity_buffer.record_activity(
+        current_user.id,
+        activity_in.dict(exclude={"words_learned", "articles_read"}),
+        words_learned=activity_in.words_learned,
+        articles_read=activity_in.articles_read,
+    )
+    return {"status": "accepted"}
+
+@router.post("/ping", status_code=status.HTTP_202_ACCEPTED)
+def study_ping(
+    ping: StudyPing,
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """学习时长心跳，只累加学习时间，不产生历史记录"""
+    activity_buffer.add_counters(current_user.id, language=ping.language, study_time=ping.minutes)
+    return {"status": "accepted"}
@@ -0,0 +1,124 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from backend.api.dependencies import get_current_active_superuser
+from backend.core.profiling import loop_lag_monitor, sampling_profiler
+from backend.database.models import User as DBUser
+from backend.services.analytics import Snapshot, analytics_store
+
+router = APIRouter()
+
+
+def _snapshot() -> Snapshot:
+    snapshot = analytics_store.load_latest()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="分析快照尚未生成")
+    return snapshot
+
+
+@router.get("/analytics")
+def get_analytics_snapshot(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """当前分析快照的生成时间和各表行数"""
+    analytics_store.load_latest()
+    return analytics_store.info()
+
+
+@router.post("/analytics/refresh")
+async def refresh_analytics_snapshot(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """立即重建分析快照（其他进程正在重建时直接返回当前快照）"""
+    await run_in_threadpool(analytics_store.refresh, True)
+    return analytics_store.info()
+
+
+@router.get("/analytics/active-learners")
+def get_active_learners(
+    days: int = Query(30, ge=1, le=365),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """按语言和级别统计学习者，以及最近 days 天内活跃的人数"""
+    return _snapshot().active_learners(days, analytics_store.today())
+
+
+@router.get("/analytics/study-time")
+def get_study_time_distribution(
+    language: Optional[str] = None,
+    bins: int = Query(20, ge=2, le=100),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """用户累计学习时间（分钟）的分位数和直方图"""
+    return _snapshot().study_time_distribution(language, bins)
+
+
+@router.get("/analytics/retention")
+def get_retention_cohorts(
+    period: str = Query("month", regex="^(month|week)$"),
+    periods: int = Query(12, ge=1, le=52),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """按注册月（周）分组的留存队列"""
+    return _snapshot().retention_cohorts(period, periods, analytics_store.today())
+
+
+@router.get("/profiler")
+def get_profiler_status(
+    top: int = Query(20, ge=1, le=200),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """采样分析的状态和热点函数（只反映处理本请求的 worker 进程）"""
+    return sampling_profiler.status(top)
+
+
+@router.post("/profiler/start")
+def start_profiler(
+    duration: float = Query(30, gt=0, le=300),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    include_idle: bool = False,
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """在当前 worker 上开始采样分析，到时自动停止"""
+    if not sampling_profiler.start(duration, interval_ms / 1000, include_idle):
+        raise HTTPException(status_code=409, detail="采样分析正在进行")
+    return sampling_profiler.status()
+
+
+@router.post("/profiler/stop")
+def stop_profiler(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """提前停止采样分析"""
+    sampling_profiler.stop()
+    return sampling_profiler.status()
+
+
+@router.get("/profiler/profile")
+def download_profile(
+    format: str = Query("collapsed", regex="^(collapsed|flamegraph)$"),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """下载采样结果：collapsed 为折叠栈文本（flamegraph.pl、speedscope），flamegraph 为 d3-flame-graph 的 JSON"""
+    status = sampling_profiler.status(top=1)
+    if not status["stacks"]:
+        raise HTTPException(status_code=404, detail="没有采样数据")
+    if format == "flamegraph":
+        return sampling_profiler.flamegraph()
+    return PlainTextResponse(
+        sampling_profiler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{status["pid"]}.collapsed.txt"'}
+    )
+
+
+@router.get("/loop-lag")
+def get_loop_lag(
+    events: int = Query(10, ge=0, le=50),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """事件循环延迟直方图和最近的阻塞记录（含阻塞时事件循环线程的调用栈）"""
+    return loop_lag_monitor.stats(events)
+
+
+@router.post("/loop-lag/reset")
+def reset_loop_lag(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """清空延迟统计和阻塞记录"""
+    loop_lag_monitor.reset()
+    return loop_lag_monitor.stats(0)
@@ -1,6 +1,19 @@
 from fastapi import APIRouter
 from backend.api.auth import router as auth_router
 from backend.api.users import router as users_router
+from backend.api.activity import router as activity_router
+from backend.api.statistics import router as statistics_router
+from backend.api.export import router as export_router
+from backend.api.difficulty import router as difficulty_router
+from backend.api.jobs import router as jobs_router
+from backend.api.usage import router as usage_router
+from backend.api.avatars import router as avatars_router
+from backend.api.admin import router as admin_router
+from backend.api.recommendations import router as recommendations_router
+from backend.api.translate import router as translate_router
+from backend.api.quiz import router as quiz_router
+from backend.api.search import router as search_router
+from backend.api.leaderboards import router as leaderboards_router
 
 api_router = APIRouter()
 
@@ -8,4 +21,43 @@ api_router = APIRouter()
 api_router.include_router(auth_router, prefix="/auth", tags=["认证"])
 
 # 包含用户路由
-api_router.include_router(users_router, prefix="/users", tags=["用户"]) 
\ No newline at end of file
+api_router.include_router(users_router, prefix="/users", tags=["用户"])
+
+# 包含学习记录路由
+api_router.include_router(activity_router, prefix="/activity", tags=["学习记录"])
+
+# 包含学习统计路由
+api_router.include_router(statistics_router, prefix="/statistics", tags=["学习统计"])
+
+# 包含数据导出路由
+api_router.include_router(export_router, prefix="/export", tags=["数据导出"])
+
+# 包含难度评估路由
+api_router.include_router(difficulty_router, prefix="/difficulty", tags=["难度评估"])
+
+# 包含后台任务路由
+api_router.include_router(jobs_router, prefix="/jobs", tags=["后台任务"])
+
+# 包含用量统计路由
+api_router.include_router(usage_router, prefix="/usage", tags=["用量统计"])
+
+# 包含头像路由
+api_router.include_router(avatars_router, prefix="/avatars", tags=["头像"])
+
+# 包含管理后台路由
+api_router.include_router(admin_router, prefix="/admin", tags=["管理后台"])
+
+# 包含学习推荐路由
+api_router.include_router(recommendations_router, prefix="/recommendations", tags=["学习推荐"])
+
+# 包含翻译路由
+api_router.include_router(translate_router, prefix="/translate", tags=["翻译"])
+
+# 包含练习题路由
+api_router.include_router(quiz_router, prefix="/quiz", tags=["练习题"])
+
+# 包含全文检索路由
+api_router.include_router(search_router, prefix="/search", tags=["全文检索"])
+
+# 包含排行榜路由
+api_router.include_router(leaderboards_router, prefix="/leaderboards", tags=["排行榜"])
@@ -0,0 +1,49 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.api.dependencies import get_current_active_user, get_db
+from backend.database.models import User as DBUser
+from backend.services.avatars import InvalidAvatar, avatar_store
+
+router = APIRouter()
+
+# 内容寻址的文件永不变化，可以被浏览器和 CDN 永久缓存
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@router.post("/")
+async def upload_avatar(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """上传头像：生成各尺寸缩略图，用户记录中只保存内容哈希"""
+    data = await file.read(avatar_store.max_bytes + 1)
+    try:
+        digest = await run_in_threadpool(avatar_store.save, data)
+    except InvalidAvatar as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def update_user():
+        current_user.avatar = digest
+        db.commit()
+
+    await run_in_threadpool(update_user)
+    return {"avatar": digest, "urls": avatar_store.urls(digest)}
+
+
+@router.get("/{digest}/{size}")
+def get_avatar(digest: str, size: int, request: Request) -> Any:
+    """返回头像缩略图，带 ETag 和长期缓存头"""
+    path = avatar_store.path_for(digest, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="头像不存在")
+    etag = f'"{digest}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    # 缩略图只有几 KB，直接读入内存返回
+    return Response(content=path.read_bytes(), media_type="image/webp", headers=headers)
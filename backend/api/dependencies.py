@@ -1,18 +1,60 @@
+import ipaddress
 from typing import Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from backend.database.database import get_db
+from backend.database.replicas import replica_router
 from backend.database.models import User
 from backend.database.schemas import TokenPayload
 from backend.crud import users
 from backend.core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+# 可选登录：未携带令牌时不报错
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
+
+_TRUSTED_PROXIES = [ipaddress.ip_network(network.strip(), strict=False)
+                    for network in settings.TRUSTED_PROXIES.split(",") if network.strip()]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """
+    客户端 IP：直连方是受信任的反向代理时，取 X-Forwarded-For 中从右往左第一个不受信任的地址，
+    没有该请求头时使用 X-Real-IP；客户端自己伪造的 X-Forwarded-For 在最左侧，不会被采用
+    """
+    peer = request.client.host if request.client else None
+    if peer is None or not _is_trusted_proxy(peer):
+        return peer
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",")
+                 if address.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted_proxy(address):
+            return address
+    if forwarded:
+        return forwarded[0]
+    real_ip = request.headers.get("x-real-ip", "").strip()
+    return real_ip or peer
+
+def get_read_db(request: Request) -> Generator:
+    """只读接口的数据库会话：优先使用备库，刚写入过数据的用户使用主库"""
+    db = replica_router.session(use_primary=getattr(request.state, "use_primary", False))
+    try:
+        yield db
+    finally:
+        db.close()
 
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
@@ -32,6 +74,24 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
     return user
 
+def get_current_user_optional(
+    db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_scheme_optional)
+) -> Optional[User]:
+    """已登录时返回当前用户，未登录或令牌无效时返回 None"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=["HS256"]
+        )
+        token_data = TokenPayload(**payload)
+    except (jwt.JWTError, ValidationError):
+        return None
+    user = users.get(db, id=token_data.sub)
+    if not user or not users.is_active(user):
+        return None
+    return user
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -0,0 +1,18 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+
+from backend.database.schemas import DifficultyRequest
+from backend.services.difficulty import difficulty_estimator, level_index
+
+router = APIRouter()
+
+@router.post("/estimate")
+def estimate_difficulty(request: DifficultyRequest) -> Any:
+    """估计文本的 CEFR 难度级别（本地计算，不调用大模型）"""
+    if request.learnerLevel is not None and level_index(request.learnerLevel) is None:
+        raise HTTPException(status_code=400, detail=f"无效的级别: {request.learnerLevel}")
+    result = difficulty_estimator.assess_reply(request.text, request.language, request.learnerLevel)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"没有 {request.language} 的词汇级别表或文本中没有可识别的词")
+    return result
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from backend.api.dependencies import get_current_active_user, get_current_active_superuser
+from backend.core.config import settings
+from backend.crud import export
+from backend.database.replicas import replica_router
+from backend.database.models import User as DBUser
+
+router = APIRouter()
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _iter_ndjson(user_id: int, sections: List[str], use_primary: bool) -> Iterator[bytes]:
+    # 流式响应可能比请求依赖活得更久，这里使用独立的只读会话（优先备库）
+    db = replica_router.session(use_primary)
+    try:
+        for section in sections:
+            for rows in export.iter_section(db, user_id, section, settings.EXPORT_BATCH_SIZE):
+                yield "".join(
+                    json.dumps({"section": section, "data": row}, ensure_ascii=False, default=_json_default) + "\n"
+                    for row in rows
+                ).encode("utf-8")
+    finally:
+        db.close()
+
+def _iter_csv(user_id: int, section: str, use_primary: bool) -> Iterator[bytes]:
+    db = replica_router.session(use_primary)
+    try:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=export.section_columns(section))
+        writer.writeheader()
+        for rows in export.iter_section(db, user_id, section, settings.EXPORT_BATCH_SIZE):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """边生成边压缩（gzip 格式）"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _export_response(user_id: int, format: str, section: Optional[str], gzip: bool,
+                     use_primary: bool) -> StreamingResponse:
+    if section is not None and section not in export.EXPORT_SECTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的导出分区: {section}，可选: {', '.join(export.EXPORT_SECTIONS)}"
+        )
+
+    if format == "csv":
+        if section is None:
+            raise HTTPException(status_code=400, detail="CSV 导出需要指定 section")
+        chunks = _iter_csv(user_id, section, use_primary)
+        media_type, extension = "text/csv; charset=utf-8", "csv"
+    else:
+        sections = [section] if section else list(export.EXPORT_SECTIONS)
+        chunks = _iter_ndjson(user_id, sections, use_primary)
+        media_type, extension = "application/x-ndjson", "ndjson"
+
+    filename = f"language-tutor-{user_id}-{section or 'all'}-{date.today().isoformat()}.{extension}"
+    if gzip:
+        chunks = _gzip(chunks)
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/")
+def export_my_data(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    section: Optional[str] = None,
+    gzip: bool = False,
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """流式导出当前用户的学习数据（NDJSON 或 CSV，可选 gzip）"""
+    return _export_response(current_user.id, format, section, gzip, getattr(request.state, "use_primary", False))
+
+@router.get("/users/{user_id}")
+def export_user_data(
+    user_id: int,
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    section: Optional[str] = None,
+    gzip: bool = False,
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """管理员导出指定用户的学习数据"""
+    return _export_response(user_id, format, section, gzip, getattr(request.state, "use_primary", False))
@@ -0,0 +1,93 @@
+import time
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.api.dependencies import get_current_active_user, get_db
+from backend.crud import jobs as crud_jobs
+from backend.database.models import User as DBUser
+from backend.database.schemas import JobCreate, JobResponse
+from backend.services.jobs import InvalidPayload, get_handler, job_pool, submit
+from backend.services.usage import usage_ledger
+
+router = APIRouter()
+
+
+def _get_own_job(db: Session, job_id: int, user: DBUser):
+    job = crud_jobs.get(db, job_id)
+    if job is None or (job.user_id != user.id and not user.is_superuser):
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_job(
+    job_in: JobCreate,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """提交后台任务，立即返回任务状态，之后通过 GET /jobs/{id} 查询进度和结果"""
+    handler = get_handler(job_in.kind)
+    if handler is None or (not handler.public and not current_user.is_superuser):
+        raise HTTPException(status_code=400, detail=f"不支持的任务类型: {job_in.kind}")
+    quota_error = usage_ledger.check_quota(current_user.id)
+    if quota_error:
+        raise HTTPException(status_code=429, detail=quota_error)
+    priority = job_in.priority if current_user.is_superuser else min(job_in.priority, 0)
+    try:
+        return submit(db, job_in.kind, job_in.payload, user_id=current_user.id, priority=priority)
+    except InvalidPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=List[JobResponse])
+def list_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """当前用户的任务列表，按提交时间倒序"""
+    return crud_jobs.list_for_user(db, current_user.id, status=job_status, limit=limit)
+
+
+@router.get("/stats")
+def job_stats(current_user: DBUser = Depends(get_current_active_user)) -> Any:
+    """本进程 worker 的执行统计"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="权限不足")
+    return job_pool.stats()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=60, description="长轮询：最多等待任务结束的秒数"),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """查询任务状态；wait > 0 时在任务结束或超时后才返回"""
+    deadline = time.monotonic() + wait
+    while True:
+        job = await run_in_threadpool(_get_own_job, db, job_id, current_user)
+        remaining = deadline - time.monotonic()
+        if job.status in crud_jobs.FINISHED_STATUSES or remaining <= 0:
+            return job
+        # 本进程执行的任务结束时立即唤醒，其他进程执行的任务每秒重新查询一次
+        await job_pool.wait_for(job_id, min(remaining, 1.0))
+        await run_in_threadpool(db.expire_all)
+
+
+@router.delete("/{job_id}", response_model=JobResponse)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """取消任务：排队中的立即取消，执行中的在下次汇报进度时停止"""
+    job = _get_own_job(db, job_id, current_user)
+    if job.status in crud_jobs.FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail="任务已结束")
+    return crud_jobs.cancel(db, job)
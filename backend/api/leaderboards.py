@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.api.dependencies import get_current_active_superuser, get_current_active_user, get_read_db
+from backend.crud import leaderboards as crud_leaderboards
+from backend.database.models import User as DBUser
+from backend.services.avatars import avatar_url
+from backend.services.leaderboards import leaderboards
+
+router = APIRouter()
+
+METRIC_PATTERN = "^(study_time|words_learned)$"
+PERIOD_PATTERN = "^(all|week)$"
+
+
+def _check_ready() -> None:
+    if not leaderboards.ready:
+        raise HTTPException(status_code=503, detail="排行榜尚未生成")
+
+
+def _entries(db: Session, rows: List[Tuple[int, int, int, int]], current_user_id: int) -> List[Dict[str, Any]]:
+    profiles = crud_leaderboards.get_public_profiles(db, [user_id for _, user_id, _, _ in rows])
+    entries = []
+    for position, user_id, rank, score in rows:
+        profile = profiles.get(user_id)
+        entries.append({
+            "position": position,
+            "rank": rank,
+            "score": score,
+            "username": profile.username if profile else None,
+            "avatar": avatar_url(profile.avatar, 64) if profile else None,
+            "isMe": user_id == current_user_id,
+        })
+    return entries
+
+
+@router.get("/")
+def get_leaderboard(
+    metric: str = Query("study_time", regex=METRIC_PATTERN),
+    period: str = Query("all", regex=PERIOD_PATTERN),
+    language: Optional[str] = None,
+    offset: int = Query(0, ge=0, le=10000),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """排行榜的一页：metric 为学习时长或单词数，period 为累计或本周，可按语言筛选；同分并列"""
+    _check_ready()
+    rows, total = leaderboards.top(metric, period, language, offset, limit)
+    return {
+        "metric": metric,
+        "period": period,
+        "language": language,
+        "total": total,
+        "entries": _entries(db, rows, current_user.id),
+    }
+
+
+@router.get("/me")
+def get_my_rank(
+    metric: str = Query("study_time", regex=METRIC_PATTERN),
+    period: str = Query("all", regex=PERIOD_PATTERN),
+    language: Optional[str] = None,
+    radius: int = Query(5, ge=0, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """当前用户的名次以及前后各 radius 名；还没有上榜时 rank 为空"""
+    _check_ready()
+    mine, rows, total = leaderboards.around(metric, period, language, current_user.id, radius)
+    return {
+        "metric": metric,
+        "period": period,
+        "language": language,
+        "total": total,
+        "position": mine[0] if mine else None,
+        "rank": mine[1] if mine else None,
+        "score": mine[2] if mine else 0,
+        "neighbors": _entries(db, rows, current_user.id),
+    }
+
+
+@router.get("/stats")
+def get_leaderboard_stats(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """各榜单的人数、最近一次重建的时间和用时"""
+    return leaderboards.stats()
+
+
+@router.post("/rebuild")
+async def rebuild_leaderboards(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """立即从数据库重建当前进程的榜单"""
+    await run_in_threadpool(leaderboards.rebuild)
+    return leaderboards.stats()
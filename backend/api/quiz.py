@@ -0,0 +1,103 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_current_active_superuser, get_current_active_user, get_db
+from backend.crud import quiz as crud_quiz
+from backend.crud import users
+from backend.database.models import User as DBUser
+from backend.database.schemas import QuizSubmission
+from backend.services.difficulty import CEFR_LEVELS
+from backend.services.quiz import LANGUAGES, TOPICS, all_pool_keys, quiz_pools
+
+router = APIRouter()
+
+
+def _normalize_answer(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+
+@router.post("/")
+def start_quiz(
+    language: str,
+    topic: str,
+    level: Optional[str] = Query(None, regex="^[ABCabc][12]$"),
+    count: int = Query(10, ge=1, le=30),
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """
+    从预生成的题库中抽取一组用户没做过的练习题（默认使用用户在该语言的级别）；
+    会记录抽到的题目并可能提交补充题库的任务，因此使用 POST
+    """
+    language = language.lower()
+    if language not in LANGUAGES or topic not in TOPICS:
+        raise HTTPException(status_code=400, detail=f"不支持的语言或主题，可选语言: {LANGUAGES}，主题: {TOPICS}")
+    level = (level or users.get_language_level(db, user_id=current_user.id, language=language) or "A1").upper()
+    if level not in CEFR_LEVELS:
+        level = "A1"
+
+    result = quiz_pools.draw(db, current_user.id, (language, level, topic), count)
+    if not result["exercises"]:
+        raise HTTPException(status_code=503, detail="题库正在生成，请稍后再试")
+    return {"language": language, "level": level, "topic": topic, **result}
+
+
+@router.post("/answers")
+def check_answers(
+    submission: QuizSubmission,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """批改作答；只批改抽给当前用户的题目，其他题号按不存在处理"""
+    exercise_ids = [item.exerciseId for item in submission.answers]
+    seen = crud_quiz.seen_ids(db, current_user.id, exercise_ids)
+    answers = crud_quiz.get_answers(db, [exercise_id for exercise_id in exercise_ids if exercise_id in seen])
+    results = []
+    for item in submission.answers:
+        expected = answers.get(item.exerciseId)
+        if expected is None:
+            raise HTTPException(status_code=404, detail=f"题目不存在: {item.exerciseId}")
+        results.append({
+            "exerciseId": item.exerciseId,
+            "correct": _normalize_answer(item.answer) == _normalize_answer(expected["answer"]),
+            "answer": expected["answer"],
+            "explanation": expected["explanation"],
+        })
+    return {"correct": sum(result["correct"] for result in results), "total": len(results), "results": results}
+
+
+@router.get("/pools")
+def get_quiz_pools(
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """各题库的题目数和缓存命中情况"""
+    sizes = {(row.language, row.level, row.topic): row.size for row in crud_quiz.pool_sizes(db)}
+    return {
+        "target": quiz_pools.target,
+        "lowWater": quiz_pools.low_water,
+        "pools": [{"language": language, "level": level, "topic": topic, "size": sizes.get((language, level, topic), 0)}
+                  for language, level, topic in all_pool_keys()],
+        "cache": quiz_pools.stats(),
+    }
+
+
+@router.post("/pools/refill")
+def refill_quiz_pools(
+    language: Optional[str] = None,
+    level: Optional[str] = None,
+    topic: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """为题数不足目标的题库提交补充任务（可按语言、级别、主题筛选）"""
+    sizes = {(row.language, row.level, row.topic): row.size for row in crud_quiz.pool_sizes(db)}
+    submitted = []
+    for key in all_pool_keys():
+        if (language and key[0] != language) or (level and key[1] != level.upper()) or (topic and key[2] != topic):
+            continue
+        if sizes.get(key, 0) < quiz_pools.target and quiz_pools.request_refill(db, key, force=True):
+            submitted.append("/".join(key))
+    return {"submitted": submitted}
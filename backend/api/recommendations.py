@@ -0,0 +1,59 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_current_active_superuser, get_current_active_user, get_read_db
+from backend.crud import users
+from backend.database.models import User as DBUser
+from backend.services.difficulty import CEFR_LEVELS, UNKNOWN_LEVEL
+from backend.services.recommendations import recommendation_engine
+
+router = APIRouter()
+
+
+def _recommend(kind: str, db: Session, user: DBUser, language: str, level: Optional[str], limit: int) -> list:
+    if not recommendation_engine.ready:
+        raise HTTPException(status_code=503, detail="推荐索引尚未生成")
+    level = level or users.get_language_level(db, user_id=user.id, language=language)
+    return recommendation_engine.recommend(kind, user.id, language, level, limit)
+
+
+def _level_name(code: int) -> Optional[str]:
+    return CEFR_LEVELS[code - 1] if 1 <= code < UNKNOWN_LEVEL else None
+
+
+@router.get("/words")
+def recommend_words(
+    language: str,
+    level: Optional[str] = Query(None, regex="^[ABCabc][12]$"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """推荐下一批要学的单词（默认使用用户在该语言的级别）"""
+    return [
+        {"word": word, "level": _level_name(code), "score": round(score, 4)}
+        for word, code, score in _recommend("words", db, current_user, language, level, limit)
+    ]
+
+
+@router.get("/lessons")
+def recommend_lessons(
+    language: str,
+    level: Optional[str] = Query(None, regex="^[ABCabc][12]$"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """推荐下一步的学习内容（其他学习者学过的相似课程）"""
+    return [
+        {"activityType": activity_type, "title": title, "level": _level_name(code), "score": round(score, 4)}
+        for (_, activity_type, title), code, score in _recommend("lessons", db, current_user, language, level, limit)
+    ]
+
+
+@router.get("/stats")
+def get_recommendation_stats(current_user: DBUser = Depends(get_current_active_superuser)) -> Any:
+    """推荐索引规模、刷新次数和请求延迟"""
+    return recommendation_engine.stats()
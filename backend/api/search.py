@@ -0,0 +1,46 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_current_active_user, get_read_db
+from backend.crud import search as crud_search
+from backend.database.models import User as DBUser
+from backend.services.search import search_documents
+
+router = APIRouter()
+
+
+@router.get("/")
+def search_my_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    source: Optional[str] = Query(None, regex="^(history|chat)$"),
+    language: Optional[str] = None,
+    sort: str = Query("relevance", regex="^(relevance|recent)$"),
+    page: int = Query(1, ge=1, le=100),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """全文检索当前用户的学习历史和辅导对话，按相关度或时间排序并附带摘要"""
+    return search_documents(db, current_user.id, q, source, language and language.lower(), sort, page, page_size)
+
+
+@router.get("/chats/{transcript_id}")
+def get_chat_transcript(
+    transcript_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """查看一条对话记录的全文"""
+    transcript = crud_search.get_chat(db, current_user.id, transcript_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="对话记录不存在")
+    return {
+        "id": transcript.id,
+        "language": transcript.language,
+        "mode": transcript.mode,
+        "message": transcript.message,
+        "response": transcript.response,
+        "createdAt": transcript.created_at,
+    }
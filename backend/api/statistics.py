@@ -0,0 +1,66 @@
+from datetime import date, datetime, timedelta
+from typing import Any, List, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_read_db, get_current_active_user
+from backend.core.config import settings
+from backend.core.responses import ORJSONResponse
+from backend.crud import statistics
+from backend.database.models import User as DBUser
+from backend.database.schemas import DailyActivityResponse, PeriodActivityResponse
+
+router = APIRouter()
+
+def _today() -> date:
+    return datetime.now(ZoneInfo(settings.STATS_TIMEZONE)).date()
+
+# 以下接口的返回值按响应模型的字段构建，直接返回 ORJSONResponse 以跳过 response_model 的二次校验
+def _to_response(row: Any) -> dict:
+    return {
+        "studyTime": row.study_time or 0,
+        "wordsLearned": row.words_learned or 0,
+        "articlesRead": row.articles_read or 0,
+        "activities": row.activities or 0,
+    }
+
+@router.get("/heatmap", response_model=List[DailyActivityResponse])
+def get_study_heatmap(
+    days: int = Query(365, ge=1, le=366 * 3),
+    language: Optional[str] = None,
+    current_user: DBUser = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+) -> Any:
+    """获取最近若干天每天的学习数据（只返回有记录的日期）"""
+    start = _today() - timedelta(days=days - 1)
+    rows = statistics.get_daily(db, current_user.id, start, language)
+    return ORJSONResponse([{"date": row.day, **_to_response(row)} for row in rows])
+
+@router.get("/weekly", response_model=List[PeriodActivityResponse])
+def get_weekly_statistics(
+    weeks: int = Query(12, ge=1, le=156),
+    language: Optional[str] = None,
+    current_user: DBUser = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+) -> Any:
+    """按周汇总的学习数据（周一为一周开始）"""
+    today = _today()
+    start = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+    rows = statistics.get_by_period(db, current_user.id, "week", start, language)
+    return ORJSONResponse([{"periodStart": row.period_start, **_to_response(row)} for row in rows])
+
+@router.get("/monthly", response_model=List[PeriodActivityResponse])
+def get_monthly_statistics(
+    months: int = Query(12, ge=1, le=60),
+    language: Optional[str] = None,
+    current_user: DBUser = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+) -> Any:
+    """按月汇总的学习数据"""
+    today = _today()
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    start = date(month_index // 12, month_index % 12 + 1, 1)
+    rows = statistics.get_by_period(db, current_user.id, "month", start, language)
+    return ORJSONResponse([{"periodStart": row.period_start, **_to_response(row)} for row in rows])
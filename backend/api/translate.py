@@ -0,0 +1,40 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_current_active_user, get_db
+from backend.core.config import settings
+from backend.database.models import User as DBUser
+from backend.database.schemas import TranslateRequest
+from backend.services.tokens import token_estimator
+from backend.services.translation import QuotaExceeded, TranslationError, translator
+
+router = APIRouter()
+
+
+@router.post("/")
+async def translate_text(
+    request: TranslateRequest,
+    db: Session = Depends(get_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """
+    翻译整段文本：按句查找翻译记忆，未命中的句子分组并发翻译，
+    结果按原文顺序拼接
+    """
+    input_tokens = token_estimator.count(request.text)
+    if input_tokens > settings.TRANSLATION_MAX_INPUT_TOKENS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"文本过长（约 {input_tokens} 个 token，上限 {settings.TRANSLATION_MAX_INPUT_TOKENS}）"
+        )
+    try:
+        return await translator.translate(
+            db, request.text, request.source_language, request.target_language,
+            user_id=current_user.id
+        )
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except TranslationError as e:
+        raise HTTPException(status_code=502, detail=f"翻译失败: {str(e)}")
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.api.dependencies import get_current_active_user, get_read_db
+from backend.core.config import settings
+from backend.crud import usage as crud_usage
+from backend.database.models import User as DBUser
+from backend.services.usage import usage_ledger
+
+router = APIRouter()
+
+
+def _summary(user_id: int) -> dict:
+    daily, monthly = usage_ledger.usage_for(user_id)
+    return {
+        "daily": {"used": daily, "limit": usage_ledger.daily_quota or None},
+        "monthly": {"used": monthly, "limit": usage_ledger.monthly_quota or None},
+    }
+
+
+@router.get("/")
+def get_my_usage(current_user: DBUser = Depends(get_current_active_user)) -> Any:
+    """当前用户今日和本月的 token 用量及配额"""
+    return _summary(current_user.id)
+
+
+@router.get("/daily")
+def get_my_daily_usage(
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_read_db),
+    current_user: DBUser = Depends(get_current_active_user)
+) -> Any:
+    """当前用户最近若干天每天的用量明细，日期按 STATS_TIMEZONE 划分"""
+    today = datetime.now(ZoneInfo(settings.STATS_TIMEZONE)).date()
+    rows = crud_usage.get_daily_usage(db, current_user.id, today - timedelta(days=days - 1), settings.STATS_TIMEZONE)
+    return [
+        {
+            "date": row.day,
+            "requests": row.requests,
+            "promptTokens": row.prompt_tokens,
+            "completionTokens": row.completion_tokens,
+            "cachedTokens": row.cached_tokens,
+        }
+        for row in rows
+    ]
+
+
+@router.get("/users/{user_id}")
+def get_user_usage(user_id: int, current_user: DBUser = Depends(get_current_active_user)) -> Any:
+    """查看指定用户的用量（仅管理员）"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="权限不足")
+    return _summary(user_id)
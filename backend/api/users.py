@@ -1,7 +1,9 @@
-from typing import Any, List
+import json
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
 
@@ -10,12 +12,20 @@ from backend.database.schemas import (
     UserLanguage, UserStatistics, UserLearningHistory,
     UserProfileResponse, UserProfileUpdate, UserHistoryResponse
 )
+from backend.core.config import settings
+from backend.core.responses import ORJSONResponse
 from backend.crud import users
-from backend.api.dependencies import get_db, get_current_active_user
+from backend.crud import statistics as crud_statistics
+from backend.api.dependencies import get_db, get_read_db, get_current_active_user, get_current_active_superuser
 from backend.database.models import User as DBUser, UserLanguage as DBUserLanguage, UserStatistics as DBUserStatistics, UserLanguage as DBUserLanguage
+from backend.services.activity import activity_buffer
+from backend.services.avatars import InvalidAvatar, avatar_store, avatar_url
+from backend.services.provisioning import InvalidAccounts, parse_accounts, provision
 
 router = APIRouter()
 
+HISTORY_RESPONSE_FIELDS = tuple(UserHistoryResponse.__fields__)
+
 @router.post("/", response_model=User)
 def create_user(
     *,
@@ -45,18 +55,18 @@ def create_user(
         # 创建用户
         user = users.create(db, obj_in=user_in)
         
-        # 确保返回的是一个符合UserInDB模型的字典
+        # 按 User 模型的字段构建并直接返回响应，跳过 response_model 的二次校验
         user_data = {
-            "id": user.id,
-            "username": user.username,
             "email": user.email,
+            "username": user.username,
             "is_active": user.is_active,
-            "is_superuser": user.is_superuser,
+            "id": user.id,
             "created_at": user.created_at,
-            "updated_at": user.updated_at
+            "updated_at": user.updated_at,
+            "avatar": None
         }
         
-        return user_data
+        return ORJSONResponse(user_data)
     except Exception as e:
         # 记录错误并返回友好的错误信息
         print(f"创建用户时出错: {str(e)}")
@@ -65,9 +75,32 @@ def create_user(
             detail="创建用户时发生错误，请稍后再试"
         )
 
+@router.post("/bulk")
+async def bulk_create_users(
+    request: Request,
+    language: Optional[str] = None,
+    level: str = Query("A1", regex="^[ABCabc][12]$"),
+    current_user: DBUser = Depends(get_current_active_superuser)
+) -> Any:
+    """
+    批量开通账号（CSV 或 JSON），逐行以 NDJSON 流式返回结果：
+    created / conflict（用户名或邮箱已存在）/ invalid / duplicate（与前面的行重复），最后一行为汇总
+    """
+    try:
+        accounts = parse_accounts(await request.body(), request.headers.get("content-type", ""))
+    except InvalidAccounts as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not accounts:
+        raise HTTPException(status_code=400, detail="没有账号")
+    if len(accounts) > settings.PROVISION_MAX_ACCOUNTS:
+        raise HTTPException(status_code=413, detail=f"单次最多开通 {settings.PROVISION_MAX_ACCOUNTS} 个账号")
+
+    lines = (json.dumps(result, ensure_ascii=False) + "\n" for result in provision(accounts, language, level))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 @router.get("/profile", response_model=UserProfileResponse)
 def get_user_profile(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: DBUser = Depends(get_current_active_user)
 ) -> Any:
     """获取用户资料"""
@@ -78,17 +111,20 @@ def get_user_profile(
         # 获取用户语言学习情况
         languages = db.query(DBUserLanguage).filter(DBUserLanguage.user_id == current_user.id).all()
         
-        # 构建响应数据
-        return {
+        # 加上尚未写入数据库的计数增量
+        pending = activity_buffer.pending_for(current_user.id)
+        
+        # 构建响应数据（字段与 UserProfileResponse 一致，直接返回以跳过二次校验）
+        return ORJSONResponse({
             "username": current_user.username,
             "email": current_user.email,
-            "avatar": current_user.avatar,
+            "avatar": avatar_url(current_user.avatar),
             "learningLanguages": [lang.language for lang in languages],
             "level": {lang.language: lang.level for lang in languages},
-            "studyTime": stats.study_time if stats else 0,
-            "wordsLearned": stats.words_learned if stats else 0,
-            "articlesRead": stats.articles_read if stats else 0
-        }
+            "studyTime": (stats.study_time if stats else 0) + pending["study_time"],
+            "wordsLearned": (stats.words_learned if stats else 0) + pending["words_learned"],
+            "articlesRead": (stats.articles_read if stats else 0) + pending["articles_read"]
+        })
     except Exception as e:
         print(f"获取用户资料失败: {str(e)}")
         raise HTTPException(
@@ -97,13 +133,10 @@ def get_user_profile(
         )
 
 @router.get("/history", response_model=List[UserHistoryResponse])
-def get_user_history(current_user: DBUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def get_user_history(current_user: DBUser = Depends(get_current_active_user), db: Session = Depends(get_read_db)):
     """获取用户学习历史"""
-    history = db.query(UserLearningHistory).filter(
-        UserLearningHistory.user_id == current_user.id
-    ).order_by(UserLearningHistory.created_at.desc()).limit(10).all()
-    
-    return history
+    rows = crud_statistics.get_recent_history(db, current_user.id, limit=10, window_days=settings.HISTORY_RECENT_DAYS)
+    return ORJSONResponse([{field: getattr(row, field) for field in HISTORY_RESPONSE_FIELDS} for row in rows])
 
 @router.put("/profile", response_model=UserProfileResponse)
 def update_user_profile(
@@ -112,8 +145,17 @@ def update_user_profile(
     db: Session = Depends(get_db)
 ):
     """更新用户资料"""
+    update_data = profile_update.dict(exclude_unset=True)
+    
+    # 头像只保存内容哈希：回传的头像地址或未改动的头像保持不变，旧版前端提交的 data URL 转存到头像存储
+    if update_data.get("avatar"):
+        try:
+            update_data["avatar"] = avatar_store.resolve(update_data["avatar"], current_user.avatar)
+        except InvalidAvatar as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     # 更新基本信息
-    for field, value in profile_update.dict(exclude_unset=True).items():
+    for field, value in update_data.items():
         if field not in ["learningLanguages", "level"]:
             setattr(current_user, field, value)
     
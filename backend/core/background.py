@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """在线程池中周期性执行同步函数（如批量写库），停止时再执行最后一次"""
+
+    def __init__(self, name: str, func: Callable[[], object], interval: float, run_on_stop: bool = True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_on_stop = run_on_stop
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台任务"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+        logger.info(f"后台任务已启动: {self.name} (间隔 {self.interval}s)")
+
+    def trigger(self) -> None:
+        """提前唤醒一次执行，可在任意线程中调用"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def run_once(self) -> object:
+        """同步执行一次，保证同一时间只有一个执行"""
+        with self._lock:
+            return self.func()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._loop.run_in_executor(None, self.run_once)
+            except Exception as e:
+                logger.error(f"后台任务执行失败: {self.name}: {str(e)}", exc_info=True)
+
+    async def stop(self) -> None:
+        """停止后台任务；run_on_stop 为 True 时最后执行一次"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.run_on_stop:
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self.run_once)
+            except Exception as e:
+                logger.error(f"后台任务最后一次执行失败: {self.name}: {str(e)}", exc_info=True)
+        logger.info(f"后台任务已停止: {self.name}")
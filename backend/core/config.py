@@ -21,6 +21,13 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "language_tutor")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")  # Docker 内部端口
 DATABASE_URI = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# 只读备库配置
+DATABASE_REPLICA_URIS = os.getenv("DATABASE_REPLICA_URIS", "")  # 逗号分隔的备库连接串，为空时只读请求也走主库
+REPLICA_SELECTION = os.getenv("REPLICA_SELECTION", "round_robin")  # round_robin 或 least_connections
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))  # 复制延迟超过该值的备库不使用
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))  # 健康检查间隔（秒）
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # 用户写入后读请求走主库的时长
+
 # 安全配置
 SECRET_KEY = os.getenv("SECRET_KEY", "")
 ACCESS_TOKEN_EXPIRE_MINUTES = 10080  # 7天
@@ -29,6 +36,145 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 10080  # 7天
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
 DEEPSEEK_API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
 
+# 大模型上游配置
+LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-chat")  # 业务代码请求的模型名，上游可在 models 中映射为自己的模型名
+# JSON 数组，每项 {"name", "base_url"（含 /v1）, "api_key" 或 "api_key_env", "models", "max_concurrency", "rpm"}；
+# 为空时只使用上面的 DeepSeek 配置
+LLM_UPSTREAMS = os.getenv("LLM_UPSTREAMS", "")
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "16"))  # 每个上游的默认并发上限
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))  # 每次调用的最多尝试次数，优先换上游，都试过后重试同一上游
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # 重试已失败过的上游前的等待（秒），每次翻倍
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))  # 所有上游都满载或限流时的最长等待（秒）
+LLM_LATENCY_ALPHA = float(os.getenv("LLM_LATENCY_ALPHA", "0.2"))  # 延迟和错误率指数滑动平均的系数
+LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))  # 连续失败达到该次数后暂停使用
+LLM_FAILURE_COOLDOWN = float(os.getenv("LLM_FAILURE_COOLDOWN", "15"))  # 暂停时长（秒），连续失败时倍增
+LLM_EXPLORE_RATIO = float(os.getenv("LLM_EXPLORE_RATIO", "0.05"))  # 随机选择上游以更新延迟估计的比例
+
+# 本地词典配置
+DICTIONARY_ENABLED = os.getenv("DICTIONARY_ENABLED", "true").lower() == "true"
+DICTIONARY_DIR = os.getenv("DICTIONARY_DIR", str(Path(__file__).resolve().parent.parent / "data" / "dictionaries"))
+DICTIONARY_GLOSS_LANGUAGE = os.getenv("DICTIONARY_GLOSS_LANGUAGE", "zh")  # 释义使用的语言
+
+# 难度评估配置
+DIFFICULTY_DIR = os.getenv("DIFFICULTY_DIR", str(Path(__file__).resolve().parent.parent / "data" / "wordlists"))
+DIFFICULTY_COVERAGE = float(os.getenv("DIFFICULTY_COVERAGE", "0.95"))  # 判定级别所需的词汇覆盖率
+DIFFICULTY_TOLERANCE = int(os.getenv("DIFFICULTY_TOLERANCE", "1"))  # 回复可以高出学习者水平的级数
+
+# 近似重复问题缓存配置
+SIMILARITY_CACHE_ENABLED = os.getenv("SIMILARITY_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_CACHE_THRESHOLD = float(os.getenv("SIMILARITY_CACHE_THRESHOLD", "0.85"))  # 相似度阈值
+SIMILARITY_CACHE_SIZE = int(os.getenv("SIMILARITY_CACHE_SIZE", "10000"))  # 最多缓存的回答数
+SIMILARITY_CACHE_TTL = float(os.getenv("SIMILARITY_CACHE_TTL", "86400"))  # 过期时间（秒）
+SIMILARITY_CACHE_AUDIT_RATE = float(os.getenv("SIMILARITY_CACHE_AUDIT_RATE", "0.05"))  # 命中时抽检精确相似度的比例
+SIMILARITY_CACHE_MAX_PROMPT = int(os.getenv("SIMILARITY_CACHE_MAX_PROMPT", "500"))  # 超过该长度的提问不缓存
+
+# 头像存储配置
+AVATAR_DIR = os.getenv("AVATAR_DIR", str(Path(__file__).resolve().parent.parent / "data" / "avatars"))
+AVATAR_SIZES = os.getenv("AVATAR_SIZES", "64,128,256")  # 预先生成的缩略图边长（像素）
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))  # 上传图片大小上限
+
+# 对话 token 预算配置
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", str(Path(__file__).resolve().parent.parent / "data" / "tokenizer" / "tokenizer.json"))
+CHAT_MAX_INPUT_TOKENS = int(os.getenv("CHAT_MAX_INPUT_TOKENS", "4000"))  # 单条用户输入的 token 上限
+CHAT_INPUT_OVERFLOW = os.getenv("CHAT_INPUT_OVERFLOW", "reject")  # 超出上限时 reject（返回 413）或 truncate
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "64000"))  # 模型上下文长度
+CHAT_MAX_OUTPUT_TOKENS = int(os.getenv("CHAT_MAX_OUTPUT_TOKENS", "2000"))  # max_tokens 的上限
+
+# token 用量与配额配置
+USAGE_DAILY_TOKEN_QUOTA = int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "200000"))  # 每个用户每天的 token 上限，0 表示不限制
+USAGE_MONTHLY_TOKEN_QUOTA = int(os.getenv("USAGE_MONTHLY_TOKEN_QUOTA", "3000000"))  # 每个用户每月的 token 上限，0 表示不限制
+USAGE_ANONYMOUS_DAILY_TOKEN_QUOTA = int(os.getenv("USAGE_ANONYMOUS_DAILY_TOKEN_QUOTA", "20000"))  # 未登录时每个 IP 每天的 token 上限，0 表示必须登录
+# 受信任的反向代理网段（逗号分隔）：直连方在其中时按 X-Forwarded-For / X-Real-IP 确定客户端 IP，
+# 否则经 nginx 转发的所有匿名用户会共用 nginx 容器地址的配额；默认包含回环地址和 Docker 使用的私有网段
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16")
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "10"))  # 用量流水写入间隔（秒）
+USAGE_RECONCILE_INTERVAL = float(os.getenv("USAGE_RECONCILE_INTERVAL", "300"))  # 用数据库校准累计用量的间隔（秒）
+
+# 后台任务队列配置
+JOB_WORKERS_ENABLED = os.getenv("JOB_WORKERS_ENABLED", "true").lower() == "true"  # 是否在本进程中执行后台任务
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))  # 每个进程同时执行的任务数
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # 轮询新任务的间隔（秒）
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # 任务租约时长，worker 退出后超过该时间重新排队
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))  # 重试退避的基础延迟（秒）
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # 默认最大执行次数
+JOB_REAP_INTERVAL = float(os.getenv("JOB_REAP_INTERVAL", "30"))  # 检查过期租约的间隔（秒）
+
+# 学习历史分区配置
+HISTORY_PARTITION_PREMAKE_MONTHS = int(os.getenv("HISTORY_PARTITION_PREMAKE_MONTHS", "3"))  # 提前创建的未来月份分区数
+HISTORY_PARTITION_CHECK_INTERVAL = float(os.getenv("HISTORY_PARTITION_CHECK_INTERVAL", "21600"))  # 分区维护间隔（秒）
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "0"))  # 在线保留的月数，更早的分区归档后删除，0 表示不归档
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", str(Path(__file__).resolve().parent.parent / "data" / "history_archive"))
+HISTORY_RECENT_DAYS = int(os.getenv("HISTORY_RECENT_DAYS", "90"))  # 最近学习历史先在该时间窗口内查询
+
+# 管理后台分析快照配置
+ANALYTICS_SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", str(Path(__file__).resolve().parent.parent / "data" / "analytics"))
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "3600"))  # 快照重建间隔（秒），0 表示不自动重建
+ANALYTICS_KEEP_SNAPSHOTS = int(os.getenv("ANALYTICS_KEEP_SNAPSHOTS", "2"))  # 磁盘上保留的快照数
+
+# 学习推荐配置
+RECOMMEND_ENABLED = os.getenv("RECOMMEND_ENABLED", "true").lower() == "true"  # 是否在本进程中构建推荐索引
+RECOMMEND_REBUILD_INTERVAL = float(os.getenv("RECOMMEND_REBUILD_INTERVAL", "21600"))  # 全量重建相似度矩阵的间隔（秒）
+RECOMMEND_REFRESH_INTERVAL = float(os.getenv("RECOMMEND_REFRESH_INTERVAL", "60"))  # 增量刷新用户向量的间隔（秒）
+RECOMMEND_NEIGHBORS = int(os.getenv("RECOMMEND_NEIGHBORS", "50"))  # 每个条目保留的相似条目数
+RECOMMEND_HISTORY_DAYS = int(os.getenv("RECOMMEND_HISTORY_DAYS", "180"))  # 课程推荐使用的学习历史天数
+RECOMMEND_LATENCY_TARGET_MS = float(os.getenv("RECOMMEND_LATENCY_TARGET_MS", "20"))  # 单次推荐的延迟目标
+
+# 翻译配置
+TRANSLATION_MAX_INPUT_TOKENS = int(os.getenv("TRANSLATION_MAX_INPUT_TOKENS", "20000"))  # 单次翻译的输入上限
+TRANSLATION_CHUNK_TOKENS = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "600"))  # 每个上游请求包含的原文 token 数
+TRANSLATION_CHUNK_SEGMENTS = int(os.getenv("TRANSLATION_CHUNK_SEGMENTS", "20"))  # 每个上游请求最多包含的句子数
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))  # 单次翻译同时发出的上游请求数
+
+# 练习题库配置
+QUIZ_LANGUAGES = os.getenv("QUIZ_LANGUAGES", "english,japanese,french,german,korean,spanish")  # 预生成题库的语言
+QUIZ_TOPICS = os.getenv("QUIZ_TOPICS", "daily_life,travel,food,work,school,grammar")  # 题库主题
+QUIZ_POOL_TARGET = int(os.getenv("QUIZ_POOL_TARGET", "200"))  # 每个题库补充到的题目数
+QUIZ_POOL_LOW_WATER = int(os.getenv("QUIZ_POOL_LOW_WATER", "80"))  # 题目数低于该值时后台补充
+QUIZ_GENERATION_BATCH = int(os.getenv("QUIZ_GENERATION_BATCH", "10"))  # 每次调用大模型生成的题目数
+QUIZ_CACHE_TTL = float(os.getenv("QUIZ_CACHE_TTL", "300"))  # 题库在内存中的缓存时间（秒）
+
+# 批量开通账号配置
+PROVISION_HASH_WORKERS = int(os.getenv("PROVISION_HASH_WORKERS", str(os.cpu_count() or 4)))  # 计算密码哈希的进程数，0 表示在当前进程计算
+PROVISION_BATCH_SIZE = int(os.getenv("PROVISION_BATCH_SIZE", "500"))  # 每条多行 INSERT 的账号数
+PROVISION_MAX_ACCOUNTS = int(os.getenv("PROVISION_MAX_ACCOUNTS", "5000"))  # 单次请求的账号数上限
+
+# 全文检索配置
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "1000"))  # 按相关度排序时只对最近的这么多条匹配结果排序
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "160"))  # 摘要长度（字符）
+
+# 响应压缩配置
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # 小于该字节数的响应不压缩
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 动态内容用较低的质量换取速度
+
+# 排行榜配置
+LEADERBOARD_ENABLED = os.getenv("LEADERBOARD_ENABLED", "true").lower() == "true"
+LEADERBOARD_REBUILD_INTERVAL = float(os.getenv("LEADERBOARD_REBUILD_INTERVAL", "600"))  # 从数据库重建的间隔（秒）
+
+# 性能分析配置
+PROFILER_MAX_DURATION = float(os.getenv("PROFILER_MAX_DURATION", "300"))  # 单次采样分析的最长时间（秒）
+LOOP_LAG_MONITOR_ENABLED = os.getenv("LOOP_LAG_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))  # 事件循环延迟的测量间隔（秒）
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))  # 阻塞超过该时长时抓取调用栈（秒）
+LOOP_LAG_MAX_EVENTS = int(os.getenv("LOOP_LAG_MAX_EVENTS", "50"))  # 保留的阻塞记录数
+
+# 生词本批量补全配置
+ENRICHMENT_PACK_TOKENS = int(os.getenv("ENRICHMENT_PACK_TOKENS", "3000"))  # 每个上游请求的输入加预计输出 token 数
+ENRICHMENT_PACK_WORDS = int(os.getenv("ENRICHMENT_PACK_WORDS", "40"))  # 每个上游请求最多包含的单词数
+ENRICHMENT_OUTPUT_TOKENS = int(os.getenv("ENRICHMENT_OUTPUT_TOKENS", "70"))  # 每个单词预计的输出 token 数
+ENRICHMENT_CONCURRENCY = int(os.getenv("ENRICHMENT_CONCURRENCY", "4"))  # 单个任务同时发出的上游请求数
+ENRICHMENT_MAX_ROUNDS = int(os.getenv("ENRICHMENT_MAX_ROUNDS", "3"))  # 失败单词最多重试的轮数（含第一轮）
+ENRICHMENT_MAX_WORDS = int(os.getenv("ENRICHMENT_MAX_WORDS", "1000"))  # 单个任务最多处理的词条数
+
+# 学习统计写回缓冲配置
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "5"))  # 刷新间隔（秒）
+STATS_FLUSH_MAX_PENDING = int(os.getenv("STATS_FLUSH_MAX_PENDING", "1000"))  # 待写入条数达到该值时提前刷新
+STATS_TIMEZONE = os.getenv("STATS_TIMEZONE", "Asia/Shanghai")  # 按天汇总时使用的时区
+
+# 数据导出配置
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # 服务端游标每批读取的行数
+
 # 创建一个设置对象，方便导入
 class Settings:
     PROJECT_NAME = PROJECT_NAME
@@ -39,10 +185,108 @@ class Settings:
     POSTGRES_DB = POSTGRES_DB
     POSTGRES_PORT = POSTGRES_PORT
     DATABASE_URI = DATABASE_URI
+    DATABASE_REPLICA_URIS = DATABASE_REPLICA_URIS
+    REPLICA_SELECTION = REPLICA_SELECTION
+    REPLICA_MAX_LAG_SECONDS = REPLICA_MAX_LAG_SECONDS
+    REPLICA_HEALTH_INTERVAL = REPLICA_HEALTH_INTERVAL
+    READ_YOUR_WRITES_SECONDS = READ_YOUR_WRITES_SECONDS
     SECRET_KEY = SECRET_KEY
     ACCESS_TOKEN_EXPIRE_MINUTES = ACCESS_TOKEN_EXPIRE_MINUTES
     DEEPSEEK_API_KEY = DEEPSEEK_API_KEY
     DEEPSEEK_API_BASE = DEEPSEEK_API_BASE
+    LLM_MODEL = LLM_MODEL
+    LLM_UPSTREAMS = LLM_UPSTREAMS
+    LLM_DEFAULT_CONCURRENCY = LLM_DEFAULT_CONCURRENCY
+    LLM_MAX_ATTEMPTS = LLM_MAX_ATTEMPTS
+    LLM_RETRY_BACKOFF = LLM_RETRY_BACKOFF
+    LLM_QUEUE_TIMEOUT = LLM_QUEUE_TIMEOUT
+    LLM_LATENCY_ALPHA = LLM_LATENCY_ALPHA
+    LLM_FAILURE_THRESHOLD = LLM_FAILURE_THRESHOLD
+    LLM_FAILURE_COOLDOWN = LLM_FAILURE_COOLDOWN
+    LLM_EXPLORE_RATIO = LLM_EXPLORE_RATIO
+    DICTIONARY_ENABLED = DICTIONARY_ENABLED
+    DICTIONARY_DIR = DICTIONARY_DIR
+    DICTIONARY_GLOSS_LANGUAGE = DICTIONARY_GLOSS_LANGUAGE
+    DIFFICULTY_DIR = DIFFICULTY_DIR
+    DIFFICULTY_COVERAGE = DIFFICULTY_COVERAGE
+    DIFFICULTY_TOLERANCE = DIFFICULTY_TOLERANCE
+    SIMILARITY_CACHE_ENABLED = SIMILARITY_CACHE_ENABLED
+    SIMILARITY_CACHE_THRESHOLD = SIMILARITY_CACHE_THRESHOLD
+    SIMILARITY_CACHE_SIZE = SIMILARITY_CACHE_SIZE
+    SIMILARITY_CACHE_TTL = SIMILARITY_CACHE_TTL
+    SIMILARITY_CACHE_AUDIT_RATE = SIMILARITY_CACHE_AUDIT_RATE
+    SIMILARITY_CACHE_MAX_PROMPT = SIMILARITY_CACHE_MAX_PROMPT
+    AVATAR_DIR = AVATAR_DIR
+    AVATAR_SIZES = AVATAR_SIZES
+    AVATAR_MAX_BYTES = AVATAR_MAX_BYTES
+    TOKENIZER_PATH = TOKENIZER_PATH
+    CHAT_MAX_INPUT_TOKENS = CHAT_MAX_INPUT_TOKENS
+    CHAT_INPUT_OVERFLOW = CHAT_INPUT_OVERFLOW
+    CHAT_CONTEXT_TOKENS = CHAT_CONTEXT_TOKENS
+    CHAT_MAX_OUTPUT_TOKENS = CHAT_MAX_OUTPUT_TOKENS
+    USAGE_DAILY_TOKEN_QUOTA = USAGE_DAILY_TOKEN_QUOTA
+    USAGE_MONTHLY_TOKEN_QUOTA = USAGE_MONTHLY_TOKEN_QUOTA
+    USAGE_ANONYMOUS_DAILY_TOKEN_QUOTA = USAGE_ANONYMOUS_DAILY_TOKEN_QUOTA
+    TRUSTED_PROXIES = TRUSTED_PROXIES
+    USAGE_FLUSH_INTERVAL = USAGE_FLUSH_INTERVAL
+    USAGE_RECONCILE_INTERVAL = USAGE_RECONCILE_INTERVAL
+    JOB_WORKERS_ENABLED = JOB_WORKERS_ENABLED
+    JOB_CONCURRENCY = JOB_CONCURRENCY
+    JOB_POLL_INTERVAL = JOB_POLL_INTERVAL
+    JOB_LEASE_SECONDS = JOB_LEASE_SECONDS
+    JOB_RETRY_BASE_DELAY = JOB_RETRY_BASE_DELAY
+    JOB_MAX_ATTEMPTS = JOB_MAX_ATTEMPTS
+    JOB_REAP_INTERVAL = JOB_REAP_INTERVAL
+    HISTORY_PARTITION_PREMAKE_MONTHS = HISTORY_PARTITION_PREMAKE_MONTHS
+    HISTORY_PARTITION_CHECK_INTERVAL = HISTORY_PARTITION_CHECK_INTERVAL
+    HISTORY_RETENTION_MONTHS = HISTORY_RETENTION_MONTHS
+    HISTORY_ARCHIVE_DIR = HISTORY_ARCHIVE_DIR
+    HISTORY_RECENT_DAYS = HISTORY_RECENT_DAYS
+    ANALYTICS_SNAPSHOT_DIR = ANALYTICS_SNAPSHOT_DIR
+    ANALYTICS_REFRESH_INTERVAL = ANALYTICS_REFRESH_INTERVAL
+    ANALYTICS_KEEP_SNAPSHOTS = ANALYTICS_KEEP_SNAPSHOTS
+    RECOMMEND_ENABLED = RECOMMEND_ENABLED
+    RECOMMEND_REBUILD_INTERVAL = RECOMMEND_REBUILD_INTERVAL
+    RECOMMEND_REFRESH_INTERVAL = RECOMMEND_REFRESH_INTERVAL
+    RECOMMEND_NEIGHBORS = RECOMMEND_NEIGHBORS
+    RECOMMEND_HISTORY_DAYS = RECOMMEND_HISTORY_DAYS
+    RECOMMEND_LATENCY_TARGET_MS = RECOMMEND_LATENCY_TARGET_MS
+    TRANSLATION_MAX_INPUT_TOKENS = TRANSLATION_MAX_INPUT_TOKENS
+    TRANSLATION_CHUNK_TOKENS = TRANSLATION_CHUNK_TOKENS
+    TRANSLATION_CHUNK_SEGMENTS = TRANSLATION_CHUNK_SEGMENTS
+    TRANSLATION_CONCURRENCY = TRANSLATION_CONCURRENCY
+    QUIZ_LANGUAGES = QUIZ_LANGUAGES
+    QUIZ_TOPICS = QUIZ_TOPICS
+    QUIZ_POOL_TARGET = QUIZ_POOL_TARGET
+    QUIZ_POOL_LOW_WATER = QUIZ_POOL_LOW_WATER
+    QUIZ_GENERATION_BATCH = QUIZ_GENERATION_BATCH
+    QUIZ_CACHE_TTL = QUIZ_CACHE_TTL
+    PROVISION_HASH_WORKERS = PROVISION_HASH_WORKERS
+    PROVISION_BATCH_SIZE = PROVISION_BATCH_SIZE
+    PROVISION_MAX_ACCOUNTS = PROVISION_MAX_ACCOUNTS
+    SEARCH_CANDIDATE_LIMIT = SEARCH_CANDIDATE_LIMIT
+    SEARCH_SNIPPET_CHARS = SEARCH_SNIPPET_CHARS
+    COMPRESSION_ENABLED = COMPRESSION_ENABLED
+    COMPRESSION_MIN_SIZE = COMPRESSION_MIN_SIZE
+    COMPRESSION_GZIP_LEVEL = COMPRESSION_GZIP_LEVEL
+    COMPRESSION_BROTLI_QUALITY = COMPRESSION_BROTLI_QUALITY
+    ENRICHMENT_PACK_TOKENS = ENRICHMENT_PACK_TOKENS
+    ENRICHMENT_PACK_WORDS = ENRICHMENT_PACK_WORDS
+    ENRICHMENT_OUTPUT_TOKENS = ENRICHMENT_OUTPUT_TOKENS
+    ENRICHMENT_CONCURRENCY = ENRICHMENT_CONCURRENCY
+    ENRICHMENT_MAX_ROUNDS = ENRICHMENT_MAX_ROUNDS
+    ENRICHMENT_MAX_WORDS = ENRICHMENT_MAX_WORDS
+    LEADERBOARD_ENABLED = LEADERBOARD_ENABLED
+    LEADERBOARD_REBUILD_INTERVAL = LEADERBOARD_REBUILD_INTERVAL
+    PROFILER_MAX_DURATION = PROFILER_MAX_DURATION
+    LOOP_LAG_MONITOR_ENABLED = LOOP_LAG_MONITOR_ENABLED
+    LOOP_LAG_INTERVAL = LOOP_LAG_INTERVAL
+    LOOP_LAG_THRESHOLD = LOOP_LAG_THRESHOLD
+    LOOP_LAG_MAX_EVENTS = LOOP_LAG_MAX_EVENTS
+    STATS_FLUSH_INTERVAL = STATS_FLUSH_INTERVAL
+    STATS_FLUSH_MAX_PENDING = STATS_FLUSH_MAX_PENDING
+    STATS_TIMEZONE = STATS_TIMEZONE
+    EXPORT_BATCH_SIZE = EXPORT_BATCH_SIZE
 
 settings = Settings()
 
@@ -0,0 +1,260 @@
+import asyncio
+import bisect
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Counter, Deque, Dict, List, Optional
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 栈顶位于这些模块时线程处于空闲等待（线程池、selector 等），默认不计入采样
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+# 事件循环延迟直方图的桶上界（毫秒）
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame: Any) -> List[str]:
+    """从最外层到最内层的函数列表"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class SamplingProfiler:
+    """
+    采样分析器：后台线程按固定间隔读取所有线程的当前栈并按折叠栈计数，
+    不需要 settrace，开销只与采样频率有关；结果为 flamegraph.pl / speedscope 可用的折叠栈格式
+    """
+
+    def __init__(self, max_duration: float):
+        self.max_duration = max_duration
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts: Counter[str] = collections.Counter()
+        self.samples = 0
+        self.interval = 0.0
+        self.include_idle = False
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float, include_idle: bool = False) -> bool:
+        """开始采样，到达 duration 秒后自动停止；已在运行时返回 False"""
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = collections.Counter()
+            self.samples = 0
+            self.interval = interval
+            self.include_idle = include_idle
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(min(duration, self.max_duration),),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"采样分析已开始: 间隔 {interval * 1000:.1f}ms, 最长 {duration}s")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration: float) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            counts = collections.Counter()
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                if not self.include_idle and frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                stack = _collapse(frame)
+                counts[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+            with self._lock:
+                self._counts.update(counts)
+                self.samples += 1
+        self.stopped_at = time.time()
+        logger.info(f"采样分析已结束: {self.samples} 次采样")
+
+    def collapsed(self) -> str:
+        """折叠栈文本，每行 "线程;外层函数;...;内层函数 次数" """
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    def flamegraph(self) -> Dict[str, Any]:
+        """d3-flame-graph 使用的树形结构 {name, value, children}"""
+        root: Dict[str, Any] = {"name": "all", "value": 0, "children": {}}
+        with self._lock:
+            items = list(self._counts.items())
+        for stack, count in items:
+            node = root
+            node["value"] += count
+            for label in stack.split(";"):
+                node = node["children"].setdefault(label, {"name": label, "value": 0, "children": {}})
+                node["value"] += count
+
+        def finish(node: Dict[str, Any]) -> Dict[str, Any]:
+            children = sorted(node["children"].values(), key=lambda child: -child["value"])
+            return {"name": node["name"], "value": node["value"], "children": [finish(child) for child in children]}
+        return finish(root)
+
+    def status(self, top: int = 20) -> Dict[str, Any]:
+        """运行状态以及按栈顶函数（自身耗时）排序的热点"""
+        with self._lock:
+            leaves: Counter[str] = collections.Counter()
+            for stack, count in self._counts.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(self._counts.values())
+        return {
+            "pid": os.getpid(),
+            "running": self.running,
+            "startedAt": self.started_at,
+            "stoppedAt": self.stopped_at,
+            "intervalMs": self.interval * 1000,
+            "includeIdle": self.include_idle,
+            "samples": self.samples,
+            "stacks": total,
+            "hotspots": [{"function": name, "samples": count, "ratio": round(count / total, 4)}
+                         for name, count in leaves.most_common(top)],
+        }
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控：循环内的任务按固定间隔休眠并记录实际唤醒延迟（直方图），
+    独立的看门狗线程发现心跳超过阈值未更新时抓取事件循环线程的当前栈，即正在阻塞循环的回调
+    """
+
+    def __init__(self, interval: float, threshold: float, max_events: int):
+        self.interval = interval
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._events: Deque[Dict[str, Any]] = collections.deque(maxlen=max_events)
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._current_event: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_event_loop().create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"事件循环延迟监控已启动 (阈值 {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        lag_ms = max(lag, 0.0) * 1000
+        with self._lock:
+            self._buckets[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+            self._count += 1
+            self._sum_ms += lag_ms
+            self._max_ms = max(self._max_ms, lag_ms)
+            event = self._current_event
+            if event is not None:
+                # 阻塞结束，补上实际阻塞时长
+                event["blockedMs"] = round(lag_ms, 1)
+                self._current_event = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            self.record(now - expected)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled < self.threshold or self._current_event is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            event = {
+                "at": time.time(),
+                "blockedMs": None,  # 阻塞结束后填入
+                "detectedAfterMs": round(stalled * 1000, 1),
+                "stack": traceback.format_stack(frame),
+            }
+            with self._lock:
+                self._current_event = event
+                self._events.append(event)
+            logger.warning(f"事件循环被阻塞超过 {stalled * 1000:.0f}ms: {_frame_label(frame)}")
+
+    def stats(self, events: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            histogram = [
+                {"leMs": bound, "count": count}
+                for bound, count in zip(list(LAG_BUCKETS_MS) + ["+Inf"], self._buckets)
+            ]
+            return {
+                "pid": os.getpid(),
+                "running": self._task is not None,
+                "intervalMs": self.interval * 1000,
+                "thresholdMs": self.threshold * 1000,
+                "samples": self._count,
+                "meanMs": round(self._sum_ms / self._count, 3) if self._count else 0.0,
+                "maxMs": round(self._max_ms, 1),
+                "histogram": histogram,
+                "blocked": list(self._events)[-events:][::-1],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+            self._count = 0
+            self._sum_ms = 0.0
+            self._max_ms = 0.0
+            self._events.clear()
+
+
+sampling_profiler = SamplingProfiler(max_duration=settings.PROFILER_MAX_DURATION)
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL,
+    threshold=settings.LOOP_LAG_THRESHOLD,
+    max_events=settings.LOOP_LAG_MAX_EVENTS,
+)
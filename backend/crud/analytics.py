@@ -0,0 +1,49 @@
+from typing import Iterator, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# 导出分析快照使用的查询，每个查询对应快照中的一张列式表；列顺序即快照中的列名顺序
+SNAPSHOT_QUERIES = {
+    "users": (
+        ["id", "created_day", "is_active", "study_time", "words_learned", "articles_read"],
+        """
+        SELECT u.id,
+               COALESCE(u.created_at::date - DATE '1970-01-01', 0),
+               COALESCE(u.is_active, true),
+               COALESCE(s.study_time, 0),
+               COALESCE(s.words_learned, 0),
+               COALESCE(s.articles_read, 0)
+        FROM users u
+        LEFT JOIN user_statistics s ON s.user_id = u.id
+        ORDER BY u.id
+        """,
+    ),
+    "languages": (
+        ["user_id", "language", "level", "progress"],
+        """
+        SELECT user_id, language, COALESCE(level, ''), COALESCE(progress, 0)
+        FROM user_languages
+        WHERE user_id IS NOT NULL
+        """,
+    ),
+    "activity": (
+        ["user_id", "day", "language", "study_time"],
+        """
+        SELECT user_id, day - DATE '1970-01-01', language, COALESCE(study_time, 0)
+        FROM user_daily_activity
+        """,
+    ),
+}
+
+
+def iter_snapshot_rows(db: Session, name: str, batch_size: int) -> Iterator[List[tuple]]:
+    """用服务端游标分批读取快照查询的结果"""
+    result = db.execute(
+        text(SNAPSHOT_QUERIES[name][1]).execution_options(stream_results=True, max_row_buffer=batch_size)
+    )
+    try:
+        for rows in result.partitions(batch_size):
+            yield [tuple(row) for row in rows]
+    finally:
+        result.close()
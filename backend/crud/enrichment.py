@@ -0,0 +1,40 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database.models import WordEnrichment
+
+
+def lookup(db: Session, language: str, gloss_language: str, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """批量查找共享的单词补全结果，返回 {规范化单词: 字段}；命中次数尽力累加，被锁住的行直接跳过"""
+    if not keys:
+        return {}
+    rows = db.execute(
+        text("""
+            SELECT id, word_key, translation, example, notes FROM word_enrichments
+            WHERE language = :language AND gloss_language = :gloss AND word_key IN :keys
+        """).bindparams(bindparam("keys", expanding=True)),
+        {"language": language, "gloss": gloss_language, "keys": keys},
+    ).all()
+    if rows:
+        db.execute(
+            text("""
+                UPDATE word_enrichments SET hits = hits + 1, last_used_at = now()
+                WHERE id IN (SELECT id FROM word_enrichments WHERE id IN :ids FOR UPDATE SKIP LOCKED)
+            """).bindparams(bindparam("ids", expanding=True)),
+            {"ids": [row.id for row in rows]},
+        )
+        db.commit()
+    return {row.word_key: {"translation": row.translation, "example": row.example, "notes": row.notes}
+            for row in rows}
+
+
+def store(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """写入新的补全结果，并发任务已写入相同单词时保留先写入的一条"""
+    if not rows:
+        return
+    stmt = insert(WordEnrichment.__table__).values(rows)
+    db.execute(stmt.on_conflict_do_nothing(constraint="uq_word_enrichments_word"))
+    db.commit()
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..database.models import (
+    User, UserDailyActivity, UserLanguage, UserLearningHistory, UserStatistics, UserVocabulary
+)
+
+# 可导出的数据分区及对应的表和列（不包含密码等敏感字段）
+EXPORT_SECTIONS = {
+    "profile": (User.__table__, ["id", "username", "email", "created_at", "updated_at"], "id"),
+    "statistics": (UserStatistics.__table__, ["study_time", "words_learned", "articles_read", "updated_at"], "user_id"),
+    "languages": (UserLanguage.__table__, ["language", "level", "progress", "created_at", "updated_at"], "user_id"),
+    "vocabulary": (UserVocabulary.__table__, ["id", "word", "translation", "language", "example", "notes",
+                                              "mastery_level", "created_at", "updated_at"], "user_id"),
+    "daily_activity": (UserDailyActivity.__table__, ["day", "language", "study_time", "words_learned",
+                                                     "articles_read", "activities"], "user_id"),
+    "history": (UserLearningHistory.__table__, ["id", "activity_type", "title", "language", "level",
+                                                "duration", "created_at"], "user_id"),
+}
+
+
+def section_columns(section: str) -> List[str]:
+    return EXPORT_SECTIONS[section][1]
+
+
+def iter_section(db: Session, user_id: int, section: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    使用服务端游标分批读取某个分区的数据，每次产出一批字典，
+    内存占用只与 batch_size 有关
+    """
+    table, columns, owner_column = EXPORT_SECTIONS[section]
+    stmt = (
+        select(*[table.c[name] for name in columns])
+        .where(table.c[owner_column] == user_id)
+        .order_by(*table.primary_key.columns)
+        .execution_options(stream_results=True, max_row_buffer=batch_size)
+    )
+    result = db.execute(stmt)
+    try:
+        for rows in result.partitions(batch_size):
+            yield [dict(row._mapping) for row in rows]
+    finally:
+        result.close()
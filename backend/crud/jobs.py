@@ -0,0 +1,187 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.orm import Session
+
+from ..database.models import BackgroundJob
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+# 按优先级领取一个可执行的任务；SKIP LOCKED 使多个 worker 并发领取时互不阻塞
+CLAIM_SQL = text("""
+    UPDATE background_jobs
+    SET status = 'running',
+        locked_by = :worker,
+        locked_until = now() + make_interval(secs => :lease),
+        attempts = attempts + 1,
+        started_at = COALESCE(started_at, now()),
+        updated_at = now()
+    WHERE id = (
+        SELECT id FROM background_jobs
+        WHERE status = 'queued' AND run_at <= now() AND kind IN :kinds
+        ORDER BY priority DESC, run_at, id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, kind, payload, user_id, attempts, max_attempts
+""").bindparams(bindparam("kinds", expanding=True))
+
+
+def enqueue(db: Session, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None,
+            priority: int = 0, max_attempts: int = 3, run_at: Optional[datetime] = None) -> BackgroundJob:
+    job = BackgroundJob(kind=kind, payload=payload, user_id=user_id, priority=priority, max_attempts=max_attempts)
+    if run_at is not None:
+        job.run_at = run_at
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get(db: Session, job_id: int) -> Optional[BackgroundJob]:
+    return db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+
+def list_for_user(db: Session, user_id: int, status: Optional[str] = None, limit: int = 50) -> List[BackgroundJob]:
+    query = db.query(BackgroundJob).filter(BackgroundJob.user_id == user_id)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    return query.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+
+
+def claim(db: Session, worker: str, kinds: List[str], lease: float) -> Optional[Dict[str, Any]]:
+    """领取一个任务并加上租约，没有可执行的任务时返回 None"""
+    if not kinds:
+        return None
+    row = db.execute(CLAIM_SQL, {"worker": worker, "kinds": kinds, "lease": lease}).mappings().first()
+    db.commit()
+    return dict(row) if row is not None else None
+
+
+def renew_leases(db: Session, worker: str, job_ids: List[int], lease: float) -> None:
+    """延长正在执行的任务的租约"""
+    if not job_ids:
+        return
+    db.execute(
+        text("""
+            UPDATE background_jobs SET locked_until = now() + make_interval(secs => :lease)
+            WHERE id IN :ids AND locked_by = :worker AND status = 'running'
+        """).bindparams(bindparam("ids", expanding=True)),
+        {"ids": job_ids, "worker": worker, "lease": lease},
+    )
+    db.commit()
+
+
+def update_progress(db: Session, job_id: int, worker: str, progress: float, message: Optional[str]) -> bool:
+    """更新进度，返回是否已请求取消"""
+    row = db.execute(
+        text("""
+            UPDATE background_jobs SET progress = :progress, progress_message = :message, updated_at = now()
+            WHERE id = :id AND locked_by = :worker
+            RETURNING cancel_requested
+        """),
+        {"id": job_id, "worker": worker, "progress": progress, "message": message},
+    ).first()
+    db.commit()
+    return bool(row and row[0])
+
+
+def complete(db: Session, job_id: int, worker: str, result: Any) -> None:
+    db.query(BackgroundJob).filter(BackgroundJob.id == job_id, BackgroundJob.locked_by == worker).update(
+        {"status": "succeeded", "result": result, "progress": 1.0, "error": None,
+         "locked_by": None, "locked_until": None, "finished_at": func.now()},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def fail(db: Session, job_id: int, worker: str, error: str, retry_delay: Optional[float]) -> str:
+    """
+    记录失败；retry_delay 不为 None 且仍有重试次数时推迟后重新排队，
+    返回任务的新状态
+    """
+    row = db.execute(
+        text("""
+            UPDATE background_jobs
+            SET status = CASE WHEN :retry AND attempts < max_attempts AND NOT cancel_requested
+                              THEN 'queued'
+                              WHEN cancel_requested THEN 'cancelled'
+                              ELSE 'failed' END,
+                run_at = now() + make_interval(secs => :delay),
+                error = :error,
+                locked_by = NULL,
+                locked_until = NULL,
+                finished_at = CASE WHEN :retry AND attempts < max_attempts AND NOT cancel_requested
+                                   THEN NULL ELSE now() END,
+                updated_at = now()
+            WHERE id = :id AND locked_by = :worker
+            RETURNING status
+        """),
+        {"id": job_id, "worker": worker, "error": error[:2000], "retry": retry_delay is not None,
+         "delay": retry_delay or 0},
+    ).first()
+    db.commit()
+    return row[0] if row else "lost"
+
+
+def release(db: Session, job_id: int, worker: str) -> None:
+    """worker 停止时把未完成的任务放回队列，不计入重试次数"""
+    db.execute(
+        text("""
+            UPDATE background_jobs
+            SET status = 'queued', attempts = GREATEST(attempts - 1, 0),
+                locked_by = NULL, locked_until = NULL, updated_at = now()
+            WHERE id = :id AND locked_by = :worker AND status = 'running'
+        """),
+        {"id": job_id, "worker": worker},
+    )
+    db.commit()
+
+
+def requeue_expired(db: Session) -> int:
+    """租约已过期（worker 崩溃或被杀死）的任务重新排队，重试次数用尽的标记为失败"""
+    result = db.execute(text("""
+        UPDATE background_jobs
+        SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            error = 'worker 租约过期',
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+            locked_by = NULL,
+            locked_until = NULL,
+            updated_at = now()
+        WHERE status = 'running' AND locked_until < now()
+    """))
+    db.commit()
+    return result.rowcount
+
+
+def cancel(db: Session, job: BackgroundJob) -> BackgroundJob:
+    """排队中的任务直接取消；执行中的任务标记取消请求，由处理函数在汇报进度时停止"""
+    # 单条语句按当前状态判断，避免与 worker 领取任务发生竞争
+    db.execute(
+        text("""
+            UPDATE background_jobs
+            SET status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                finished_at = CASE WHEN status = 'queued' THEN now() ELSE finished_at END,
+                cancel_requested = cancel_requested OR status = 'running',
+                updated_at = now()
+            WHERE id = :id
+        """),
+        {"id": job.id},
+    )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def has_active(db: Session, kind: str, payload_key: str, value: str) -> bool:
+    """是否已有排队或执行中的同类任务（按 payload 中的某个字段区分）"""
+    return db.execute(
+        text("""
+            SELECT EXISTS (
+                SELECT 1 FROM background_jobs
+                WHERE kind = :kind AND status IN ('queued', 'running') AND payload ->> :key = :value
+            )
+        """),
+        {"kind": kind, "key": payload_key, "value": value},
+    ).scalar()
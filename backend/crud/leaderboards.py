@@ -0,0 +1,35 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+
+def all_time_totals(db: Session) -> List[Any]:
+    """所有有学习记录的活跃用户的累计学习时长和单词数"""
+    return db.execute(text("""
+        SELECT s.user_id, s.study_time, s.words_learned
+        FROM user_statistics s JOIN users u ON u.id = s.user_id
+        WHERE u.is_active AND (s.study_time > 0 OR s.words_learned > 0)
+    """)).all()
+
+
+def language_totals(db: Session, since: Optional[date] = None) -> List[Any]:
+    """按 (用户, 语言) 汇总每日统计；指定 since 时只汇总该日期之后的部分"""
+    return db.execute(text("""
+        SELECT d.user_id, d.language, sum(d.study_time) AS study_time, sum(d.words_learned) AS words_learned
+        FROM user_daily_activity d JOIN users u ON u.id = d.user_id
+        WHERE u.is_active AND (CAST(:since AS date) IS NULL OR d.day >= :since)
+        GROUP BY d.user_id, d.language
+    """), {"since": since}).all()
+
+
+def get_public_profiles(db: Session, user_ids: List[int]) -> Dict[int, Any]:
+    """排行榜展示用的用户名和头像"""
+    if not user_ids:
+        return {}
+    rows = db.execute(
+        text("SELECT id, username, avatar FROM users WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": user_ids},
+    ).all()
+    return {row.id: row for row in rows}
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import bindparam, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database.models import QuizExercise, UserQuizSeen
+
+EXERCISE_COLUMNS = ("id", "kind", "question", "options", "answer", "explanation")
+
+
+def list_pool(db: Session, language: str, level: str, topic: str) -> List[Dict[str, Any]]:
+    """读取一个题库中所有上线的题目"""
+    rows = db.query(*[getattr(QuizExercise, column) for column in EXERCISE_COLUMNS]).filter(
+        QuizExercise.language == language,
+        QuizExercise.level == level,
+        QuizExercise.topic == topic,
+        QuizExercise.active.is_(True),
+    ).order_by(QuizExercise.id).all()
+    return [dict(zip(EXERCISE_COLUMNS, row)) for row in rows]
+
+
+def pool_size(db: Session, language: str, level: str, topic: str) -> int:
+    return db.query(func.count(QuizExercise.id)).filter(
+        QuizExercise.language == language,
+        QuizExercise.level == level,
+        QuizExercise.topic == topic,
+        QuizExercise.active.is_(True),
+    ).scalar()
+
+
+def pool_sizes(db: Session) -> List[Any]:
+    """各题库的题目数"""
+    return db.query(
+        QuizExercise.language, QuizExercise.level, QuizExercise.topic, func.count(QuizExercise.id).label("size")
+    ).filter(QuizExercise.active.is_(True)).group_by(
+        QuizExercise.language, QuizExercise.level, QuizExercise.topic
+    ).all()
+
+
+def insert_exercises(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """写入新题目，与已有题目重复的跳过，返回实际写入数"""
+    if not rows:
+        return 0
+    stmt = insert(QuizExercise.__table__).values(rows).on_conflict_do_nothing(
+        constraint="uq_quiz_exercises_content"
+    ).returning(QuizExercise.__table__.c.id)
+    inserted = len(db.execute(stmt).all())
+    db.commit()
+    return inserted
+
+
+def seen_ids(db: Session, user_id: int, exercise_ids: List[int]) -> Set[int]:
+    """用户在给定题目中已经做过的（按主键查找）"""
+    if not exercise_ids:
+        return set()
+    rows = db.execute(
+        text("SELECT exercise_id FROM user_quiz_seen WHERE user_id = :user_id AND exercise_id IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"user_id": user_id, "ids": exercise_ids},
+    )
+    return {row[0] for row in rows}
+
+
+def mark_seen(db: Session, user_id: int, exercise_ids: List[int], reset_ids: List[int]) -> None:
+    """记录用户做过的题目；reset_ids 为已全部做完、需要重新开始的题库中的题目"""
+    if reset_ids:
+        db.execute(
+            text("DELETE FROM user_quiz_seen WHERE user_id = :user_id AND exercise_id IN :ids")
+            .bindparams(bindparam("ids", expanding=True)),
+            {"user_id": user_id, "ids": reset_ids},
+        )
+    if exercise_ids:
+        stmt = insert(UserQuizSeen.__table__).values(
+            [{"user_id": user_id, "exercise_id": exercise_id} for exercise_id in exercise_ids]
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[UserQuizSeen.user_id, UserQuizSeen.exercise_id], set_={"seen_at": func.now()}
+        ))
+    db.commit()
+
+
+def get_answers(db: Session, exercise_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    rows = db.query(QuizExercise.id, QuizExercise.answer, QuizExercise.explanation).filter(
+        QuizExercise.id.in_(exercise_ids)
+    ).all()
+    return {row.id: {"answer": row.answer, "explanation": row.explanation} for row in rows}
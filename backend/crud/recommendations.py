@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+# 用户 × 单词：同一用户同一语言的单词只算一次
+WORDS_SQL = """
+    SELECT user_id, language, lower(word)
+    FROM user_vocabulary
+    WHERE user_id IS NOT NULL {user_filter}
+    GROUP BY 1, 2, 3
+"""
+# 用户 × 课程：以 (级别, 活动类型, 标题) 标识一个课程，记录学习次数
+LESSONS_SQL = """
+    SELECT user_id, language, COALESCE(level, ''), activity_type, title, COUNT(*)
+    FROM user_learning_history
+    WHERE created_at >= :since AND user_id IS NOT NULL AND language IS NOT NULL AND title IS NOT NULL
+          {user_filter}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def _stream(db: Session, sql: str, params: dict, user_ids: Optional[List[int]], batch_size: int) -> Iterator[List[tuple]]:
+    stmt = text(sql.format(user_filter="AND user_id IN :user_ids" if user_ids is not None else ""))
+    if user_ids is not None:
+        stmt = stmt.bindparams(bindparam("user_ids", expanding=True))
+        params = {**params, "user_ids": user_ids}
+    result = db.execute(stmt.execution_options(stream_results=True, max_row_buffer=batch_size), params)
+    try:
+        for rows in result.partitions(batch_size):
+            yield [tuple(row) for row in rows]
+    finally:
+        result.close()
+
+
+def iter_word_interactions(db: Session, batch_size: int,
+                           user_ids: Optional[List[int]] = None) -> Iterator[List[tuple]]:
+    """分批读取 (user_id, language, word)"""
+    return _stream(db, WORDS_SQL, {}, user_ids, batch_size)
+
+
+def iter_lesson_interactions(db: Session, since: datetime, batch_size: int,
+                             user_ids: Optional[List[int]] = None) -> Iterator[List[tuple]]:
+    """分批读取 (user_id, language, level, activity_type, title, 次数)，只统计 since 之后的历史"""
+    return _stream(db, LESSONS_SQL, {"since": since}, user_ids, batch_size)
+
+
+def max_ids(db: Session) -> Tuple[int, int]:
+    """生词本和学习历史当前的最大 id，作为增量刷新的水位"""
+    row = db.execute(text("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM user_vocabulary),
+               (SELECT COALESCE(MAX(id), 0) FROM user_learning_history)
+    """)).first()
+    return int(row[0]), int(row[1])
+
+
+def changed_users(db: Session, vocabulary_after: int, history_after: int, history_since: datetime) -> Set[int]:
+    """水位之后新增过生词或学习记录的用户；history_since 用于裁剪学习历史的旧分区"""
+    rows = db.execute(text("""
+        SELECT user_id FROM user_vocabulary WHERE id > :vocabulary_after AND user_id IS NOT NULL
+        UNION
+        SELECT user_id FROM user_learning_history
+        WHERE id > :history_after AND created_at >= :history_since AND user_id IS NOT NULL
+    """), {"vocabulary_after": vocabulary_after, "history_after": history_after, "history_since": history_since})
+    return {row[0] for row in rows}
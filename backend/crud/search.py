@@ -0,0 +1,119 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database.models import ChatTranscript
+
+# 标题权重 A、正文权重 B；拉丁文字部分按语言词干化，中日韩单字和二元组用 simple 配置原样收录
+INSERT_DOCUMENT_SQL = text("""
+    INSERT INTO search_documents (user_id, source, source_id, language, title, content, created_at, search_vector)
+    VALUES (
+        :user_id, :source, :source_id, :language, :title, :content, :created_at,
+        setweight(to_tsvector(CAST(:config AS regconfig), :title_text), 'A')
+        || setweight(to_tsvector('simple', :title_cjk), 'A')
+        || setweight(to_tsvector(CAST(:config AS regconfig), :content_text), 'B')
+        || setweight(to_tsvector('simple', :content_cjk), 'B')
+    )
+""")
+
+SORT_ORDERS = {
+    "relevance": "rank DESC, created_at DESC",
+    "recent": "created_at DESC",
+}
+
+
+def index_documents(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """写入检索文档，由调用方提交事务"""
+    if rows:
+        db.execute(INSERT_DOCUMENT_SQL, rows)
+
+
+def insert_chat(db: Session, row: Dict[str, Any]) -> int:
+    """写入一条对话记录，返回 id，由调用方提交事务"""
+    return db.execute(ChatTranscript.__table__.insert().values(**row).returning(ChatTranscript.__table__.c.id)).scalar()
+
+
+def search(db: Session, user_id: int, latin: str, cjk: str, configs: List[str], source: Optional[str],
+           language: Optional[str], sort: str, limit: int, offset: int, candidates: int) -> Tuple[List[Any], int]:
+    """
+    在用户自己的文档中检索，返回 (当前页, 匹配数)；
+    相关度排序只在最近的 candidates 条匹配中进行，匹配数也以此为上限，保证常见词的查询延迟可控
+    """
+    # 拉丁文字部分按每种可能的语言配置分别解析后取并集，中日韩部分必须全部命中
+    latin_query = " || ".join(f"plainto_tsquery(CAST(:config_{i} AS regconfig), :latin)" for i in range(len(configs)))
+    filters = ""
+    parameters: Dict[str, Any] = {
+        "user_id": user_id, "latin": latin, "cjk": cjk, "limit": limit, "offset": offset, "candidates": candidates,
+        **{f"config_{i}": config for i, config in enumerate(configs)},
+    }
+    if source:
+        filters += " AND d.source = :source"
+        parameters["source"] = source
+    if language:
+        filters += " AND d.language = :language"
+        parameters["language"] = language
+
+    rows = db.execute(text(f"""
+        WITH q AS (
+            SELECT ({latin_query}) && plainto_tsquery('simple', :cjk) AS query
+        ),
+        matches AS (
+            SELECT d.id, d.source, d.source_id, d.language, d.title, d.content, d.created_at,
+                   ts_rank_cd(d.search_vector, q.query) AS rank
+            FROM search_documents d, q
+            WHERE d.user_id = :user_id AND d.search_vector @@ q.query{filters}
+            ORDER BY d.created_at DESC
+            LIMIT :candidates
+        )
+        SELECT *, count(*) OVER () AS total
+        FROM matches
+        ORDER BY {SORT_ORDERS[sort]}
+        LIMIT :limit OFFSET :offset
+    """), parameters).all()
+    if rows:
+        return rows, rows[0].total
+    if offset == 0:
+        return [], 0
+    # 页码超出范围时单独计数
+    total = db.execute(text(f"""
+        WITH q AS (SELECT ({latin_query}) && plainto_tsquery('simple', :cjk) AS query)
+        SELECT count(*) FROM (
+            SELECT 1 FROM search_documents d, q
+            WHERE d.user_id = :user_id AND d.search_vector @@ q.query{filters}
+            LIMIT :candidates
+        ) AS matches
+    """), parameters).scalar()
+    return [], total
+
+
+def iter_history(db: Session, batch_size: int, user_id: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """按 (created_at, id) 分批读取学习历史，用于补建索引"""
+    last: Tuple[Any, Any] = (None, None)
+    user_filter = "AND user_id = :user_id" if user_id is not None else ""
+    while True:
+        rows = db.execute(text(f"""
+            SELECT id, user_id, activity_type, title, language, created_at
+            FROM user_learning_history
+            WHERE (CAST(:last_created AS timestamptz) IS NULL OR (created_at, id) > (:last_created, :last_id))
+            {user_filter}
+            ORDER BY created_at, id
+            LIMIT :limit
+        """), {"last_created": last[0], "last_id": last[1], "user_id": user_id, "limit": batch_size}).mappings().all()
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        last = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def delete_documents(db: Session, source: str, user_id: Optional[int] = None) -> int:
+    user_filter = "AND user_id = :user_id" if user_id is not None else ""
+    result = db.execute(text(f"DELETE FROM search_documents WHERE source = :source {user_filter}"),
+                        {"source": source, "user_id": user_id})
+    return result.rowcount
+
+
+def get_chat(db: Session, user_id: int, transcript_id: int) -> Optional[ChatTranscript]:
+    return db.query(ChatTranscript).filter(
+        ChatTranscript.id == transcript_id, ChatTranscript.user_id == user_id
+    ).first()
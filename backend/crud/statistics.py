@@ -0,0 +1,168 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, cast, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database.models import UserDailyActivity, UserLearningHistory, UserProfile, UserStatistics
+
+COUNTER_FIELDS = ("study_time", "words_learned", "articles_read")
+ROLLUP_FIELDS = COUNTER_FIELDS + ("activities",)
+
+
+def insert_history(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """批量插入学习历史（psycopg2 下会合并为多行 INSERT）"""
+    if rows:
+        db.execute(UserLearningHistory.__table__.insert(), rows)
+
+
+def get_recent_history(db: Session, user_id: int, limit: int, window_days: int) -> List[UserLearningHistory]:
+    """
+    读取最近的学习历史：先只查最近 window_days 天（时间条件以常量传入，规划时即可裁剪掉更早的分区），
+    不足 limit 条时再查更早的记录
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=window_days)
+    query = db.query(UserLearningHistory).filter(UserLearningHistory.user_id == user_id)
+    recent = query.filter(UserLearningHistory.created_at >= since) \
+        .order_by(UserLearningHistory.created_at.desc()).limit(limit).all()
+    if len(recent) >= limit:
+        return recent
+    older = query.filter(UserLearningHistory.created_at < since) \
+        .order_by(UserLearningHistory.created_at.desc()).limit(limit - len(recent)).all()
+    return recent + older
+
+
+def increment_counters(db: Session, deltas: Dict[int, Dict[str, int]]) -> None:
+    """
+    以原子自增方式累加用户统计计数（SET x = x + n），
+    不存在统计行时自动创建；同一批次只发送一条多行语句
+    """
+    if not deltas:
+        return
+
+    # 按 user_id 排序，避免多个进程并发刷新时互相死锁
+    user_ids = sorted(deltas)
+
+    stats_rows = [
+        {"user_id": user_id, **{field: deltas[user_id].get(field, 0) for field in COUNTER_FIELDS}}
+        for user_id in user_ids
+    ]
+    stmt = insert(UserStatistics.__table__).values(stats_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStatistics.user_id],
+        set_={
+            "study_time": func.coalesce(UserStatistics.study_time, 0) + stmt.excluded.study_time,
+            "words_learned": func.coalesce(UserStatistics.words_learned, 0) + stmt.excluded.words_learned,
+            "articles_read": func.coalesce(UserStatistics.articles_read, 0) + stmt.excluded.articles_read,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+    # UserProfile 中的总学习时间以小时为单位
+    profile_rows = [
+        {
+            "user_id": row["user_id"],
+            "total_study_time": row["study_time"] / 60.0,
+            "words_learned": row["words_learned"],
+            "articles_read": row["articles_read"],
+        }
+        for row in stats_rows
+    ]
+    stmt = insert(UserProfile.__table__).values(profile_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserProfile.user_id],
+        set_={
+            "total_study_time": func.coalesce(UserProfile.total_study_time, 0) + stmt.excluded.total_study_time,
+            "words_learned": func.coalesce(UserProfile.words_learned, 0) + stmt.excluded.words_learned,
+            "articles_read": func.coalesce(UserProfile.articles_read, 0) + stmt.excluded.articles_read,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def increment_daily(db: Session, deltas: Dict[Tuple[int, date, str], Dict[str, int]]) -> None:
+    """按 (用户, 日期, 语言) 原子累加每日汇总"""
+    if not deltas:
+        return
+
+    rows = [
+        {"user_id": user_id, "day": day, "language": language,
+         **{field: deltas[(user_id, day, language)].get(field, 0) for field in ROLLUP_FIELDS}}
+        for user_id, day, language in sorted(deltas)
+    ]
+    stmt = insert(UserDailyActivity.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_daily_activity",
+        set_={
+            **{
+                field: func.coalesce(getattr(UserDailyActivity, field), 0) + getattr(stmt.excluded, field)
+                for field in ROLLUP_FIELDS
+            },
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def backfill_daily(db: Session, timezone: str, since: Optional[date] = None) -> int:
+    """
+    从学习历史补建每日汇总，用于汇总表上线之前的历史数据或增量写入失败后的补救；
+    已有的 (用户, 日期, 语言) 按历史重新计算学习时长和活动次数，取与现有值的较大者，
+    既修复只写入了一部分的日期，也不丢失没有历史记录的心跳时长；单词数和文章数不从历史推导，保持不变
+    """
+    result = db.execute(
+        text("""
+            INSERT INTO user_daily_activity
+                (user_id, day, language, study_time, words_learned, articles_read, activities)
+            SELECT user_id,
+                   (created_at AT TIME ZONE :tz)::date AS day,
+                   COALESCE(language, '') AS language,
+                   COALESCE(SUM(duration), 0),
+                   0,
+                   0,
+                   COUNT(*)
+            FROM user_learning_history
+            WHERE user_id IS NOT NULL
+              AND (CAST(:since AS date) IS NULL OR created_at >= CAST(:since AS date))
+            GROUP BY 1, 2, 3
+            ON CONFLICT ON CONSTRAINT uq_user_daily_activity DO UPDATE SET
+                study_time = GREATEST(COALESCE(user_daily_activity.study_time, 0), EXCLUDED.study_time),
+                activities = GREATEST(COALESCE(user_daily_activity.activities, 0), EXCLUDED.activities),
+                updated_at = now()
+        """),
+        {"tz": timezone, "since": since},
+    )
+    return result.rowcount
+
+
+def get_daily(db: Session, user_id: int, start: date, language: Optional[str] = None) -> List[Any]:
+    """读取某用户从 start 起每天的汇总（多个语言合并）"""
+    query = db.query(
+        UserDailyActivity.day.label("day"),
+        *[func.sum(getattr(UserDailyActivity, field)).label(field) for field in ROLLUP_FIELDS],
+    ).filter(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day >= start,
+    )
+    if language is not None:
+        query = query.filter(UserDailyActivity.language == language)
+    return query.group_by(UserDailyActivity.day).order_by(UserDailyActivity.day).all()
+
+
+def get_by_period(db: Session, user_id: int, period: str, start: date,
+                  language: Optional[str] = None) -> List[Any]:
+    """按周或月聚合每日汇总，period 为 'week' 或 'month'"""
+    period_start = cast(func.date_trunc(period, UserDailyActivity.day), Date).label("period_start")
+    query = db.query(
+        period_start,
+        *[func.sum(getattr(UserDailyActivity, field)).label(field) for field in ROLLUP_FIELDS],
+    ).filter(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day >= start,
+    )
+    if language is not None:
+        query = query.filter(UserDailyActivity.language == language)
+    return query.group_by(period_start).order_by(period_start).all()
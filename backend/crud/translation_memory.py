@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..database.models import TranslationMemory
+
+
+def lookup(db: Session, source_language: str, target_language: str, hashes: List[str]) -> Dict[str, str]:
+    """批量查找翻译记忆，返回 {哈希: 译文}；命中次数尽力累加，被其他请求锁住的行直接跳过"""
+    if not hashes:
+        return {}
+    rows = db.execute(
+        text("""
+            SELECT id, segment_hash, translation FROM translation_memory
+            WHERE source_language = :source AND target_language = :target AND segment_hash IN :hashes
+        """).bindparams(bindparam("hashes", expanding=True)),
+        {"source": source_language, "target": target_language, "hashes": hashes},
+    ).all()
+    if rows:
+        db.execute(
+            text("""
+                UPDATE translation_memory SET hits = hits + 1, last_used_at = now()
+                WHERE id IN (SELECT id FROM translation_memory WHERE id IN :ids FOR UPDATE SKIP LOCKED)
+            """).bindparams(bindparam("ids", expanding=True)),
+            {"ids": [row[0] for row in rows]},
+        )
+        db.commit()
+    return {segment_hash: translation for _, segment_hash, translation in rows}
+
+
+def store(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """写入新的翻译，并发请求已写入相同句子时保留先写入的一条"""
+    if not rows:
+        return
+    stmt = insert(TranslationMemory.__table__).values(rows)
+    db.execute(stmt.on_conflict_do_nothing(constraint="uq_translation_memory_segment"))
+    db.commit()
@@ -0,0 +1,47 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database.models import TokenUsage
+
+
+def insert_usage(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """批量插入用量流水"""
+    if rows:
+        db.execute(TokenUsage.__table__.insert(), rows)
+
+
+def totals_since(db: Session, day_start: datetime, month_start: datetime) -> Dict[int, Tuple[int, int]]:
+    """本月有用量的用户的 (当日, 当月) token 总数"""
+    rows = db.execute(
+        text("""
+            SELECT user_id,
+                   COALESCE(SUM(prompt_tokens + completion_tokens) FILTER (WHERE created_at >= :day_start), 0),
+                   SUM(prompt_tokens + completion_tokens)
+            FROM token_usage
+            WHERE user_id IS NOT NULL AND created_at >= :month_start
+            GROUP BY user_id
+        """),
+        {"day_start": day_start, "month_start": month_start},
+    )
+    return {user_id: (int(daily), int(monthly)) for user_id, daily, monthly in rows}
+
+
+def get_daily_usage(db: Session, user_id: int, since: date, timezone: str) -> List[Any]:
+    """某用户从 since 起每天的用量"""
+    return db.execute(
+        text("""
+            SELECT (created_at AT TIME ZONE :tz)::date AS day,
+                   COUNT(*) AS requests,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(cached_tokens) AS cached_tokens
+            FROM token_usage
+            WHERE user_id = :user_id AND created_at >= CAST(:since AS timestamp) AT TIME ZONE :tz
+            GROUP BY 1
+            ORDER BY 1
+        """),
+        {"user_id": user_id, "since": since, "tz": timezone},
+    ).all()
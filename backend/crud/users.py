@@ -1,8 +1,9 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, undefer
 
-from ..database.models import User
+from ..database.models import User, UserLanguage, UserStatistics
 from ..database.schemas import UserCreate, UserUpdate
 from ..core.security import get_password_hash, verify_password
 from pydantic import BaseModel
@@ -16,6 +17,13 @@ def get_by_username(db: Session, username: str) -> Optional[User]:
 def get(db: Session, id: int) -> Optional[User]:
     return db.query(User).filter(User.id == id).first()
 
+def get_language_level(db: Session, user_id: int, language: str) -> Optional[str]:
+    """获取用户某种学习语言的级别"""
+    row = db.query(UserLanguage.level).filter(
+        UserLanguage.user_id == user_id, UserLanguage.language == language
+    ).first()
+    return row.level if row else None
+
 def create(db: Session, obj_in: UserCreate) -> User:
     """创建新用户"""
     # 打印调试信息
@@ -71,8 +79,8 @@ def authenticate(db: Session, *, username: str, password: str) -> Optional[User]
         # 打印调试信息
         print(f"尝试验证用户: {username}")
         
-        # 获取用户
-        user = get_by_username(db, username=username)
+        # 获取用户（hashed_password 默认延迟加载，这里一并查出）
+        user = db.query(User).options(undefer(User.hashed_password)).filter(User.username == username).first()
         if not user:
             print(f"用户不存在: {username}")
             return None
@@ -88,6 +96,31 @@ def authenticate(db: Session, *, username: str, password: str) -> Optional[User]
         print(f"用户验证异常: {str(e)}")
         return None
 
+def bulk_insert(db: Session, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """多行插入用户，用户名或邮箱已存在的跳过；返回 {用户名: id}，由调用方提交事务"""
+    if not rows:
+        return {}
+    stmt = insert(User.__table__).values(rows).on_conflict_do_nothing().returning(
+        User.__table__.c.id, User.__table__.c.username
+    )
+    return {row.username: row.id for row in db.execute(stmt)}
+
+def find_existing(db: Session, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+    """返回已被占用的用户名和邮箱"""
+    rows = db.query(User.username, User.email).filter(
+        User.username.in_(usernames) | User.email.in_(emails)
+    ).all()
+    return {row.username for row in rows}, {row.email for row in rows}
+
+def bulk_init_learning(db: Session, languages: List[Dict[str, Any]], user_ids: List[int]) -> None:
+    """为新用户写入初始学习语言和空的学习统计，由调用方提交事务"""
+    if languages:
+        db.execute(insert(UserLanguage.__table__).values(languages))
+    if user_ids:
+        db.execute(insert(UserStatistics.__table__).values(
+            [{"user_id": user_id, "study_time": 0, "words_learned": 0, "articles_read": 0} for user_id in user_ids]
+        ).on_conflict_do_nothing(index_elements=["user_id"]))
+
 def is_active(user: User) -> bool:
     return user.is_active
 
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..database.models import UserVocabulary
+
+
+def get_by_word(db: Session, user_id: int, language: str, word: str) -> Optional[UserVocabulary]:
+    """按单词（不区分大小写）查找用户生词本中的词条"""
+    return db.query(UserVocabulary).filter(
+        UserVocabulary.user_id == user_id,
+        func.lower(UserVocabulary.word) == word.lower(),
+        UserVocabulary.language == language,
+    ).first()
+
+
+def list_missing_examples(db: Session, user_id: int, language: Optional[str], limit: int) -> List[UserVocabulary]:
+    """用户生词本中还没有例句的词条"""
+    query = db.query(UserVocabulary).filter(
+        UserVocabulary.user_id == user_id,
+        (UserVocabulary.example.is_(None)) | (UserVocabulary.example == ""),
+    )
+    if language:
+        query = query.filter(UserVocabulary.language == language)
+    return query.order_by(UserVocabulary.id).limit(limit).all()
+
+
+def set_examples(db: Session, user_id: int, examples: Dict[int, str]) -> None:
+    """批量写入例句，只更新仍然没有例句的词条"""
+    for vocabulary_id, example in examples.items():
+        db.query(UserVocabulary).filter(
+            UserVocabulary.id == vocabulary_id,
+            UserVocabulary.user_id == user_id,
+            (UserVocabulary.example.is_(None)) | (UserVocabulary.example == ""),
+        ).update({"example": example}, synchronize_session=False)
+    db.commit()
+
+
+def list_unenriched(db: Session, user_id: int, language: Optional[str], limit: int) -> List[UserVocabulary]:
+    """用户生词本中释义、例句或说明有缺失的词条"""
+    query = db.query(UserVocabulary).filter(
+        UserVocabulary.user_id == user_id,
+        (UserVocabulary.translation == "")
+        | (UserVocabulary.example.is_(None)) | (UserVocabulary.example == "")
+        | (UserVocabulary.notes.is_(None)) | (UserVocabulary.notes == ""),
+    )
+    if language:
+        query = query.filter(UserVocabulary.language == language)
+    return query.order_by(UserVocabulary.id).limit(limit).all()
+
+
+def apply_enrichments(db: Session, user_id: int, rows: List[Dict[str, Any]]) -> int:
+    """一条 UPDATE 批量补全词条，只填写仍为空的字段，不覆盖用户自己写的内容；返回更新的行数"""
+    if not rows:
+        return 0
+    result = db.execute(text("""
+        UPDATE user_vocabulary AS v SET
+            translation = CASE WHEN v.translation = '' THEN d.translation ELSE v.translation END,
+            example = COALESCE(NULLIF(v.example, ''), d.example),
+            notes = COALESCE(NULLIF(v.notes, ''), d.notes),
+            updated_at = now()
+        FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS d(id int, translation text, example text, notes text)
+        WHERE v.id = d.id AND v.user_id = :user_id
+    """), {"rows": json.dumps(rows, ensure_ascii=False), "user_id": user_id})
+    db.commit()
+    return result.rowcount
@@ -1,9 +1,18 @@
-from sqlalchemy import create_engine
+import logging
+import re
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import sessionmaker
 
 from backend.core.config import Settings
 
+logger = logging.getLogger(__name__)
+
+# 建索引、维护分区等 DDL 共用的 advisory lock，多个 worker 同时启动时只有一个执行
+MAINTENANCE_LOCK_KEY = 7_314_201
+
 # 创建 settings 实例
 settings = Settings()
 
@@ -18,4 +27,46 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def ensure_indexes():
+    """
+    create_all 不会给已存在的表补建索引，这里检查并创建缺失的索引：
+    普通表使用 CREATE INDEX CONCURRENTLY，建索引期间不阻塞写入；
+    上次中断留下的无效索引先删除再重建；其他 worker 正在执行时直接跳过
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar():
+            logger.info("其他进程正在维护索引，跳过")
+            return
+        try:
+            existing = {
+                row.name: row
+                for row in conn.execute(text("""
+                    SELECT c.relname AS name, i.indisvalid AS valid
+                    FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = current_schema()
+                """))
+            }
+            partitioned = set(conn.execute(text("""
+                SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = current_schema() AND c.relkind = 'p'
+            """)).scalars())
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    current = existing.get(index.name)
+                    if current is not None and current.valid:
+                        continue
+                    ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+                    if table.name in partitioned:
+                        # 分区表不支持 CONCURRENTLY，只能普通创建
+                        conn.execute(text(re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX IF NOT EXISTS ", ddl)))
+                    else:
+                        if current is not None:
+                            logger.warning(f"索引 {index.name} 无效（上次创建中断），重新创建")
+                            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                        conn.execute(text(re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX CONCURRENTLY ", ddl)))
+                    logger.info(f"已创建索引: {index.name}")
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
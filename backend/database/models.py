@@ -1,8 +1,8 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Float, JSON, Table
+from sqlalchemy import Boolean, Column, Integer, BigInteger, String, DateTime, Date, ForeignKey, Float, JSON, Table, UniqueConstraint, Index, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import sessionmaker, relationship, deferred
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 
 from backend.database.database import Base, engine
 
@@ -15,12 +15,13 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
-    hashed_password = Column(String, nullable=False)
+    # 认证以外很少用到的列延迟加载，每次请求加载当前用户时不读取
+    hashed_password = deferred(Column(String, nullable=False))
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    avatar = Column(String, nullable=True)
+    avatar = deferred(Column(String, nullable=True))  # 头像内容哈希，图片存放在头像存储中
     
     # 关系
     user_profile = relationship("UserProfile", back_populates="user", uselist=False)
@@ -71,16 +72,23 @@ class UserStatistics(Base):
     user = relationship("User", back_populates="statistics")
 
 class UserLearningHistory(Base):
+    """按 created_at 以月为单位做范围分区，分区由 backend.database.partitions 维护"""
     __tablename__ = "user_learning_history"
+    __table_args__ = (
+        # 最近学习历史按 (用户, 时间) 倒序读取，每个分区各自建索引
+        Index("ix_user_learning_history_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    # 分区表的主键必须包含分区键，复合主键下需要显式声明自增
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     activity_type = Column(String, nullable=False)  # 例如：阅读、听力、词汇学习
     title = Column(String)
     language = Column(String)
     level = Column(String)
     duration = Column(Integer)  # 以分钟为单位
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     # 关系
     user = relationship("User", back_populates="learning_history")
@@ -101,3 +109,176 @@ class UserVocabulary(Base):
     
     # 关系
     user = relationship("User", back_populates="vocabulary")
+    
+    __table_args__ = (
+        # 查词快速路径按 (用户, 小写单词) 查找生词本
+        Index("ix_user_vocabulary_user_word", user_id, func.lower(word)),
+    )
+
+class UserDailyActivity(Base):
+    """按用户、日期、语言汇总的学习数据，供热力图和周/月统计使用"""
+    __tablename__ = "user_daily_activity"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "language", name="uq_user_daily_activity"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    language = Column(String, nullable=False, default="")  # 空字符串表示未指定语言
+    study_time = Column(Integer, default=0)  # 以分钟为单位
+    words_learned = Column(Integer, default=0)
+    articles_read = Column(Integer, default=0)
+    activities = Column(Integer, default=0)  # 学习活动次数
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class BackgroundJob(Base):
+    """持久化的后台任务队列，worker 以 FOR UPDATE SKIP LOCKED 方式领取"""
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # 领取任务时按状态、优先级和可执行时间查找
+        Index("ix_background_jobs_claim", "status", "kind", "priority", "run_at"),
+        Index("ix_background_jobs_user", "user_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    kind = Column(String, nullable=False)  # 任务类型，对应已注册的处理函数
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed, cancelled
+    priority = Column(Integer, nullable=False, default=0)  # 数值越大越先执行
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # 重试时推迟执行
+    locked_by = Column(String, nullable=True)  # 正在执行的 worker
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # 租约到期后视为 worker 已退出
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    progress = Column(Float, nullable=False, default=0.0)  # 0-1
+    progress_message = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class TokenUsage(Base):
+    """大模型 token 用量流水，每次调用一行，批量写入"""
+    __tablename__ = "token_usage"
+    __table_args__ = (
+        Index("ix_token_usage_user_created", "user_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # 未登录用户为空
+    source = Column(String, nullable=False)  # chat 或后台任务类型
+    model = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)  # 命中上下文缓存的输入 token
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class TranslationMemory(Base):
+    """句子级翻译记忆，按 (源语言, 目标语言, 规范化句子的哈希) 查找，跨用户复用"""
+    __tablename__ = "translation_memory"
+    __table_args__ = (
+        UniqueConstraint("source_language", "target_language", "segment_hash", name="uq_translation_memory_segment"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    source_language = Column(String, nullable=False)  # auto 表示由模型识别
+    target_language = Column(String, nullable=False)
+    segment_hash = Column(String(64), nullable=False)  # 规范化句子的 SHA-256
+    source_text = Column(String, nullable=False)
+    translation = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    hits = Column(Integer, nullable=False, default=0)  # 命中次数，用于清理很少使用的条目
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WordEnrichment(Base):
+    """单词的释义、例句和用法说明，按 (语言, 释义语言, 规范化单词) 跨用户共享，常见词只需生成一次"""
+    __tablename__ = "word_enrichments"
+    __table_args__ = (
+        UniqueConstraint("language", "gloss_language", "word_key", name="uq_word_enrichments_word"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    language = Column(String, nullable=False)
+    gloss_language = Column(String, nullable=False)
+    word_key = Column(String, nullable=False)  # NFKC 规范化并转小写后的单词
+    translation = Column(String, nullable=False)
+    example = Column(String, nullable=False)
+    notes = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class QuizExercise(Base):
+    """预先生成并校验过的练习题，按 (语言, 级别, 主题) 组成题库"""
+    __tablename__ = "quiz_exercises"
+    __table_args__ = (
+        UniqueConstraint("language", "level", "topic", "content_hash", name="uq_quiz_exercises_content"),
+        Index("ix_quiz_exercises_pool", "language", "level", "topic", "active"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    language = Column(String, nullable=False)
+    level = Column(String, nullable=False)  # CEFR 级别
+    topic = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # multiple_choice 或 fill_blank
+    question = Column(String, nullable=False)
+    options = Column(JSON, nullable=True)  # 选择题的选项
+    answer = Column(String, nullable=False)
+    explanation = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=False)  # 题干和答案的哈希，用于去重
+    active = Column(Boolean, nullable=False, default=True)  # 发现有问题的题目下线而不删除
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UserQuizSeen(Base):
+    """用户做过的题目，出题时排除，保证不重复"""
+    __tablename__ = "user_quiz_seen"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    exercise_id = Column(Integer, ForeignKey("quiz_exercises.id"), primary_key=True)
+    seen_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ChatTranscript(Base):
+    """登录用户的辅导对话记录"""
+    __tablename__ = "chat_transcripts"
+    __table_args__ = (
+        Index("ix_chat_transcripts_user_created", "user_id", "created_at"),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    language = Column(String, nullable=True)
+    mode = Column(String, nullable=True)
+    message = Column(String, nullable=False)
+    response = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SearchDocument(Base):
+    """
+    全文检索文档：学习历史和对话记录写入时同步写入一条，
+    search_vector 由应用按语言分词（中日韩文本切成单字和二元组）后生成
+    """
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        # 按用户过滤和全文匹配走同一个 GIN 索引（需要 btree_gin 扩展）
+        Index("ix_search_documents_user_vector", "user_id", "search_vector", postgresql_using="gin"),
+        Index("ix_search_documents_user_created", "user_id", "created_at"),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(String, nullable=False)  # history 或 chat
+    source_id = Column(BigInteger, nullable=True)  # 对话记录的 id
+    language = Column(String, nullable=True)
+    title = Column(String, nullable=True)
+    content = Column(String, nullable=True)
+    search_vector = Column(TSVECTOR, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gin"))
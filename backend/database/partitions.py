@@ -0,0 +1,169 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.database.database import MAINTENANCE_LOCK_KEY, engine
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "user_learning_history"
+
+_PARTITION_SUFFIX = re.compile(r"_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _split(table: str) -> Tuple[Optional[str], str]:
+    schema, _, name = table.rpartition(".")
+    return schema or None, name
+
+
+def _partition_month(name: str) -> Optional[date]:
+    match = _PARTITION_SUFFIX.search(name)
+    if not match:
+        return None
+    return date(int(match.group("year")), int(match.group("month")), 1)
+
+
+def is_partitioned(conn: Connection, table: str = HISTORY_TABLE) -> bool:
+    return bool(conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar())
+
+
+def list_partitions(conn: Connection, table: str = HISTORY_TABLE) -> List[Tuple[str, date]]:
+    """返回已挂载的月份分区（带 schema 的表名, 月份），按月份排序"""
+    rows = conn.execute(text("""
+        SELECT child.oid::regclass::text
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": table})
+    partitions = [(name, _partition_month(name)) for (name,) in rows]
+    return sorted((item for item in partitions if item[1] is not None), key=lambda item: item[1])
+
+
+def list_detached(conn: Connection, table: str = HISTORY_TABLE) -> List[str]:
+    """已解除挂载但尚未归档的分区（上次归档中断时会留下）"""
+    schema, name = _split(table)
+    rows = conn.execute(text("""
+        SELECT c.oid::regclass::text
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND NOT c.relispartition
+          AND n.nspname = COALESCE(:schema, current_schema())
+          AND c.relname ~ ('^' || :name || '_p[0-9]{6}$')
+    """), {"schema": schema, "name": name})
+    return sorted(row[0] for row in rows)
+
+
+def create_partition(conn: Connection, table: str, month: date) -> bool:
+    """创建 month 所在月份的分区（UTC 月初为边界），已存在时返回 False"""
+    name = partition_name(table, month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')"
+    ))
+    return True
+
+
+def ensure_partitions(conn: Connection, first: date, last: date, table: str = HISTORY_TABLE) -> List[str]:
+    """确保 first 到 last（含）之间每个月都有分区，返回新建的分区名"""
+    created = []
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        with conn.begin():
+            if create_partition(conn, table, month):
+                created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive_table(conn: Connection, name: str, archive_dir: Path) -> Path:
+    """把已解除挂载的分区导出为 gzip 压缩的 CSV，写入完成后删除该表"""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{_split(name)[1]}.csv.gz"
+    temporary = path.with_suffix(".gz.tmp")
+    cursor = conn.connection.cursor()
+    try:
+        with gzip.open(temporary, "wt", encoding="utf-8", newline="") as f:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        with open(temporary, "rb") as f:
+            os.fsync(f.fileno())
+        temporary.replace(path)
+    finally:
+        cursor.close()
+    with conn.begin():
+        conn.execute(text(f"DROP TABLE {name}"))
+    return path
+
+
+def apply_retention(conn: Connection, retention_months: int, archive_dir: Path, today: date,
+                    table: str = HISTORY_TABLE) -> List[str]:
+    """
+    解除挂载早于保留期的分区并归档删除；解除挂载单独提交，
+    导出期间不锁住主表，中断后留下的独立表在下次执行时继续归档
+    """
+    cutoff = add_months(month_start(today), -retention_months)
+    for name, month in list_partitions(conn, table):
+        if month < cutoff:
+            with conn.begin():
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            logger.info(f"已解除分区挂载: {name}")
+
+    archived = []
+    for name in list_detached(conn, table):
+        path = archive_table(conn, name, archive_dir)
+        archived.append(name)
+        logger.info(f"分区已归档并删除: {name} -> {path}")
+    return archived
+
+
+def maintain_history_partitions(bind: Engine = engine, retention: bool = True,
+                                today: Optional[date] = None) -> Dict[str, Any]:
+    """预建当前及未来几个月的分区，并按保留期归档旧分区；学习历史表未分区时什么也不做"""
+    today = today or datetime.now(timezone.utc).date()
+    with bind.connect() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar():
+            return {"partitioned": True, "skipped": True}
+        try:
+            current = month_start(today)
+            created = ensure_partitions(conn, current, add_months(current, settings.HISTORY_PARTITION_PREMAKE_MONTHS))
+            archived = []
+            if retention and settings.HISTORY_RETENTION_MONTHS > 0:
+                archived = apply_retention(conn, settings.HISTORY_RETENTION_MONTHS,
+                                           Path(settings.HISTORY_ARCHIVE_DIR), today)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+    if created:
+        logger.info(f"已创建学习历史分区: {', '.join(created)}")
+    return {"partitioned": True, "created": created, "archived": archived}
+
+
+history_partition_maintainer = PeriodicTask(
+    "history-partitions", maintain_history_partitions, settings.HISTORY_PARTITION_CHECK_INTERVAL, run_on_stop=False
+)
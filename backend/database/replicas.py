@@ -0,0 +1,169 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 备库回放延迟：WAL 已全部回放时视为 0，否则为最后回放事务距今的秒数
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, pool_pre_ping=True, connect_args={"connect_timeout": 3})
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        # 不暴露密码
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def in_use(self) -> int:
+        return self.engine.pool.checkedout()
+
+
+class ReplicaRouter:
+    """
+    只读会话路由：在健康且延迟不超过阈值的备库之间轮询或选择连接数最少的一个，
+    没有可用备库时回退到主库
+    """
+
+    def __init__(self, urls: List[str], strategy: str, max_lag: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(["replica", "primary", "sticky", "fallback"], 0)
+
+    def _available(self) -> List[Replica]:
+        return [replica for replica in self.replicas
+                if replica.healthy and (replica.lag is None or replica.lag <= self.max_lag)]
+
+    def choose(self) -> Optional[Replica]:
+        candidates = self._available()
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=Replica.in_use)
+        return candidates[next(self._counter) % len(candidates)]
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def session(self, use_primary: bool = False) -> Session:
+        """
+        创建只读会话；use_primary 为 True（刚写入过的用户）时直接使用主库。
+        备库连接失败时标记为不健康并回退到主库
+        """
+        if use_primary:
+            self._count("sticky")
+            return SessionLocal()
+        replica = self.choose()
+        if replica is None:
+            self._count("primary")
+            return SessionLocal()
+        db = replica.session_factory()
+        try:
+            # 提前取得连接，连接失败时可以立即回退
+            db.connection()
+        except SQLAlchemyError as e:
+            db.close()
+            self.mark_unhealthy(replica, str(e))
+            self._count("fallback")
+            return SessionLocal()
+        self._count("replica")
+        return db
+
+    def mark_unhealthy(self, replica: Replica, error: str) -> None:
+        if replica.healthy:
+            logger.warning(f"备库不可用，回退到主库: {replica.name}: {error}")
+        replica.healthy = False
+        replica.error = error
+
+    def check_health(self) -> None:
+        """检查每个备库的连通性和复制延迟"""
+        for replica in self.replicas:
+            started = time.perf_counter()
+            try:
+                with replica.engine.connect() as conn:
+                    lag = float(conn.execute(LAG_SQL).scalar() or 0)
+            except SQLAlchemyError as e:
+                self.mark_unhealthy(replica, str(e))
+                continue
+            if not replica.healthy:
+                logger.info(f"备库已恢复: {replica.name}")
+            if lag > self.max_lag and (replica.lag is None or replica.lag <= self.max_lag):
+                logger.warning(f"备库延迟 {lag:.1f}s 超过阈值，暂不使用: {replica.name}")
+            replica.healthy = True
+            replica.error = None
+            replica.lag = lag
+            logger.debug(f"备库健康检查: {replica.name} 延迟 {lag:.2f}s, 耗时 {time.perf_counter() - started:.3f}s")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "strategy": self.strategy,
+            "maxLag": self.max_lag,
+            "replicas": [
+                {"url": replica.name, "healthy": replica.healthy, "lag": replica.lag,
+                 "inUse": replica.in_use(), "error": replica.error}
+                for replica in self.replicas
+            ],
+            **self.counters,
+        }
+
+
+class RecentWrites:
+    """记录最近写入过的用户，在 window 秒内该用户的读请求走主库（读己之写）"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._until: Dict[str, float] = {}
+
+    def mark(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._until[key] = now + self.window
+            if len(self._until) > 10000:
+                # 清理已过期的记录
+                self._until = {k: until for k, until in self._until.items() if until > now}
+
+    def is_recent(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            until = self._until.get(key)
+        return until is not None and until > time.monotonic()
+
+
+replica_router = ReplicaRouter(
+    [url.strip() for url in settings.DATABASE_REPLICA_URIS.split(",") if url.strip()],
+    strategy=settings.REPLICA_SELECTION,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+)
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+replica_health_checker = PeriodicTask(
+    "replica-health", replica_router.check_health, settings.REPLICA_HEALTH_INTERVAL, run_on_stop=False
+)
@@ -1,6 +1,6 @@
-from typing import Optional, List, Dict
-from datetime import datetime
-from pydantic import BaseModel, EmailStr
+from typing import Any, Optional, List, Dict
+from datetime import date, datetime
+from pydantic import BaseModel, EmailStr, Field
 
 # 共享属性
 class UserBase(BaseModel):
@@ -212,4 +212,90 @@ class UserHistoryResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+# 学习活动记录请求
+class ActivityCreate(BaseModel):
+    activity_type: str
+    title: Optional[str] = None
+    language: Optional[str] = None
+    level: Optional[str] = None
+    duration: Optional[int] = Field(0, ge=0, le=1440)  # 以分钟为单位，单条记录不超过一天
+    words_learned: int = Field(0, ge=0, le=1000)
+    articles_read: int = Field(0, ge=0, le=100)
+
+
+# 学习时长心跳请求
+class StudyPing(BaseModel):
+    minutes: int = Field(1, ge=1, le=60)
+    language: Optional[str] = None
+
+
+# 每日学习汇总（热力图）
+class DailyActivityResponse(BaseModel):
+    date: date
+    studyTime: int = 0
+    wordsLearned: int = 0
+    articlesRead: int = 0
+    activities: int = 0
+
+
+# 按周/月聚合的学习汇总
+class PeriodActivityResponse(BaseModel):
+    periodStart: date
+    studyTime: int = 0
+    wordsLearned: int = 0
+    articlesRead: int = 0
+    activities: int = 0
+
+
+# 难度评估请求
+class DifficultyRequest(BaseModel):
+    text: str = Field(..., max_length=20000)
+    language: str
+    learnerLevel: Optional[str] = None
+
+
+# 提交后台任务请求
+class JobCreate(BaseModel):
+    kind: str
+    payload: Dict[str, Any] = {}
+    priority: int = Field(0, ge=-10, le=10)  # 普通用户的优先级不能高于 0
+
+
+# 后台任务状态
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    progress: float
+    progress_message: Optional[str] = None
+    payload: Dict[str, Any] = {}
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+# 翻译请求
+class TranslateRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=100000)
+    target_language: str = Field(..., min_length=1, max_length=32)
+    source_language: str = Field("auto", min_length=1, max_length=32)
+
+
+# 练习题作答
+class QuizAnswer(BaseModel):
+    exerciseId: int
+    answer: str = Field(..., max_length=200)
+
+
+class QuizSubmission(BaseModel):
+    answers: List[QuizAnswer] = Field(..., min_items=1, max_items=50)
@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import os
 import logging
 from openai import OpenAI  # 使用OpenAI库来调用DeepSeek API
@@ -14,12 +14,37 @@ import httpx
 import asyncio
 from pathlib import Path
 import datetime
+import time
+from http.cookies import SimpleCookie
+from jose import jwt
 
 from backend.core.config import settings
+from backend.core.profiling import loop_lag_monitor, sampling_profiler
+from backend.core.responses import CompressionMiddleware, ORJSONResponse
 from backend.api.auth import router as auth_router
 from backend.api.users import router as users_router
-from backend.database.database import Base, engine
+from backend.database.database import Base, engine, ensure_indexes, get_db
+from backend.database.partitions import history_partition_maintainer, maintain_history_partitions
+from backend.database.replicas import recent_writes, replica_health_checker, replica_router
 from backend.api.api_v1.api import api_router
+from backend.services.activity import activity_flusher
+from backend.services.analytics import analytics_refresher, analytics_store
+from backend.services.jobs import job_pool
+from backend.services.leaderboards import leaderboard_rebuilder
+import backend.services.job_handlers  # noqa: F401  注册后台任务处理函数
+from backend.services.dictionary import answer_word_query
+from backend.services.recommendations import recommendation_refresher
+from backend.services.provisioning import password_hasher
+from backend.services.search import record_chat
+from backend.services.difficulty import difficulty_estimator, resolve_learner_level
+from backend.services.similarity_cache import similarity_cache
+from backend.services.tokens import CHAT_MODES, token_estimator
+from backend.services.upstreams import UpstreamError, llm_upstreams
+from backend.services.usage import usage_flusher, usage_ledger
+from backend.api.dependencies import get_client_ip, get_current_active_superuser, get_current_user_optional
+from backend.database.models import User as DBUser
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -46,11 +71,15 @@ logger.info(f"DeepSeek客户端初始化完成，使用base_url: {api_base}/v1")
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
+# 学习历史是分区表，写入前必须已有当月分区；归档旧分区留给后台任务
+maintain_history_partitions(retention=False)
 
 # 初始化 FastAPI 应用
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # 设置CORS
@@ -71,6 +100,7 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 class ChatMessage(BaseModel):
     message: str
     language: str = "chinese"  # 添加默认值
+    mode: str = Field("chat", regex=f"^({'|'.join(CHAT_MODES)})$")  # 决定回复长度上限
 
 # 创建一个HTTP请求拦截器
 class HTTPRequestLoggingMiddleware:
@@ -103,9 +133,102 @@ class HTTPRequestLoggingMiddleware:
             # 重新抛出异常，让FastAPI的异常处理器处理
             raise
 
+# 读己之写：用户写入后的短时间内，其读请求走主库而不是可能有延迟的备库
+class ReadYourWritesMiddleware:
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+    COOKIE_NAME = "primary_until"
+    
+    def __init__(self, app):
+        self.app = app
+    
+    @staticmethod
+    def _subject(headers: dict) -> Optional[str]:
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not authorization.lower().startswith("bearer "):
+            return None
+        try:
+            # 只用于选择数据库，不需要校验签名
+            return str(jwt.get_unverified_claims(authorization[7:]).get("sub"))
+        except Exception:
+            return None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_router.replicas:
+            return await self.app(scope, receive, send)
+        
+        headers = dict(scope.get("headers") or [])
+        subject = self._subject(headers)
+        # 多进程部署时内存记录只在本进程有效，同时用 cookie 把期限带给其他进程
+        cookie = SimpleCookie(headers.get(b"cookie", b"").decode("latin-1"))
+        try:
+            cookie_until = float(cookie[self.COOKIE_NAME].value) if self.COOKIE_NAME in cookie else 0.0
+        except ValueError:
+            cookie_until = 0.0
+        scope.setdefault("state", {})["use_primary"] = recent_writes.is_recent(subject) or cookie_until > time.time()
+        
+        if scope.get("method") in self.SAFE_METHODS:
+            return await self.app(scope, receive, send)
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message.get("status", 500) < 400:
+                if subject:
+                    recent_writes.mark(subject)
+                window = int(recent_writes.window) + 1
+                set_cookie = f"{self.COOKIE_NAME}={time.time() + window:.0f}; Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", set_cookie.encode("latin-1"))]}
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+
 # 添加中间件
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE,
+                       gzip_level=settings.COMPRESSION_GZIP_LEVEL, brotli_quality=settings.COMPRESSION_BROTLI_QUALITY)
+app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(HTTPRequestLoggingMiddleware)
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """启动后台任务"""
+    await llm_upstreams.start()
+    if settings.LOOP_LAG_MONITOR_ENABLED:
+        loop_lag_monitor.start()
+    activity_flusher.start()
+    usage_flusher.start()
+    usage_flusher.trigger()  # 启动时立即从数据库加载本月用量
+    if replica_router.replicas:
+        replica_health_checker.start()
+        replica_health_checker.trigger()
+    if settings.JOB_WORKERS_ENABLED:
+        job_pool.start()
+    history_partition_maintainer.start()
+    history_partition_maintainer.trigger()
+    analytics_store.load_latest()  # 已有快照时立即可用，过期的在后台重建
+    analytics_refresher.start()
+    analytics_refresher.trigger()
+    if settings.RECOMMEND_ENABLED:
+        recommendation_refresher.start()
+        recommendation_refresher.trigger()  # 启动后立即在后台构建推荐索引
+    if settings.LEADERBOARD_ENABLED:
+        leaderboard_rebuilder.start()
+        leaderboard_rebuilder.trigger()  # 启动后立即从数据库构建排行榜
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """停止后台任务，并把缓冲中的数据写入数据库"""
+    await job_pool.stop()
+    await activity_flusher.stop()
+    await usage_flusher.stop()
+    await replica_health_checker.stop()
+    await history_partition_maintainer.stop()
+    await analytics_refresher.stop()
+    await recommendation_refresher.stop()
+    await leaderboard_rebuilder.stop()
+    await llm_upstreams.aclose()
+    password_hasher.shutdown()
+    sampling_profiler.stop()
+    await loop_lag_monitor.stop()
+
 @app.get("/test")
 def test_endpoint():
     return {"status": "ok", "message": "API服务正常运行"}
@@ -115,7 +238,7 @@ async def test_deepseek_connection():
     try:
         # 尝试一个简单的API调用
         response = client.chat.completions.create(
-            model="deepseek-chat",  # 使用DeepSeek的模型
+            model=settings.LLM_MODEL,  # 使用DeepSeek的模型
             messages=[{"role": "user", "content": "Hello"}],
             max_tokens=10
         )
@@ -144,7 +267,7 @@ async def test_models():
                 logger.info("Models端点不存在，尝试使用chat/completions端点")
                 
                 # 构建一个简单的请求来测试模型
-                test_models = ["deepseek-chat", "deepseek-coder"]
+                test_models = [settings.LLM_MODEL, "deepseek-coder"]
                 results = {}
                 
                 for model in test_models:
@@ -180,117 +303,168 @@ async def test_models():
         logger.error(f"测试模型失败: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+def _build_reply(cleaned_response: str, chat_input: ChatMessage, learner_level: Optional[str],
+                 cache_namespace: Optional[tuple] = None, truncated: bool = False) -> dict:
+    """构建聊天响应，附上回复难度评估（超出学习者水平时标记 tooHard），并写入相似问题缓存"""
+    reply = {"response": cleaned_response, "status": "success"}
+    if truncated:
+        reply["truncated"] = True
+    difficulty = difficulty_estimator.assess_reply(cleaned_response, chat_input.language, learner_level)
+    if difficulty is not None:
+        reply["difficulty"] = difficulty
+        if difficulty.get("tooHard"):
+            logger.info(f"回复难度 {difficulty['level']} 超出学习者水平 {learner_level}")
+    if cache_namespace is not None:
+        similarity_cache.store(cache_namespace, chat_input.message, reply)
+    return reply
+
+async def _save_transcript(db: Session, current_user: Optional[DBUser], chat_input: ChatMessage, reply: dict) -> None:
+    """登录用户的对话写入对话记录和全文检索；保存失败不影响回复"""
+    if current_user is None:
+        return
+    try:
+        await run_in_threadpool(record_chat, db, current_user.id, chat_input.language, chat_input.mode,
+                                chat_input.message, reply["response"])
+    except Exception as e:
+        db.rollback()
+        logger.error(f"保存对话记录失败: {str(e)}")
+
 # 修改chat接口的实现
 @app.post("/api/chat")
-async def chat_with_ai(chat_input: ChatMessage):
+async def chat_with_ai(
+    chat_input: ChatMessage,
+    client: Optional[str] = Depends(get_client_ip),
+    db: Session = Depends(get_db),
+    current_user: Optional[DBUser] = Depends(get_current_user_optional)
+):
+    # 在调用大模型之前检查输入长度，超长输入直接拒绝或截断
+    try:
+        user_message, input_tokens, truncated = token_estimator.apply_input_budget(
+            chat_input.message, settings.CHAT_MAX_INPUT_TOKENS, settings.CHAT_INPUT_OVERFLOW
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if truncated:
+        logger.info(f"输入超出预算，已截断为约 {input_tokens} 个 token")
+    
     try:
         # 打印客户端配置信息
         logger.info(f"收到聊天请求: {chat_input.message}")
         logger.info(f"选择语言: {chat_input.language}")
         
-        # 打印API密钥信息（不显示完整密钥）
-        if api_key:
-            masked_key = api_key[:4] + "..." + api_key[-4:] if len(api_key) > 8 else "***"
-            logger.info(f"API密钥状态: 已配置 (前缀: {masked_key})")
-        else:
+        # 简单查词请求优先使用本地生词本和词典，不调用大模型
+        if settings.DICTIONARY_ENABLED:
+            local_answer = await run_in_threadpool(
+                answer_word_query, chat_input.message, chat_input.language, db, current_user
+            )
+            if local_answer is not None:
+                logger.info(f"本地查词命中: {local_answer['entry']['word']} ({local_answer['source']})")
+                return local_answer
+        
+        if not llm_upstreams.configured:
             logger.warning("API密钥状态: 未配置")
             return {"response": "API密钥未配置，请联系管理员", "status": "error"}
         
-        # 构建消息
-        messages = [
-            {
-                "role": "system",
-                "content": """你是一位专业的语言教师。请按照以下方式回复：
+        # 确定学习者水平，写入系统提示
+        learner_level = await run_in_threadpool(
+            resolve_learner_level, db, current_user, chat_input.language, chat_input.message
+        )
+        system_prompt = """你是一位专业的语言教师。请按照以下方式回复：
 1. 如果用户用中文提问，用中文回答；如果用户使用其他语言，用对应语言回答
 2. 保持专业性和准确性
 3. 根据用户水平调整内容难度
 4. 如果需要思考，请将思考过程放在<think></think>标签中"""
+        if learner_level:
+            system_prompt += f"\n5. 学习者当前的{chat_input.language}水平为 {learner_level}（CEFR），示例和解释请使用该水平能理解的词汇和句式"
+        
+        # 相似问题缓存：同一语言、水平和模式下措辞略有不同的重复提问直接复用回答
+        cache_namespace = (chat_input.language.lower(), learner_level, chat_input.mode)
+        use_cache = settings.SIMILARITY_CACHE_ENABLED and len(chat_input.message) <= settings.SIMILARITY_CACHE_MAX_PROMPT
+        if use_cache:
+            cached_reply = similarity_cache.lookup(cache_namespace, chat_input.message)
+            if cached_reply is not None:
+                logger.info("相似问题缓存命中")
+                await _save_transcript(db, current_user, chat_input, cached_reply)
+                return {**cached_reply, "source": "cache"}
+        
+        # 配额检查只读取内存中的累计用量，未登录时按 IP 使用更低的配额
+        if current_user is not None:
+            quota_error = usage_ledger.check_quota(current_user.id)
+        elif not usage_ledger.anonymous_daily_quota:
+            raise HTTPException(status_code=401, detail="请登录后使用")
+        else:
+            quota_error = usage_ledger.check_anonymous_quota(client)
+        if quota_error:
+            raise HTTPException(status_code=429, detail=quota_error)
+        
+        # 构建消息
+        messages = [
+            {
+                "role": "system",
+                "content": system_prompt
             },
             {
                 "role": "user",
-                "content": chat_input.message
+                "content": user_message
             }
         ]
+        prompt_tokens = token_estimator.count_messages(messages)
+        max_tokens = token_estimator.plan_max_tokens(chat_input.mode, input_tokens, prompt_tokens)
+        logger.info(f"估算输入 {prompt_tokens} 个 token，max_tokens={max_tokens}")
         
-        # 尝试使用直接HTTP请求，避免使用客户端库可能导致的问题
+        # 由上游池选择预计最快的上游，失败时换下一个上游重试
         try:
-            logger.info("使用直接HTTP请求调用DeepSeek API...")
-            
-            async with httpx.AsyncClient() as http_client:
-                response = await http_client.post(
-                    f"{api_base}/v1/chat/completions",
-                    json={
-                        "model": "deepseek-chat",
-                        "messages": messages,
-                        "temperature": 0.7,
-                        "max_tokens": 2000
-                    },
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    timeout=30.0
-                )
-                
-                logger.info(f"API响应状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data["choices"][0]["message"]["content"]
-                    
-                    # 移除思维链内容
-                    cleaned_response = re.sub(r'<think>.*?</think>', '', ai_response, flags=re.DOTALL)
-                    cleaned_response = cleaned_response.strip()
-                    
-                    logger.info(f"处理后的响应: {cleaned_response[:100]}...")
-                    
-                    return {"response": cleaned_response, "status": "success"}
-                else:
-                    error_message = f"API错误: {response.status_code} {response.text}"
-                    logger.error(error_message)
-                    return {"response": error_message, "status": "error"}
-                    
-        except Exception as http_error:
-            logger.error(f"HTTP请求错误: {str(http_error)}")
-            
-            # 尝试使用OpenAI客户端库
-            try:
-                logger.info("尝试使用OpenAI客户端库...")
-                
-                # 使用DeepSeek模型
-                chat_completion = client.chat.completions.create(
-                    model="deepseek-chat",  # 使用DeepSeek的模型
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                
-                logger.info("API调用成功")
-                
-                # 获取响应
-                ai_response = chat_completion.choices[0].message.content
-                logger.info(f"原始响应: {ai_response[:100]}...")
-                
-                # 移除思维链内容
-                cleaned_response = re.sub(r'<think>.*?</think>', '', ai_response, flags=re.DOTALL)
-                cleaned_response = cleaned_response.strip()
-                
-                logger.info(f"处理后的响应: {cleaned_response[:100]}...")
-                
-                return {"response": cleaned_response, "status": "success"}
-                
-            except Exception as api_error:
-                logger.error(f"API调用错误: {str(api_error)}")
-                # 添加更详细的错误信息
-                error_details = traceback.format_exc()
-                logger.error(f"详细错误信息: {error_details}")
-                
-                return {"response": f"AI服务调用失败: {str(http_error)}\nAPI调用失败: {str(api_error)}", "status": "error"}
+            data = await llm_upstreams.acomplete(
+                {"messages": messages, "temperature": 0.7, "max_tokens": max_tokens},
+                timeout=30.0
+            )
+        except UpstreamError as upstream_error:
+            logger.error(f"API调用错误: {str(upstream_error)}")
+            return {"response": f"AI服务调用失败: {str(upstream_error)}", "status": "error"}
+        
+        ai_response = data["choices"][0]["message"]["content"]
+        token_estimator.record_usage(chat_input.mode, prompt_tokens, data.get("usage"), max_tokens,
+                                     data["choices"][0].get("finish_reason"), len(messages))
+        usage_ledger.record(current_user.id if current_user else None, "chat",
+                            data.get("model", settings.LLM_MODEL), data.get("usage"), client)
+        
+        # 移除思维链内容
+        cleaned_response = re.sub(r'<think>.*?</think>', '', ai_response, flags=re.DOTALL)
+        cleaned_response = cleaned_response.strip()
+        
+        logger.info(f"处理后的响应: {cleaned_response[:100]}...")
+        
+        reply = _build_reply(cleaned_response, chat_input, learner_level,
+                             cache_namespace if use_cache else None, truncated)
+        await _save_transcript(db, current_user, chat_input, reply)
+        return reply
             
+    except HTTPException:
+        raise
     except Exception as outer_e:
         logger.error(f"未预期的错误: {str(outer_e)}", exc_info=True)
         return {"response": f"服务器错误: {str(outer_e)}", "status": "error"}
 
+@app.get("/api/chat/cache-stats")
+def chat_cache_stats(current_user: DBUser = Depends(get_current_active_superuser)):
+    """相似问题缓存的命中率和误命中抽检统计"""
+    return similarity_cache.stats()
+
+@app.get("/api/chat/token-stats")
+def chat_token_stats(current_user: DBUser = Depends(get_current_active_superuser)):
+    """token 估算误差、校准系数以及各模式的 max_tokens 使用情况"""
+    return token_estimator.stats()
+
+@app.get("/api/llm/upstreams")
+def llm_upstream_stats(current_user: DBUser = Depends(get_current_active_superuser)):
+    """各大模型上游的在途请求、延迟和错误率的滑动平均、限流与暂停状态"""
+    return llm_upstreams.stats()
+
+@app.get("/api/db/replicas")
+def database_replicas(current_user: DBUser = Depends(get_current_active_superuser)):
+    """备库健康状况、复制延迟和只读会话路由统计"""
+    return replica_router.stats()
+
 @app.get("/debug")
 def debug_info():
     """返回调试信息"""
@@ -323,7 +497,7 @@ async def test_endpoints():
                     response = await client.post(
                         endpoint,
                         json={
-                            "model": "deepseek-chat",
+                            "model": settings.LLM_MODEL,
                             "messages": [{"role": "user", "content": "Hello"}],
                             "max_tokens": 5
                         },
@@ -356,7 +530,7 @@ async def test_endpoints():
 async def test_models_list():
     """测试不同的模型"""
     models = [
-        "deepseek-chat",
+        settings.LLM_MODEL,
         "deepseek-coder",
         "deepseek-lite"
     ]
@@ -399,7 +573,7 @@ async def test_official_example():
     try:
         # 使用官方示例代码
         completion = client.chat.completions.create(
-            model="deepseek-chat",  # 使用DeepSeek的模型
+            model=settings.LLM_MODEL,  # 使用DeepSeek的模型
             messages=[
                 {"role": "system", "content": "You are a helpful assistant."},
                 {"role": "user", "content": "Hello!"}
@@ -442,7 +616,7 @@ async def test_network():
                     response = await client.post(
                         url,
                         json={
-                            "model": "deepseek-chat",
+                            "model": settings.LLM_MODEL,
                             "messages": [{"role": "user", "content": "Hello"}],
                             "max_tokens": 5
                         },
@@ -0,0 +1,31 @@
+"""
+从学习历史补建每日汇总表
+
+用法: python -m backend.scripts.backfill_rollups [--since 2024-01-01]
+"""
+import argparse
+from datetime import date
+
+from backend.core.config import settings
+from backend.crud import statistics
+from backend.database.database import Base, SessionLocal, engine
+from backend.database import models  # noqa: F401  确保模型已注册
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="从 user_learning_history 补建 user_daily_activity")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="只处理该日期之后的历史 (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        written = statistics.backfill_daily(db, settings.STATS_TIMEZONE, args.since)
+        db.commit()
+        print(f"补建完成: 写入或修复 {written} 条每日汇总")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+CRUD 层与接口查询的数据库性能测试
+
+对每个用例重复执行并统计延迟分位数，记录用例实际发出的 SELECT 语句，
+用 EXPLAIN (ANALYZE, BUFFERS) 获取执行计划，标记大表上的顺序扫描，
+并检查缺少索引的外键列。
+
+用法: python -m backend.scripts.benchmark_db --iterations 200 [--json plans.json]
+"""
+import argparse
+import json
+import random
+import statistics as stats
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, undefer
+
+from backend.api.users import get_user_history, get_user_profile
+from backend.crud import export, statistics, users
+from backend.database.database import SessionLocal, engine
+from backend.database.models import User, UserVocabulary
+from backend.scripts.seed_data import SEED_PASSWORD
+
+# 行数超过该值的表上出现顺序扫描时报警
+SEQ_SCAN_MIN_ROWS = 10000
+
+UNINDEXED_FOREIGN_KEYS_SQL = """
+    SELECT c.conrelid::regclass::text AS table_name, a.attname AS column_name
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.contype = 'f'
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_index i
+          WHERE i.indrelid = c.conrelid AND i.indkey[0] = c.conkey[1]
+      )
+    ORDER BY 1, 2
+"""
+
+
+def _cases() -> List[Tuple[str, Callable[[Session, User], Any]]]:
+    return [
+        ("crud.users.get", lambda db, user: users.get(db, id=user.id)),
+        ("crud.users.get_by_username", lambda db, user: users.get_by_username(db, username=user.username)),
+        ("crud.users.get_by_email", lambda db, user: users.get_by_email(db, email=user.email)),
+        ("crud.users.authenticate", lambda db, user: users.authenticate(db, username=user.username, password=SEED_PASSWORD)),
+        ("GET /users/profile", lambda db, user: get_user_profile(db, user)),
+        ("GET /users/history", lambda db, user: get_user_history(user, db)),
+        ("GET /statistics/heatmap", lambda db, user: statistics.get_daily(db, user.id, date.today() - timedelta(days=364))),
+        ("GET /export (history 首批)", lambda db, user: next(export.iter_section(db, user.id, "history", 1000), None)),
+        ("vocabulary 列表", lambda db, user: db.query(UserVocabulary)
+            .filter(UserVocabulary.user_id == user.id)
+            .order_by(UserVocabulary.created_at.desc()).limit(50).all()),
+    ]
+
+
+class StatementRecorder:
+    """记录执行期间发出的 SQL 语句"""
+
+    def __init__(self):
+        self.enabled = False
+        self.statements: List[Tuple[str, Any]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+
+def _walk_plan(node: Dict[str, Any], found: List[Dict[str, Any]]) -> None:
+    if node.get("Node Type") == "Seq Scan":
+        found.append({
+            "relation": node.get("Relation Name"),
+            "rows_removed": node.get("Rows Removed by Filter", 0),
+            "actual_rows": node.get("Actual Rows", 0),
+            "filter": node.get("Filter"),
+        })
+    for child in node.get("Plans", []):
+        _walk_plan(child, found)
+
+
+def _explain(statement: str, parameters: Any) -> Dict[str, Any]:
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0][0]
+        connection.rollback()
+        return plan
+    finally:
+        connection.close()
+
+
+def _table_rows() -> Dict[str, int]:
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT relname, n_live_tup FROM pg_stat_user_tables"))
+        return {name: count for name, count in rows}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    recorder = StatementRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+
+    db = SessionLocal()
+    try:
+        sample_ids = [row[0] for row in db.execute(
+            text("SELECT id FROM users TABLESAMPLE SYSTEM (1) LIMIT :n"), {"n": args.sample_users}
+        )] or [row[0] for row in db.execute(text("SELECT id FROM users LIMIT :n"), {"n": args.sample_users})]
+        if not sample_ids:
+            raise SystemExit("数据库中没有用户，请先运行 backend.scripts.seed_data")
+        # 用户对象会脱离会话使用，延迟加载的列需要提前读出
+        sample_users = db.query(User).options(undefer(User.avatar), undefer(User.hashed_password)) \
+            .filter(User.id.in_(sample_ids)).all()
+        db.expunge_all()
+    finally:
+        db.close()
+
+    table_rows = _table_rows()
+    report: Dict[str, Any] = {"cases": [], "unindexed_foreign_keys": []}
+
+    for name, case in _cases():
+        if args.only and args.only not in name:
+            continue
+        iterations = max(1, args.iterations // 20) if "authenticate" in name else args.iterations
+        timings = []
+        recorder.statements = []
+        db = SessionLocal()
+        try:
+            for i in range(iterations):
+                user = rng.choice(sample_users)
+                # 只记录第一次执行发出的语句
+                recorder.enabled = i == 0
+                started = time.perf_counter()
+                case(db, user)
+                timings.append((time.perf_counter() - started) * 1000)
+                recorder.enabled = False
+                db.rollback()
+                db.expire_all()
+        finally:
+            db.close()
+
+        plans, seq_scans = [], []
+        for statement, parameters in recorder.statements:
+            plan = _explain(statement, parameters)
+            found: List[Dict[str, Any]] = []
+            _walk_plan(plan["Plan"], found)
+            for scan in found:
+                if table_rows.get(scan["relation"], 0) >= SEQ_SCAN_MIN_ROWS:
+                    seq_scans.append(scan)
+            plans.append({"statement": statement, "plan": plan})
+
+        timings.sort()
+        result = {
+            "name": name,
+            "iterations": iterations,
+            "mean_ms": stats.mean(timings),
+            "p50_ms": timings[len(timings) // 2],
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            "seq_scans": seq_scans,
+            "plans": plans,
+        }
+        report["cases"].append(result)
+
+        print(f"{name:<32} n={iterations:<5} mean={result['mean_ms']:8.2f}ms p50={result['p50_ms']:8.2f}ms "
+              f"p95={result['p95_ms']:8.2f}ms p99={result['p99_ms']:8.2f}ms")
+        for scan in seq_scans:
+            print(f"    [顺序扫描] {scan['relation']} ({table_rows.get(scan['relation'], 0)} 行) "
+                  f"过滤条件: {scan['filter']}, 丢弃 {scan['rows_removed']} 行")
+
+    event.remove(engine, "before_cursor_execute", recorder)
+
+    with engine.connect() as conn:
+        for table_name, column_name in conn.execute(text(UNINDEXED_FOREIGN_KEYS_SQL)):
+            report["unindexed_foreign_keys"].append({"table": table_name, "column": column_name})
+            print(f"[缺少索引的外键] {table_name}.{column_name} ({table_rows.get(table_name, 0)} 行)")
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据库性能测试")
+    parser.add_argument("--iterations", type=int, default=200, help="每个用例的执行次数")
+    parser.add_argument("--sample-users", type=int, default=1000, help="随机抽样的用户数")
+    parser.add_argument("--only", default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--json", default=None, help="把完整结果和执行计划写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"执行计划已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
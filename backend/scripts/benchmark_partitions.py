@@ -0,0 +1,171 @@
+"""
+对比普通表与按月分区表上学习历史的写入和最近历史查询延迟
+
+在独立的 schema 中创建结构相同的两张表（普通表 / 按月范围分区），
+用 generate_series 在服务端生成相同分布的数据，然后分别测量：
+批量插入当月记录、最近 N 天窗口内的最近历史、不带时间窗口的最近历史，
+并用 EXPLAIN 统计每个查询实际访问的分区数。
+
+用法: python -m backend.scripts.benchmark_partitions --rows 5000000 --months 24 [--keep]
+"""
+import argparse
+import json
+import random
+import statistics as stats
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.database.database import engine
+from backend.database.partitions import add_months, ensure_partitions, month_start
+
+SCHEMA = "bench_partitions"
+TABLES = {"plain": f"{SCHEMA}.history_plain", "partitioned": f"{SCHEMA}.history_partitioned"}
+COLUMNS_DDL = """
+    id BIGSERIAL,
+    user_id INTEGER,
+    activity_type VARCHAR NOT NULL,
+    title VARCHAR,
+    language VARCHAR,
+    level VARCHAR,
+    duration INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+"""
+
+
+def _setup(conn: Connection, args: argparse.Namespace) -> None:
+    with conn.begin():
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"CREATE TABLE {TABLES['plain']} ({COLUMNS_DDL})"))
+        conn.execute(text(f"CREATE TABLE {TABLES['partitioned']} ({COLUMNS_DDL}) PARTITION BY RANGE (created_at)"))
+    today = datetime.now(timezone.utc).date()
+    ensure_partitions(conn, add_months(month_start(today), -args.months), add_months(month_start(today), 1),
+                      table=TABLES["partitioned"])
+
+    for kind, table in TABLES.items():
+        started = time.perf_counter()
+        with conn.begin():
+            conn.execute(text(f"""
+                INSERT INTO {table} (user_id, activity_type, title, language, level, duration, created_at)
+                SELECT (random() * :users)::int + 1,
+                       (ARRAY['reading', 'listening', 'vocabulary', 'chat', 'quiz'])[1 + (random() * 4)::int],
+                       'benchmark ' || g,
+                       (ARRAY['english', 'japanese', 'french', 'german'])[1 + (random() * 3)::int],
+                       'B1',
+                       (random() * 60)::int,
+                       now() - random() * make_interval(months => :months)
+                FROM generate_series(1, :rows) AS g
+            """), {"users": args.users, "months": args.months, "rows": args.rows})
+            conn.execute(text(f"CREATE INDEX ON {table} (user_id, created_at)"))
+        with conn.begin():
+            conn.execute(text(f"ANALYZE {table}"))
+        print(f"{kind:<12} 已生成 {args.rows} 行, {time.perf_counter() - started:.1f}s")
+
+
+def _measure(conn: Connection, iterations: int, case: Callable[[], Any]) -> Dict[str, float]:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        with conn.begin():
+            case()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": stats.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def _relations(node: Dict[str, Any], found: set) -> None:
+    if "Relation Name" in node:
+        found.add(node["Relation Name"])
+    for child in node.get("Plans", []):
+        _relations(child, found)
+
+
+def _scanned_relations(conn: Connection, statement: str, parameters: Dict[str, Any]) -> int:
+    plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + statement), parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    found: set = set()
+    _relations(plan[0]["Plan"], found)
+    return len(found)
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    results = []
+    with engine.connect() as conn:
+        if not args.skip_setup:
+            _setup(conn, args)
+
+        for kind, table in TABLES.items():
+            now = datetime.now(timezone.utc)
+            since = now - timedelta(days=args.window_days)
+            recent_sql = (f"SELECT * FROM {table} WHERE user_id = :user_id AND created_at >= :since "
+                          f"ORDER BY created_at DESC LIMIT 10")
+            unbounded_sql = f"SELECT * FROM {table} WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 10"
+            insert_sql = text(f"INSERT INTO {table} (user_id, activity_type, title, language, level, duration, created_at) "
+                              f"VALUES (:user_id, 'reading', 'insert', 'english', 'B1', 10, :created_at)")
+
+            def insert_batch():
+                rows = [{"user_id": rng.randint(1, args.users), "created_at": datetime.now(timezone.utc)}
+                        for _ in range(args.batch_size)]
+                conn.execute(insert_sql, rows)
+
+            def recent():
+                conn.execute(text(recent_sql), {"user_id": rng.randint(1, args.users), "since": since}).all()
+
+            def unbounded():
+                conn.execute(text(unbounded_sql), {"user_id": rng.randint(1, args.users)}).all()
+
+            sample = {"user_id": rng.randint(1, args.users), "since": since}
+            cases = [
+                (f"插入 {args.batch_size} 行", insert_batch, None),
+                (f"最近 {args.window_days} 天历史", recent, recent_sql),
+                ("最近历史（无时间窗口）", unbounded, unbounded_sql),
+            ]
+            for name, case, statement in cases:
+                result = {"table": kind, "case": name, **_measure(conn, args.iterations, case)}
+                if statement is not None:
+                    result["relations"] = _scanned_relations(conn, statement, sample)
+                results.append(result)
+                relations = f" 访问 {result['relations']} 个表/分区" if "relations" in result else ""
+                print(f"{kind:<12} {name:<24} mean={result['mean_ms']:8.2f}ms p50={result['p50_ms']:8.2f}ms "
+                      f"p95={result['p95_ms']:8.2f}ms{relations}")
+
+        if not args.keep:
+            with conn.begin():
+                conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="学习历史分区前后的性能对比")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="每张表生成的行数")
+    parser.add_argument("--users", type=int, default=20_000, help="用户数")
+    parser.add_argument("--months", type=int, default=24, help="数据覆盖的月数")
+    parser.add_argument("--window-days", type=int, default=90, help="最近历史查询的时间窗口（天）")
+    parser.add_argument("--iterations", type=int, default=300, help="每个用例的执行次数")
+    parser.add_argument("--batch-size", type=int, default=100, help="插入用例每批的行数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--skip-setup", action="store_true", help="复用上次 --keep 保留的数据")
+    parser.add_argument("--keep", action="store_true", help="结束后保留测试 schema")
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
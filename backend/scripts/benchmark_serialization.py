@@ -0,0 +1,150 @@
+"""
+各接口响应的序列化和压缩开销基准
+
+对每个接口构造与线上规模相当的返回值，分别测量：
+- default: FastAPI 默认路径（response_model 校验 + jsonable_encoder + json.dumps）
+- orjson: 默认响应类换成 ORJSONResponse 后的路径（校验 + jsonable_encoder + orjson）
+- direct: 处理函数直接返回 ORJSONResponse（只有 orjson）
+以及响应体在 gzip / br 下的大小和压缩耗时。不需要数据库。
+
+用法: python -m backend.scripts.benchmark_serialization [--iterations 2000] [--json results.json]
+"""
+import argparse
+import json
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+from backend.core.responses import ORJSONResponse, brotli
+from backend.database.schemas import (
+    DailyActivityResponse, PeriodActivityResponse, UserHistoryResponse, UserProfileResponse
+)
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _profile() -> Dict[str, Any]:
+    return {
+        "username": "learner", "email": "learner@example.com", "avatar": "/api/v1/avatars/abc/256",
+        "learningLanguages": ["english", "japanese"], "level": {"english": "B1", "japanese": "A2"},
+        "studyTime": 1234, "wordsLearned": 567, "articlesRead": 89,
+    }
+
+
+def _history(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"id": i, "activity_type": "reading", "title": f"Graded reader chapter {i}", "language": "english",
+         "level": "B1", "duration": 15, "created_at": NOW - timedelta(hours=i)}
+        for i in range(count)
+    ]
+
+
+def _heatmap(days: int) -> List[Dict[str, Any]]:
+    return [
+        {"date": date(2024, 6, 1) - timedelta(days=i), "studyTime": 30, "wordsLearned": 12, "articlesRead": 1,
+         "activities": 4}
+        for i in range(days)
+    ]
+
+
+def _monthly(months: int) -> List[Dict[str, Any]]:
+    return [
+        {"periodStart": date(2024 - i // 12, 12 - i % 12, 1), "studyTime": 900, "wordsLearned": 300,
+         "articlesRead": 20, "activities": 120}
+        for i in range(months)
+    ]
+
+
+def _chat_reply() -> Dict[str, Any]:
+    # 约 2000 token 的中英混合回复
+    paragraph = "这个句子使用了现在完成时。The present perfect connects the past with the present, for example: " \
+                "I have lived here for three years. 注意 for 和 since 的区别。\n"
+    return {
+        "response": paragraph * 28,
+        "status": "success",
+        "difficulty": {"level": "B1", "levelIndex": 3, "tokens": 420,
+                       "coverage": {"A1": 0.62, "A2": 0.8, "B1": 0.93, "B2": 0.97, "C1": 0.99, "C2": 1.0},
+                       "unknownRatio": 0.01, "hardWords": ["perfect", "connects"], "tooHard": False},
+    }
+
+
+def _export_batch(count: int) -> List[Dict[str, Any]]:
+    return [{"section": "history", "data": row} for row in _history(count)]
+
+
+# (名称, 返回值, response_model)
+CASES = [
+    ("GET /users/profile", _profile, UserProfileResponse),
+    ("GET /users/history", lambda: _history(10), List[UserHistoryResponse]),
+    ("GET /statistics/heatmap", lambda: _heatmap(365), List[DailyActivityResponse]),
+    ("GET /statistics/monthly", lambda: _monthly(12), List[PeriodActivityResponse]),
+    ("POST /api/chat", _chat_reply, None),
+    ("GET /export (1000 行)", lambda: _export_batch(1000), None),
+]
+
+
+def _measure(iterations: int, func: Callable[[], Any]) -> float:
+    """平均每次耗时（微秒）"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def _validate(field: Optional[Any], content: Any) -> Any:
+    if field is None:
+        return content
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise ValueError(errors)
+    return value
+
+
+def run(iterations: int) -> List[Dict[str, Any]]:
+    results = []
+    print(f"{'接口':<26}{'default':>10}{'orjson':>10}{'direct':>10}{'bytes':>9}{'gzip':>8}{'br':>8}"
+          f"{'gzip us':>9}{'br us':>8}")
+    for name, build, model in CASES:
+        content = build()
+        field = create_response_field(name="response", type_=model) if model is not None else None
+        body = ORJSONResponse(content).body
+
+        result = {
+            "case": name,
+            "default_us": _measure(iterations, lambda: JSONResponse(jsonable_encoder(_validate(field, content)))),
+            "orjson_us": _measure(iterations, lambda: ORJSONResponse(jsonable_encoder(_validate(field, content)))),
+            "direct_us": _measure(iterations, lambda: ORJSONResponse(content)),
+            "bytes": len(body),
+            "gzip_bytes": len(zlib.compress(body, 6)),
+            "gzip_us": _measure(max(iterations // 10, 1), lambda: zlib.compress(body, 6)),
+        }
+        if brotli is not None:
+            result["br_bytes"] = len(brotli.compress(body, quality=4))
+            result["br_us"] = _measure(max(iterations // 10, 1), lambda: brotli.compress(body, quality=4))
+        results.append(result)
+        print(f"{name:<26}{result['default_us']:>10.1f}{result['orjson_us']:>10.1f}{result['direct_us']:>10.1f}"
+              f"{result['bytes']:>9}{result['gzip_bytes']:>8}{result.get('br_bytes', '-'):>8}"
+              f"{result['gzip_us']:>9.1f}{result.get('br_us', float('nan')):>8.1f}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="响应序列化和压缩开销基准")
+    parser.add_argument("--iterations", type=int, default=2000, help="每个用例的执行次数")
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
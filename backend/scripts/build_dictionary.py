@@ -0,0 +1,43 @@
+"""
+把 TSV 词表编译成本地查词使用的词典文件
+
+TSV 每行: 词头<TAB>释义[<TAB>词性[<TAB>音标[<TAB>例句]]]，以 # 开头的行会被忽略
+
+用法: python -m backend.scripts.build_dictionary english words.tsv
+      生成 DICTIONARY_DIR/english-zh.dict
+"""
+import argparse
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+from backend.core.config import settings
+from backend.services.dictionary import build_dictionary
+
+FIELDS = ("translation", "pos", "phonetic", "example")
+
+
+def _read_tsv(path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            entry = {field: value.strip() for field, value in zip(FIELDS, row[1:]) if value.strip()}
+            yield row[0], entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="编译本地词典")
+    parser.add_argument("language", help="词头语言，例如 english")
+    parser.add_argument("source", type=Path, help="TSV 词表文件")
+    parser.add_argument("--gloss", default=settings.DICTIONARY_GLOSS_LANGUAGE, help="释义语言")
+    parser.add_argument("--output-dir", type=Path, default=Path(settings.DICTIONARY_DIR), help="输出目录")
+    args = parser.parse_args()
+
+    output = args.output_dir / f"{args.language.lower()}-{args.gloss}.dict"
+    count = build_dictionary(_read_tsv(args.source), output)
+    print(f"已生成 {output}: {count} 条")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+为已有的学习历史重建全文检索文档（对话记录写入时即建立索引，不需要补建）
+
+先删除 search_documents 中来源为 history 的文档，再按 (created_at, id) 分批读取历史并写入，
+每批单独提交。重建期间检索结果会暂时不完整。
+
+用法: python -m backend.scripts.build_search_index [--user-id 42] [--batch-size 5000]
+"""
+import argparse
+import time
+
+from backend.crud import search
+from backend.database.database import Base, SessionLocal, engine
+from backend.database import models  # noqa: F401  确保模型已注册
+from backend.services.search import history_document
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="为学习历史重建全文检索文档")
+    parser.add_argument("--user-id", type=int, default=None, help="只重建某个用户")
+    parser.add_argument("--batch-size", type=int, default=5000, help="每批处理的历史条数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    reader = SessionLocal()
+    writer = SessionLocal()
+    try:
+        deleted = search.delete_documents(writer, "history", args.user_id)
+        writer.commit()
+        print(f"已删除 {deleted} 条旧文档")
+
+        started = time.perf_counter()
+        indexed = 0
+        for rows in search.iter_history(reader, args.batch_size, args.user_id):
+            search.index_documents(writer, [history_document(row) for row in rows])
+            writer.commit()
+            indexed += len(rows)
+            print(f"已索引 {indexed} 条历史, {indexed / (time.perf_counter() - started):.0f} 条/秒")
+        print(f"重建完成: {indexed} 条")
+    finally:
+        reader.close()
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
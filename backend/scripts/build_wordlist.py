@@ -0,0 +1,46 @@
+"""
+把 TSV 词表编译成难度评估使用的词汇级别表
+
+TSV 每行: 单词<TAB>CEFR 级别或频率排名[<TAB>频率排名]，以 # 开头的行会被忽略
+只有频率排名时按排名推算级别。
+
+用法: python -m backend.scripts.build_wordlist english english_cefr.tsv
+      生成 DIFFICULTY_DIR/english/{words,levels,ranks}.npy
+"""
+import argparse
+import csv
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from backend.core.config import settings
+from backend.services.difficulty import level_from_rank, level_index, save_word_table
+
+
+def _read_tsv(path: Path) -> Iterator[Tuple[str, int, Optional[int]]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            rank = int(row[2]) if len(row) > 2 and row[2].strip().isdigit() else None
+            level = level_index(row[1])
+            if level is None and row[1].strip().isdigit():
+                rank = int(row[1])
+                level = level_from_rank(rank)
+            if level is not None:
+                yield row[0], level, rank
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="编译词汇级别表")
+    parser.add_argument("language", help="语言，例如 english")
+    parser.add_argument("source", type=Path, help="TSV 词表文件")
+    parser.add_argument("--output-dir", type=Path, default=Path(settings.DIFFICULTY_DIR), help="输出目录")
+    args = parser.parse_args()
+
+    output = args.output_dir / args.language.lower()
+    count = save_word_table(output, list(_read_tsv(args.source)))
+    print(f"已生成 {output}: {count} 词")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+本地模拟的 OpenAI 兼容上游，用于测试多上游路由
+
+可设置固定延迟和抖动、错误率（返回 500）以及每分钟请求数上限（超出时返回 429 和 Retry-After），
+回复内容中带有上游名称，便于观察请求被路由到了哪里。只依赖标准库。
+
+用法:
+    python -m backend.scripts.fake_llm_upstream --port 9001 --name fast --latency 0.2
+    python -m backend.scripts.fake_llm_upstream --port 9002 --name slow --latency 1.5
+    python -m backend.scripts.fake_llm_upstream --port 9003 --name flaky --latency 0.3 --error-rate 0.3 --rpm 30
+
+    LLM_UPSTREAMS='[{"name": "fast", "base_url": "http://127.0.0.1:9001/v1", "api_key": "test"},
+                    {"name": "slow", "base_url": "http://127.0.0.1:9002/v1", "api_key": "test"},
+                    {"name": "flaky", "base_url": "http://127.0.0.1:9003/v1", "api_key": "test", "rpm": 30}]'
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(args: argparse.Namespace):
+    lock = threading.Lock()
+    sent = collections.deque()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict, headers: dict = None) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            if not self.path.endswith("/chat/completions"):
+                return self._reply(404, {"error": {"message": "not found"}})
+            if args.api_key and self.headers.get("Authorization") != f"Bearer {args.api_key}":
+                return self._reply(401, {"error": {"message": "invalid api key"}})
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            if args.rpm:
+                now = time.monotonic()
+                with lock:
+                    while sent and sent[0] <= now - 60:
+                        sent.popleft()
+                    if len(sent) >= args.rpm:
+                        retry_after = max(int(sent[0] + 60 - now) + 1, 1)
+                        return self._reply(429, {"error": {"message": "rate limit exceeded"}},
+                                           {"Retry-After": str(retry_after)})
+                    sent.append(now)
+
+            time.sleep(max(args.latency + random.uniform(-args.jitter, args.jitter), 0))
+            if random.random() < args.error_rate:
+                return self._reply(500, {"error": {"message": "internal error"}})
+
+            prompt = " ".join(str(message.get("content", "")) for message in payload.get("messages", []))
+            content = f"[{args.name}] {payload.get('model')} ok"
+            self._reply(200, {
+                "id": f"fake-{time.time_ns()}",
+                "object": "chat.completion",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+
+        def log_message(self, format: str, *log_args) -> None:
+            if not args.quiet:
+                super().log_message(format, *log_args)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地模拟的 OpenAI 兼容上游")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--name", default="fake", help="写入回复内容的上游名称")
+    parser.add_argument("--latency", type=float, default=0.2, help="每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="延迟的随机抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--rpm", type=int, default=0, help="每分钟请求数上限，0 表示不限")
+    parser.add_argument("--api-key", default="", help="要求的 API key，为空时不校验")
+    parser.add_argument("--quiet", action="store_true", help="不打印访问日志")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"模拟上游 {args.name} 监听 http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
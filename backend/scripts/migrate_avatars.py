@@ -0,0 +1,52 @@
+"""
+把 users.avatar 中的 base64 data URL 转存到头像存储，数据库中只保留内容哈希
+
+用法: python -m backend.scripts.migrate_avatars [--batch-size 200] [--clear-invalid]
+"""
+import argparse
+
+from sqlalchemy import text
+
+from backend.database.database import SessionLocal
+from backend.services.avatars import InvalidAvatar, avatar_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="迁移 data URL 头像到内容寻址存储")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批处理的用户数")
+    parser.add_argument("--clear-invalid", action="store_true", help="无法识别的头像置为空")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    last_id, migrated, invalid = 0, 0, 0
+    try:
+        while True:
+            # 按主键分批，避免一次把所有大字段读入内存
+            rows = db.execute(
+                text("SELECT id, avatar FROM users WHERE id > :last_id AND avatar LIKE 'data:%' "
+                     "ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": args.batch_size},
+            ).all()
+            if not rows:
+                break
+            for user_id, avatar in rows:
+                last_id = user_id
+                try:
+                    digest = avatar_store.save_data_url(avatar)
+                except InvalidAvatar as e:
+                    invalid += 1
+                    print(f"用户 {user_id} 的头像无效: {str(e)}")
+                    if not args.clear_invalid:
+                        continue
+                    digest = None
+                db.execute(text("UPDATE users SET avatar = :avatar WHERE id = :id"), {"avatar": digest, "id": user_id})
+                migrated += digest is not None
+            db.commit()
+            print(f"已处理到用户 {last_id}: 迁移 {migrated} 个, 无效 {invalid} 个")
+    finally:
+        db.close()
+    print(f"完成: 迁移 {migrated} 个头像, 无效 {invalid} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+把 user_learning_history 转换为按月范围分区的表，或手动执行分区维护
+
+migrate: 原表改名为 user_learning_history_legacy，按模型创建分区表并建好覆盖全部历史的分区，
+再逐月复制数据。切换完成后应用即可继续写入新表，复制期间较早的历史暂时不可见。
+maintain: 预建未来分区，并按 HISTORY_RETENTION_MONTHS 归档、删除过期分区。
+
+用法: python -m backend.scripts.partition_history migrate [--drop-legacy]
+      python -m backend.scripts.partition_history maintain [--retention-months 24]
+      python -m backend.scripts.partition_history list
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from backend.core.config import settings
+from backend.database.database import engine
+from backend.database.models import UserLearningHistory
+from backend.database.partitions import (
+    HISTORY_TABLE, add_months, ensure_partitions, is_partitioned, list_detached, list_partitions,
+    maintain_history_partitions, month_start,
+)
+
+LEGACY_TABLE = f"{HISTORY_TABLE}_legacy"
+COLUMNS = "id, user_id, activity_type, title, language, level, duration, created_at"
+
+
+def migrate(args: argparse.Namespace) -> None:
+    with engine.connect() as conn:
+        if is_partitioned(conn):
+            print(f"{HISTORY_TABLE} 已经是分区表")
+        elif conn.execute(text("SELECT to_regclass(:table)"), {"table": LEGACY_TABLE}).scalar() is not None:
+            raise SystemExit(f"{LEGACY_TABLE} 已存在，请先确认上一次迁移的状态")
+        else:
+            with conn.begin():
+                conn.execute(text(f"LOCK TABLE {HISTORY_TABLE} IN ACCESS EXCLUSIVE MODE"))
+                conn.execute(text(f"ALTER TABLE {HISTORY_TABLE} RENAME TO {LEGACY_TABLE}"))
+                # 索引名和序列名在 schema 内唯一，给旧表的加上后缀，新表才能使用原来的名字
+                indexes = conn.execute(
+                    text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": LEGACY_TABLE}
+                ).scalars().all()
+                for index in indexes:
+                    conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:56]}_legacy"'))
+                sequence = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": LEGACY_TABLE}
+                ).scalar()
+                if sequence:
+                    conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {LEGACY_TABLE}_id_seq"))
+
+                UserLearningHistory.__table__.create(bind=conn)
+                # 新表的序列从旧表最大 id 之后开始，复制期间新写入的记录不会与旧数据重复
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{HISTORY_TABLE}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {LEGACY_TABLE}), 1))"
+                ))
+                first = conn.execute(text(f"SELECT MIN(created_at) FROM {LEGACY_TABLE}")).scalar()
+            print(f"已创建分区表，原表改名为 {LEGACY_TABLE}")
+
+            now = datetime.now(timezone.utc)
+            first_month = month_start((first or now).astimezone(timezone.utc).date())
+            last_month = add_months(month_start(now.date()), settings.HISTORY_PARTITION_PREMAKE_MONTHS)
+            created = ensure_partitions(conn, first_month, last_month)
+            print(f"已创建 {len(created)} 个分区")
+
+            started = time.perf_counter()
+            copied = 0
+            month = first_month
+            while month <= last_month:
+                # 每个月单独提交，只涉及一个分区
+                with conn.begin():
+                    result = conn.execute(
+                        text(f"INSERT INTO {HISTORY_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {LEGACY_TABLE} "
+                             f"WHERE created_at >= :start AND created_at < :end"),
+                        {"start": f"{month:%Y-%m-%d} 00:00:00+00", "end": f"{add_months(month, 1):%Y-%m-%d} 00:00:00+00"},
+                    )
+                copied += result.rowcount
+                print(f"{month:%Y-%m}: {result.rowcount} 行 (累计 {copied}, {time.perf_counter() - started:.1f}s)")
+                month = add_months(month, 1)
+            with conn.begin():
+                # 分区键不能为空，缺少时间的旧记录计入迁移当天
+                result = conn.execute(text(
+                    f"INSERT INTO {HISTORY_TABLE} ({COLUMNS}) "
+                    f"SELECT {COLUMNS.replace('created_at', 'now()')} FROM {LEGACY_TABLE} WHERE created_at IS NULL"
+                ))
+                conn.execute(text(f"ANALYZE {HISTORY_TABLE}"))
+            copied += result.rowcount
+
+            legacy_rows = conn.execute(text(f"SELECT COUNT(*) FROM {LEGACY_TABLE}")).scalar()
+            print(f"复制完成: {copied} / {legacy_rows} 行")
+            if args.drop_legacy:
+                if copied != legacy_rows:
+                    raise SystemExit("行数不一致，保留旧表")
+                with conn.begin():
+                    conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+                print(f"已删除 {LEGACY_TABLE}")
+
+
+def maintain(args: argparse.Namespace) -> None:
+    if args.retention_months is not None:
+        settings.HISTORY_RETENTION_MONTHS = args.retention_months
+    print(maintain_history_partitions())
+
+
+def show(args: argparse.Namespace) -> None:
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print(f"{HISTORY_TABLE} 不是分区表")
+            return
+        for name, month in list_partitions(conn):
+            rows = conn.execute(text(f"SELECT reltuples::bigint FROM pg_class WHERE oid = '{name}'::regclass")).scalar()
+            print(f"{month:%Y-%m}  {name}  约 {max(rows, 0)} 行")
+        for name in list_detached(conn):
+            print(f"未归档（已解除挂载）  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="学习历史分区管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="把现有的学习历史表转换为分区表")
+    migrate_parser.add_argument("--drop-legacy", action="store_true", help="复制完成且行数一致时删除旧表")
+    migrate_parser.set_defaults(func=migrate)
+    maintain_parser = subparsers.add_parser("maintain", help="预建分区并归档过期分区")
+    maintain_parser.add_argument("--retention-months", type=int, default=None, help="覆盖 HISTORY_RETENTION_MONTHS")
+    maintain_parser.set_defaults(func=maintain)
+    subparsers.add_parser("list", help="列出分区").set_defaults(func=show)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
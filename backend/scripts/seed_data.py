@@ -0,0 +1,160 @@
+"""
+生成大规模模拟数据，用于容量评估和性能测试
+
+使用 COPY 分块批量写入用户、学习语言、统计、学习历史和词汇，
+内存占用只与 --chunk-size 有关，可生成上亿条历史记录。
+
+用法: python -m backend.scripts.seed_data --users 1000000 --history-per-user 100
+生成后可运行 python -m backend.scripts.backfill_rollups 补建每日汇总。
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.core.security import get_password_hash
+from backend.database.database import Base, engine
+from backend.database import models  # noqa: F401  确保模型已注册
+from backend.database.partitions import ensure_partitions, is_partitioned
+
+LANGUAGES = ["english", "japanese", "french", "german", "korean", "spanish", "chinese"]
+LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+ACTIVITY_TYPES = ["reading", "listening", "vocabulary", "chat", "quiz", "writing"]
+SEED_PASSWORD = "password"
+
+
+def _copy(cursor, table: str, columns: list, rows: list) -> None:
+    if not rows:
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _next_id(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _sync_sequence(cursor, table: str) -> None:
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+    )
+
+
+def _heavy_tailed(rng: random.Random, mean: float) -> int:
+    # 指数分布：多数用户活动较少，少数用户非常活跃
+    return int(rng.expovariate(1.0 / mean)) if mean > 0 else 0
+
+
+def generate(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    hashed_password = get_password_hash(SEED_PASSWORD)  # bcrypt 很慢，所有用户共用一个哈希
+    now = datetime.now(timezone.utc)
+    vocabulary_size = args.vocabulary_size
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        # 学习历史覆盖过去 --days 天，COPY 前先建好对应月份的分区
+        if is_partitioned(conn):
+            ensure_partitions(conn, (now - timedelta(days=args.days)).date(), now.date())
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        user_id = _next_id(cursor, "users")
+        history_id = _next_id(cursor, "user_learning_history")
+        vocabulary_id = _next_id(cursor, "user_vocabulary")
+        first_user_id = user_id
+
+        started = time.perf_counter()
+        totals = {"users": 0, "languages": 0, "history": 0, "vocabulary": 0}
+
+        while totals["users"] < args.users:
+            chunk = min(args.chunk_size, args.users - totals["users"])
+            users, languages, stats, history, vocabulary = [], [], [], [], []
+
+            for _ in range(chunk):
+                created_at = now - timedelta(days=rng.uniform(0, args.days))
+                users.append([user_id, f"seed_user_{user_id}", f"seed_user_{user_id}@example.com",
+                              hashed_password, True, False, created_at.isoformat()])
+
+                user_languages = rng.sample(LANGUAGES, rng.randint(1, min(args.max_languages, len(LANGUAGES))))
+                for language in user_languages:
+                    languages.append([user_id, language, rng.choice(LEVELS), round(rng.uniform(0, 100), 1),
+                                      created_at.isoformat()])
+
+                study_time = words_learned = articles_read = 0
+                span = max((now - created_at).total_seconds(), 1.0)
+                for _ in range(_heavy_tailed(rng, args.history_per_user)):
+                    language = rng.choice(user_languages)
+                    activity_type = rng.choice(ACTIVITY_TYPES)
+                    duration = rng.randint(1, 60)
+                    study_time += duration
+                    articles_read += activity_type == "reading"
+                    history.append([history_id, user_id, activity_type, f"{activity_type} lesson {rng.randint(1, 500)}",
+                                    language, rng.choice(LEVELS), duration,
+                                    (created_at + timedelta(seconds=rng.uniform(0, span))).isoformat()])
+                    history_id += 1
+
+                for _ in range(_heavy_tailed(rng, args.vocabulary_per_user)):
+                    # 单词按近似齐夫分布抽取，常用词在多个用户之间重复
+                    rank = min(int(rng.paretovariate(1.1)), vocabulary_size)
+                    language = rng.choice(user_languages)
+                    vocabulary.append([vocabulary_id, user_id, f"{language[:2]}_word_{rank}", f"translation {rank}",
+                                       language, rng.randint(0, 5), created_at.isoformat()])
+                    vocabulary_id += 1
+                    words_learned += 1
+
+                stats.append([user_id, study_time, words_learned, articles_read])
+                user_id += 1
+
+            _copy(cursor, "users", ["id", "username", "email", "hashed_password", "is_active", "is_superuser",
+                                    "created_at"], users)
+            _copy(cursor, "user_languages", ["user_id", "language", "level", "progress", "created_at"], languages)
+            _copy(cursor, "user_statistics", ["user_id", "study_time", "words_learned", "articles_read"], stats)
+            _copy(cursor, "user_learning_history", ["id", "user_id", "activity_type", "title", "language", "level",
+                                                    "duration", "created_at"], history)
+            _copy(cursor, "user_vocabulary", ["id", "user_id", "word", "translation", "language", "mastery_level",
+                                              "created_at"], vocabulary)
+            connection.commit()
+
+            totals["users"] += chunk
+            totals["languages"] += len(languages)
+            totals["history"] += len(history)
+            totals["vocabulary"] += len(vocabulary)
+            elapsed = time.perf_counter() - started
+            print(f"已写入 {totals['users']}/{args.users} 个用户, 历史 {totals['history']} 条, "
+                  f"词汇 {totals['vocabulary']} 条 ({elapsed:.1f}s)")
+
+        for table in ("users", "user_languages", "user_statistics", "user_learning_history", "user_vocabulary"):
+            _sync_sequence(cursor, table)
+        connection.commit()
+
+        if args.analyze:
+            connection.autocommit = True
+            cursor.execute("ANALYZE")
+
+        print(f"完成: 用户 id {first_user_id}-{user_id - 1}, {totals}, 密码均为 '{SEED_PASSWORD}'")
+    finally:
+        connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成模拟数据")
+    parser.add_argument("--users", type=int, default=10000, help="用户数量")
+    parser.add_argument("--max-languages", type=int, default=3, help="每个用户最多学习的语言数")
+    parser.add_argument("--history-per-user", type=float, default=100, help="每个用户平均学习历史条数")
+    parser.add_argument("--vocabulary-per-user", type=float, default=50, help="每个用户平均词汇条数")
+    parser.add_argument("--vocabulary-size", type=int, default=20000, help="每种语言的词表大小")
+    parser.add_argument("--days", type=int, default=730, help="数据覆盖的天数")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="每次 COPY 的用户数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--no-analyze", dest="analyze", action="store_false", help="写入后不执行 ANALYZE")
+    generate(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
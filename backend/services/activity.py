@@ -0,0 +1,141 @@
+import atexit
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.crud import search, statistics
+from backend.database.database import SessionLocal
+from backend.services.search import history_document
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """
+    学习记录写回缓冲：
+    - 学习历史先追加到内存，刷新时批量插入
+    - 计数增量按用户合并（例如每分钟一次的学习时长心跳），刷新时原子自增
+    - 同时按 (用户, 日期, 语言) 合并每日汇总增量
+    """
+
+    def __init__(self, session_factory: Callable, max_pending: int, tz: str = "UTC"):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        self.tz = ZoneInfo(tz)
+        self.on_full: Optional[Callable[[], None]] = None
+        # 写入成功后以 (用户计数增量, 每日汇总增量) 调用，用于增量维护内存中的派生数据
+        self.listeners: List[Callable[[Dict[int, Dict[str, int]], Dict[Tuple[int, date, str], Dict[str, int]]], None]] = []
+        self._lock = threading.Lock()
+        self._history: List[Dict[str, Any]] = []
+        self._deltas: Dict[int, Dict[str, int]] = {}
+        self._daily: Dict[Tuple[int, date, str], Dict[str, int]] = {}
+
+    def record_activity(self, user_id: int, activity: Dict[str, Any],
+                        words_learned: int = 0, articles_read: int = 0) -> None:
+        """记录一次学习活动：写入历史并累加计数"""
+        created_at = datetime.now(timezone.utc)
+        row = {
+            "user_id": user_id,
+            "activity_type": activity["activity_type"],
+            "title": activity.get("title"),
+            "language": activity.get("language"),
+            "level": activity.get("level"),
+            "duration": activity.get("duration"),
+            # 写入是延迟的，这里记录活动发生的时间
+            "created_at": created_at,
+        }
+        with self._lock:
+            self._history.append(row)
+        self.add_counters(
+            user_id,
+            language=activity.get("language"),
+            activities=1,
+            at=created_at,
+            study_time=activity.get("duration") or 0,
+            words_learned=words_learned,
+            articles_read=articles_read,
+        )
+
+    def add_counters(self, user_id: int, language: Optional[str] = None, activities: int = 0,
+                     at: Optional[datetime] = None, **deltas: int) -> None:
+        """累加计数增量，不产生历史记录"""
+        day = (at or datetime.now(timezone.utc)).astimezone(self.tz).date()
+        with self._lock:
+            pending = self._deltas.setdefault(user_id, dict.fromkeys(statistics.COUNTER_FIELDS, 0))
+            for field, value in deltas.items():
+                pending[field] += value
+            daily = self._daily.setdefault((user_id, day, language or ""), dict.fromkeys(statistics.ROLLUP_FIELDS, 0))
+            for field, value in deltas.items():
+                daily[field] += value
+            daily["activities"] += activities
+            size = len(self._history) + len(self._deltas) + len(self._daily)
+        if size >= self.max_pending and self.on_full is not None:
+            self.on_full()
+
+    def pending_for(self, user_id: int) -> Dict[str, int]:
+        """返回某用户尚未写入数据库的计数增量"""
+        with self._lock:
+            return dict(self._deltas.get(user_id) or dict.fromkeys(statistics.COUNTER_FIELDS, 0))
+
+    def flush(self) -> int:
+        """将缓冲内容写入数据库，返回写入的历史条数"""
+        with self._lock:
+            history, self._history = self._history, []
+            deltas, self._deltas = self._deltas, {}
+            daily, self._daily = self._daily, {}
+        if not history and not deltas and not daily:
+            return 0
+
+        db = self.session_factory()
+        try:
+            statistics.insert_history(db, history)
+            # 检索文档与历史在同一事务中写入
+            search.index_documents(db, [history_document(row) for row in history])
+            statistics.increment_counters(db, deltas)
+            statistics.increment_daily(db, daily)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 写入失败时放回缓冲，等待下次重试
+            with self._lock:
+                self._history[:0] = history
+                for user_id, pending in deltas.items():
+                    merged = self._deltas.setdefault(user_id, dict.fromkeys(statistics.COUNTER_FIELDS, 0))
+                    for field, value in pending.items():
+                        merged[field] += value
+                for key, pending in daily.items():
+                    merged = self._daily.setdefault(key, dict.fromkeys(statistics.ROLLUP_FIELDS, 0))
+                    for field, value in pending.items():
+                        merged[field] += value
+            raise
+        finally:
+            db.close()
+
+        for listener in self.listeners:
+            try:
+                listener(deltas, daily)
+            except Exception as e:
+                logger.error(f"学习记录写入回调失败: {str(e)}", exc_info=True)
+        logger.info(f"学习记录已写入: 历史 {len(history)} 条, 统计 {len(deltas)} 个用户")
+        return len(history)
+
+
+activity_buffer = ActivityBuffer(SessionLocal, max_pending=settings.STATS_FLUSH_MAX_PENDING,
+                                 tz=settings.STATS_TIMEZONE)
+activity_flusher = PeriodicTask("activity-flush", activity_buffer.flush, settings.STATS_FLUSH_INTERVAL)
+activity_buffer.on_full = activity_flusher.trigger
+
+
+def _flush_at_exit() -> None:
+    # 兜底：进程退出前未经过 shutdown 事件时也尽量写入
+    try:
+        activity_flusher.run_once()
+    except Exception as e:
+        logger.error(f"退出时写入学习记录失败: {str(e)}")
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.crud import analytics as crud_analytics
+from backend.database.database import engine
+from backend.database.replicas import replica_router
+
+logger = logging.getLogger(__name__)
+
+CATEGORY = "category"
+# 快照中每列的类型；category 列保存为整数编码，取值表写在 meta.json 中
+COLUMN_TYPES = {
+    "users": {"id": np.int64, "created_day": np.int32, "is_active": np.bool_,
+              "study_time": np.int64, "words_learned": np.int64, "articles_read": np.int64},
+    "languages": {"user_id": np.int64, "language": CATEGORY, "level": CATEGORY, "progress": np.float32},
+    "activity": {"user_id": np.int64, "day": np.int32, "language": CATEGORY, "study_time": np.int32},
+}
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+BATCH_SIZE = 10000
+# 多个进程中只有一个重建快照
+BUILD_LOCK_KEY = 7_314_202
+
+
+class _ColumnBuilder:
+    def __init__(self, dtype: Any):
+        self.dtype = dtype
+        self.categories: Optional[Dict[str, int]] = {} if dtype == CATEGORY else None
+        self.chunks: List[np.ndarray] = []
+
+    def append(self, values: Tuple[Any, ...]) -> None:
+        if self.categories is not None:
+            codes = [self.categories.setdefault(value or "", len(self.categories)) for value in values]
+            self.chunks.append(np.array(codes, dtype=np.int32))
+        else:
+            self.chunks.append(np.array(values, dtype=self.dtype))
+
+    def finish(self) -> np.ndarray:
+        dtype = np.int32 if self.categories is not None else self.dtype
+        return np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=dtype)
+
+
+def _load_column(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # 空数组无法内存映射
+        return np.load(path)
+
+
+def _periods(days: np.ndarray, period: str) -> np.ndarray:
+    """把距 1970-01-01 的天数换算为月序号或周序号（周一为一周开始）"""
+    days = np.asarray(days, dtype=np.int64)
+    if period == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return (days + 3) // 7
+
+
+def _period_label(index: int, period: str) -> str:
+    if period == "month":
+        return str(np.datetime64(index, "M"))
+    return str(np.datetime64(index * 7 - 3, "D"))
+
+
+class Snapshot:
+    """内存映射加载的只读列式快照，聚合结果按参数缓存（快照不会改变）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.tables = {
+            table: {column: _load_column(path / f"{table}.{column}.npy") for column in columns}
+            for table, columns in COLUMN_TYPES.items()
+        }
+        self._cache: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+    def categories(self, table: str, column: str) -> List[str]:
+        return self.meta["categories"].get(f"{table}.{column}", [])
+
+    def _user_index(self, user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """把 user_id 映射为 users 表中的行号（users 按 id 排序），返回行号和是否找到的掩码"""
+        ids = self.tables["users"]["id"]
+        if ids.size == 0:
+            return np.zeros(len(user_ids), dtype=np.int64), np.zeros(len(user_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(ids, user_ids), ids.size - 1)
+        return positions, ids[positions] == user_ids
+
+    def _last_active(self) -> np.ndarray:
+        def compute():
+            activity = self.tables["activity"]
+            last = np.full(self.tables["users"]["id"].size, -1, dtype=np.int32)
+            index, found = self._user_index(activity["user_id"])
+            np.maximum.at(last, index[found], activity["day"][found])
+            return last
+        return self._cached(("last_active",), compute)
+
+    def active_learners(self, days: int, today: int) -> Dict[str, Any]:
+        """按学习语言和级别统计学习者人数，以及最近 days 天内有学习记录的人数"""
+        def compute():
+            languages = self.tables["languages"]
+            language_names = self.categories("languages", "language")
+            level_names = self.categories("languages", "level")
+            index, found = self._user_index(languages["user_id"])
+            found &= self.tables["users"]["is_active"][index]
+            active = found & (self._last_active()[index] > today - days)
+
+            keys = languages["language"].astype(np.int64) * max(len(level_names), 1) + languages["level"]
+            shape = (len(language_names), max(len(level_names), 1))
+            learners = np.bincount(keys[found], minlength=shape[0] * shape[1]).reshape(shape)
+            actives = np.bincount(keys[active], minlength=shape[0] * shape[1]).reshape(shape)
+
+            result = []
+            for i in np.argsort(-learners.sum(axis=1), kind="stable"):
+                levels = {
+                    level_names[j] or "未知": {"learners": int(learners[i, j]), "active": int(actives[i, j])}
+                    for j in range(len(level_names)) if learners[i, j]
+                }
+                result.append({"language": language_names[i], "learners": int(learners[i].sum()),
+                               "active": int(actives[i].sum()), "levels": levels})
+            return {"days": days, "languages": result}
+        return self._cached(("active_learners", days, today), compute)
+
+    def study_time_distribution(self, language: Optional[str], bins: int) -> Dict[str, Any]:
+        """学习时间（分钟）的分位数和对数分箱直方图，可限定为学习某种语言的用户"""
+        def compute():
+            users = self.tables["users"]
+            mask = np.asarray(users["is_active"], dtype=bool).copy()
+            if language is not None:
+                names = self.categories("languages", "language")
+                if language not in names:
+                    mask[:] = False
+                else:
+                    languages = self.tables["languages"]
+                    learner_ids = languages["user_id"][languages["language"] == names.index(language)]
+                    mask &= np.isin(users["id"], learner_ids)
+            values = np.asarray(users["study_time"][mask], dtype=np.float64)
+            result: Dict[str, Any] = {"language": language, "users": int(values.size),
+                                      "zero": int(np.count_nonzero(values == 0)),
+                                      "mean": float(values.mean()) if values.size else 0.0,
+                                      "percentiles": {}, "histogram": []}
+            if values.size:
+                result["percentiles"] = {
+                    f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+                }
+            positive = values[values > 0]
+            if positive.size:
+                # 学习时间呈长尾分布，按对数间隔分箱
+                edges = np.unique(np.round(np.geomspace(1, positive.max() + 1, bins + 1)))
+                counts, edges = np.histogram(positive, bins=edges)
+                result["histogram"] = [
+                    {"from": float(edges[i]), "to": float(edges[i + 1]), "count": int(counts[i])}
+                    for i in range(len(counts))
+                ]
+            return result
+        return self._cached(("study_time", language, bins), compute)
+
+    def retention_cohorts(self, period: str, periods: int, today: int) -> List[Dict[str, Any]]:
+        """按注册月（周）分组，统计每个队列在之后第 0..periods-1 个月（周）有学习记录的比例"""
+        def compute():
+            users = self.tables["users"]
+            activity = self.tables["activity"]
+            first = int(_periods(np.array([today]), period)[0]) - periods + 1
+            cohort = _periods(users["created_day"], period) - first
+
+            index, found = self._user_index(activity["user_id"])
+            user_cohort = cohort[index]
+            offset = _periods(activity["day"], period) - first - user_cohort
+            selected = found & (user_cohort >= 0) & (offset >= 0) & (offset < periods)
+            # 同一用户在同一期内的多条记录只计一次
+            pairs = np.unique(index[selected].astype(np.int64) * periods + offset[selected])
+            cells = cohort[pairs // periods] * periods + pairs % periods
+            active = np.bincount(cells, minlength=periods * periods).reshape(periods, periods)
+            sizes = np.bincount(cohort[(cohort >= 0) & (cohort < periods)], minlength=periods)
+
+            result = []
+            for c in range(periods):
+                observed = periods - c  # 当前期之后的数据还不存在
+                result.append({
+                    "cohort": _period_label(first + c, period),
+                    "size": int(sizes[c]),
+                    "active": [int(n) for n in active[c, :observed]],
+                    "retention": [round(int(n) / int(sizes[c]), 4) if sizes[c] else None for n in active[c, :observed]],
+                })
+            return result
+        return self._cached(("retention", period, periods, today), compute)
+
+
+class AnalyticsStore:
+    """
+    管理后台的分析快照：定期从只读库导出用户、学习语言和每日汇总为列式 .npy 文件，
+    加载时内存映射，分析查询不再访问 OLTP 数据库
+    """
+
+    def __init__(self, root: Path, refresh_interval: float, keep: int, tz: str):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.keep = max(keep, 1)
+        self.tz = ZoneInfo(tz)
+        self.current: Optional[Snapshot] = None
+        self._build_lock = threading.Lock()
+
+    def today(self) -> int:
+        """今天（统计时区）距 1970-01-01 的天数，与每日汇总的日期口径一致"""
+        return (datetime.now(self.tz).date() - datetime(1970, 1, 1).date()).days
+
+    def load_latest(self) -> Optional[Snapshot]:
+        """加载 CURRENT 指向的快照（其他进程可能已重建）"""
+        pointer = self.root / "CURRENT"
+        if not pointer.exists():
+            return self.current
+        name = pointer.read_text(encoding="utf-8").strip()
+        if self.current is None or self.current.name != name:
+            self.current = Snapshot(self.root / name)
+            logger.info(f"已加载分析快照: {name}")
+        return self.current
+
+    def _is_stale(self) -> bool:
+        if self.current is None:
+            return True
+        return self.refresh_interval > 0 and time.time() - self.current.meta["built_at"] >= self.refresh_interval
+
+    def build(self) -> Path:
+        """从只读库导出一份新快照并切换 CURRENT"""
+        started = time.perf_counter()
+        self.root.mkdir(parents=True, exist_ok=True)
+        temporary = self.root / f".building-{uuid.uuid4().hex}"
+        temporary.mkdir()
+        meta: Dict[str, Any] = {"tables": {}, "categories": {}}
+        try:
+            db = replica_router.session()
+            try:
+                for table, types in COLUMN_TYPES.items():
+                    names = crud_analytics.SNAPSHOT_QUERIES[table][0]
+                    builders = {name: _ColumnBuilder(types[name]) for name in names}
+                    rows = 0
+                    for batch in crud_analytics.iter_snapshot_rows(db, table, BATCH_SIZE):
+                        rows += len(batch)
+                        for name, values in zip(names, zip(*batch)):
+                            builders[name].append(values)
+                    for name, builder in builders.items():
+                        np.save(temporary / f"{table}.{name}.npy", builder.finish())
+                        if builder.categories is not None:
+                            meta["categories"][f"{table}.{name}"] = list(builder.categories)
+                    meta["tables"][table] = {"rows": rows}
+            finally:
+                db.close()
+            meta["built_at"] = time.time()
+            meta["build_seconds"] = round(time.perf_counter() - started, 3)
+            (temporary / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+            name = f"snapshot-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+            path = self.root / name
+            temporary.rename(path)
+        except Exception:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+
+        pointer = self.root / "CURRENT.tmp"
+        pointer.write_text(name, encoding="utf-8")
+        pointer.replace(self.root / "CURRENT")
+        self._prune(name)
+        logger.info(f"分析快照已生成: {name}, 耗时 {meta['build_seconds']}s, "
+                    + ", ".join(f"{table} {info['rows']} 行" for table, info in meta["tables"].items()))
+        return path
+
+    def _prune(self, current: str) -> None:
+        # 已被其他进程映射的文件删除后仍可继续读取
+        snapshots = sorted(p for p in self.root.glob("snapshot-*") if p.is_dir() and p.name != current)
+        for path in snapshots[:max(len(snapshots) - (self.keep - 1), 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def refresh(self, force: bool = False) -> Optional[Snapshot]:
+        """加载最新快照；过期（或 force）时在取得跨进程锁后重建"""
+        self.load_latest()
+        if not force and not (self._is_stale() and self.refresh_interval > 0):
+            return self.current
+        with self._build_lock, engine.connect() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BUILD_LOCK_KEY}).scalar():
+                return self.current
+            try:
+                # 等锁期间其他进程可能刚刚重建过
+                self.load_latest()
+                if force or self._is_stale():
+                    self.build()
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BUILD_LOCK_KEY})
+        return self.load_latest()
+
+    def info(self) -> Dict[str, Any]:
+        if self.current is None:
+            return {"loaded": False}
+        return {"loaded": True, "name": self.current.name, **self.current.meta}
+
+
+analytics_store = AnalyticsStore(
+    Path(settings.ANALYTICS_SNAPSHOT_DIR),
+    refresh_interval=settings.ANALYTICS_REFRESH_INTERVAL,
+    keep=settings.ANALYTICS_KEEP_SNAPSHOTS,
+    tz=settings.STATS_TIMEZONE,
+)
+# 每分钟检查一次：过期时重建，其他进程重建后切换到新快照
+analytics_refresher = PeriodicTask("analytics-snapshot", analytics_store.refresh, 60, run_on_stop=False)
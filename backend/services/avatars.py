@@ -0,0 +1,147 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from backend.core.config import settings
+
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL = re.compile(r"^data:image/[\w.+-]+;base64,(?P<data>.+)$", re.DOTALL)
+# 本服务返回的头像地址，可带协议和域名
+_AVATAR_URL = re.compile(r"^(?:https?://[^/]+)?" + re.escape(settings.API_V1_STR) + r"/avatars/(?P<digest>[0-9a-f]{64})/\d+$")
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+MAX_PIXELS = 40_000_000  # 防止解压炸弹
+
+
+class InvalidAvatar(ValueError):
+    """上传的内容不是可用的头像图片"""
+
+
+def is_avatar_hash(value: Optional[str]) -> bool:
+    return bool(value) and bool(_HASH.match(value))
+
+
+class AvatarStore:
+    """
+    按内容寻址的头像存储：以原始文件的 SHA-256 为键，
+    上传时预先生成各尺寸的正方形 WebP 缩略图，相同图片只存一份
+    """
+
+    def __init__(self, root: Path, sizes: List[int], max_bytes: int):
+        self.root = root
+        self.sizes = sorted(sizes)
+        self.max_bytes = max_bytes
+
+    def _directory(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def path_for(self, digest: str, size: int) -> Optional[Path]:
+        """返回缩略图路径，哈希或尺寸无效、文件不存在时返回 None"""
+        if not is_avatar_hash(digest) or size not in self.sizes:
+            return None
+        path = self._directory(digest) / f"{size}.webp"
+        return path if path.exists() else None
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest, self.sizes[-1]) is not None
+
+    def save(self, data: bytes) -> str:
+        """校验并保存图片，返回内容哈希；已存在相同图片时直接返回"""
+        if not data:
+            raise InvalidAvatar("图片为空")
+        if len(data) > self.max_bytes:
+            raise InvalidAvatar(f"图片不能超过 {self.max_bytes // 1024} KB")
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+
+        try:
+            with Image.open(io.BytesIO(data)) as probe:
+                if probe.format not in ALLOWED_FORMATS:
+                    raise InvalidAvatar(f"不支持的图片格式: {probe.format}")
+                if probe.width * probe.height > MAX_PIXELS:
+                    raise InvalidAvatar("图片尺寸过大")
+                probe.verify()
+            with Image.open(io.BytesIO(data)) as image:
+                image.seek(0)  # GIF 只取第一帧
+                image = ImageOps.exif_transpose(image)
+                image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+                thumbnails = {
+                    size: ImageOps.fit(image, (size, size), method=Image.LANCZOS) for size in self.sizes
+                }
+        except InvalidAvatar:
+            raise
+        except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise InvalidAvatar(f"无法识别的图片: {str(e)}")
+
+        directory = self._directory(digest)
+        directory.mkdir(parents=True, exist_ok=True)
+        for size, thumbnail in thumbnails.items():
+            # 先写临时文件再原子替换，避免并发读取到不完整的文件；最大尺寸最后写入，exists() 以它为准。
+            # 临时文件名唯一，同一图片的并发上传互不覆盖
+            with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{size}.", suffix=".webp.tmp",
+                                             delete=False) as temporary:
+                try:
+                    thumbnail.save(temporary, format="WEBP", quality=85, method=4)
+                except Exception:
+                    temporary.close()
+                    os.unlink(temporary.name)
+                    raise
+            os.replace(temporary.name, directory / f"{size}.webp")
+        return digest
+
+    def save_data_url(self, value: str) -> str:
+        """保存 data:image/...;base64 形式的图片"""
+        match = _DATA_URL.match(value.strip())
+        if not match:
+            raise InvalidAvatar("不是有效的图片 data URL")
+        try:
+            data = base64.b64decode(match.group("data"), validate=False)
+        except (binascii.Error, ValueError):
+            raise InvalidAvatar("base64 数据无效")
+        return self.save(data)
+
+    def resolve(self, value: str, current: Optional[str]) -> str:
+        """
+        把资料更新中提交的头像转换为要保存的值：与当前头像相同（原值或本服务返回的地址）时保持不变，
+        本服务的头像地址和已上传的哈希转换为哈希，data URL 作为新上传处理，其他值拒绝
+        """
+        value = value.strip()
+        if current and value in (current, avatar_url(current)):
+            return current
+        if value.startswith("data:"):
+            return self.save_data_url(value)
+        match = _AVATAR_URL.match(value)
+        digest = match.group("digest") if match else value
+        if current and digest == current:
+            return current
+        if is_avatar_hash(digest) and self.exists(digest):
+            return digest
+        raise InvalidAvatar("请先通过 POST /avatars/ 上传头像")
+
+    def urls(self, digest: str) -> Dict[str, str]:
+        return {str(size): f"{settings.API_V1_STR}/avatars/{digest}/{size}" for size in self.sizes}
+
+
+def avatar_url(value: Optional[str], size: Optional[int] = None) -> Optional[str]:
+    """把数据库中的头像值转换为前端可用的地址；历史数据中的外部 URL 原样返回"""
+    if not value:
+        return None
+    if is_avatar_hash(value):
+        size = size or avatar_store.sizes[-1]
+        return f"{settings.API_V1_STR}/avatars/{value}/{size}"
+    return value
+
+
+avatar_store = AvatarStore(
+    Path(settings.AVATAR_DIR),
+    sizes=[int(size) for size in settings.AVATAR_SIZES.split(",") if size.strip()],
+    max_bytes=settings.AVATAR_MAX_BYTES,
+)
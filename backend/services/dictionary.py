@@ -0,0 +1,209 @@
+import json
+import logging
+import mmap
+import re
+import struct
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.crud import vocabulary
+from backend.database.models import User
+
+logger = logging.getLogger(__name__)
+
+# 文件格式：
+#   MAGIC (8 字节) | 词条数 N (uint32) | 偏移表 (N + 1 个 uint32) | 词条数据
+#   每条词条数据为 "词头 UTF-8 字节 + \0 + 释义 JSON"，按词头字节序排序
+MAGIC = b"LTDICT1\0"
+_HEADER = struct.Struct("<8sI")
+
+# 识别“某个词是什么意思”一类的简单查词请求；消息中除查词短语外不能有其他内容，
+# 单独一个词不算查词（可能是 "Merci"、"Why?" 这样的对话）
+_WORD = r"(?P<quote>[\"'“‘「『])?(?P<word>[^\W\d_][\w'’\-]{0,39}?)[\"'”’」』]?"
+_HEADWORD_PATTERNS = [
+    re.compile(rf"^(?:what\s+does|what\s+do)\s+{_WORD}\s+mean\s*[?？]?$", re.IGNORECASE),
+    re.compile(rf"^(?:what(?:'s|’s|\s+is)\s+)?(?:the\s+)?(?:meaning|definition)\s+of\s+{_WORD}\s*[?？]?$", re.IGNORECASE),
+    re.compile(rf"^(?:define|translate)\s+{_WORD}\s*[?？]?$", re.IGNORECASE),
+    re.compile(rf"^{_WORD}\s*(?:是)?(?:什么|啥)意思\s*(?:呢|啊|呀)?\s*[?？]?$"),
+    re.compile(rf"^{_WORD}\s*(?:怎么|如何)(?:翻译|解释)\s*[?？]?$"),
+    re.compile(rf"^(?:翻译|解释)(?:一下)?\s*{_WORD}\s*[?？]?$"),
+]
+# 前两种英文问法的宾语是这些抽象名词时通常是在讨论问题（如 "What is the meaning of life?"），
+# 除非单词加了引号，否则交给大模型回答
+_QUESTION_PATTERNS = _HEADWORD_PATTERNS[:2]
+_ABSTRACT_HEADWORDS = {
+    "life", "love", "death", "existence", "happiness", "success", "freedom", "friendship", "time", "truth", "art",
+    "god", "family", "beauty", "justice", "faith", "hope", "home", "christmas", "education", "religion", "all",
+    "this", "that", "it", "everything", "anything", "nothing", "something", "these", "those",
+}
+
+
+def normalize_headword(word: str) -> str:
+    return unicodedata.normalize("NFKC", word).strip().lower().replace("’", "'")
+
+
+def extract_headword(message: str) -> Optional[str]:
+    """如果消息只是在询问一个词的意思，返回规范化后的词头"""
+    text = unicodedata.normalize("NFKC", message).strip()
+    if not text or len(text) > 80:
+        return None
+    for pattern in _HEADWORD_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            word = normalize_headword(match.group("word"))
+            if pattern in _QUESTION_PATTERNS and not match.group("quote") and word in _ABSTRACT_HEADWORDS:
+                return None
+            return word
+    return None
+
+
+class MappedDictionary:
+    """
+    基于 mmap 的只读词典，按词头二分查找；
+    多个 worker 进程打开同一个文件时共享操作系统页缓存，不会重复占用内存
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是有效的词典文件: {path}")
+        self._offsets_start = _HEADER.size
+        self._data_start = self._offsets_start + 4 * (self.count + 1)
+
+    def _offset(self, index: int) -> int:
+        return self._data_start + struct.unpack_from("<I", self._mm, self._offsets_start + 4 * index)[0]
+
+    def _key_at(self, index: int) -> Tuple[bytes, int, int]:
+        start, end = self._offset(index), self._offset(index + 1)
+        separator = self._mm.find(b"\0", start, end)
+        return self._mm[start:separator], separator + 1, end
+
+    def lookup(self, word: str) -> Optional[Dict[str, Any]]:
+        target = normalize_headword(word).encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            key, payload_start, payload_end = self._key_at(middle)
+            if key == target:
+                return json.loads(self._mm[payload_start:payload_end].decode("utf-8"))
+            if key < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def build_dictionary(entries: Iterable[Tuple[str, Dict[str, Any]]], output: Path) -> int:
+    """把 (词头, 释义) 写成排序后的词典文件，重复词头只保留第一条，返回词条数"""
+    records: Dict[bytes, bytes] = {}
+    for word, payload in entries:
+        key = normalize_headword(word).encode("utf-8")
+        if key and b"\0" not in key and key not in records:
+            records[key] = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    keys = sorted(records)
+    offsets, data, position = [], bytearray(), 0
+    for key in keys:
+        offsets.append(position)
+        record = key + b"\0" + records[key]
+        data += record
+        position += len(record)
+    offsets.append(position)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temporary = output.with_suffix(output.suffix + ".tmp")
+    with open(temporary, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(data)
+    # 原子替换，正在运行的进程仍持有旧文件的映射
+    temporary.replace(output)
+    return len(keys)
+
+
+class DictionaryRegistry:
+    """按语言对懒加载词典文件，文件不存在时记为 None 避免重复探测"""
+
+    def __init__(self, directory: Path, gloss_language: str):
+        self.directory = directory
+        self.gloss_language = gloss_language
+        self._lock = threading.Lock()
+        self._dictionaries: Dict[str, Optional[MappedDictionary]] = {}
+
+    def get(self, language: str) -> Optional[MappedDictionary]:
+        language = language.lower()
+        if language not in self._dictionaries:
+            with self._lock:
+                if language not in self._dictionaries:
+                    path = self.directory / f"{language}-{self.gloss_language}.dict"
+                    dictionary = None
+                    if path.exists():
+                        try:
+                            dictionary = MappedDictionary(path)
+                            logger.info(f"已加载本地词典: {path} ({dictionary.count} 条)")
+                        except Exception as e:
+                            logger.error(f"加载本地词典失败: {path}: {str(e)}")
+                    self._dictionaries[language] = dictionary
+        return self._dictionaries[language]
+
+    def lookup(self, language: str, word: str) -> Optional[Dict[str, Any]]:
+        dictionary = self.get(language)
+        return dictionary.lookup(word) if dictionary is not None else None
+
+
+dictionaries = DictionaryRegistry(Path(settings.DICTIONARY_DIR), settings.DICTIONARY_GLOSS_LANGUAGE)
+
+
+def _format_entry(word: str, entry: Dict[str, Any], from_vocabulary: bool) -> str:
+    header = f"**{word}**"
+    if entry.get("phonetic"):
+        header += f" /{entry['phonetic']}/"
+    if entry.get("pos"):
+        header += f" ({entry['pos']})"
+    lines = [header, f"释义: {entry.get('translation', '')}"]
+    if entry.get("example"):
+        lines.append(f"例句: {entry['example']}")
+    if entry.get("notes"):
+        lines.append(f"笔记: {entry['notes']}")
+    if from_vocabulary:
+        lines.append("（来自你的生词本）")
+    return "\n".join(lines)
+
+
+def answer_word_query(message: str, language: str, db: Session, user: Optional[User]) -> Optional[Dict[str, Any]]:
+    """
+    简单查词请求的本地快速路径：先查用户生词本，再查本地词典；
+    无法识别或查不到时返回 None，由调用方继续请求大模型
+    """
+    word = extract_headword(message)
+    if word is None:
+        return None
+
+    entry, from_vocabulary = None, False
+    if user is not None:
+        item = vocabulary.get_by_word(db, user_id=user.id, language=language, word=word)
+        if item is not None and item.translation:
+            entry = {"translation": item.translation, "example": item.example, "notes": item.notes}
+            from_vocabulary = True
+    if entry is None:
+        entry = dictionaries.lookup(language, word)
+    if entry is None:
+        return None
+
+    return {
+        "response": _format_entry(word, entry, from_vocabulary),
+        "status": "success",
+        "source": "vocabulary" if from_vocabulary else "dictionary",
+        "entry": {"word": word, **entry},
+    }
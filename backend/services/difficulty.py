@@ -0,0 +1,181 @@
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.crud import users
+from backend.database.models import User
+
+logger = logging.getLogger(__name__)
+
+CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+# 词表中的级别编码：1-6 对应 A1-C2，7 表示词表中没有的词
+UNKNOWN_LEVEL = len(CEFR_LEVELS) + 1
+# 只有频率排名时按排名推算级别的上限
+RANK_THRESHOLDS = [500, 1000, 2000, 4000, 8000]
+
+# 拉丁字母等按单词切分，中日韩文字按单字切分
+_CJK = "\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff"
+_TOKEN_PATTERN = re.compile(rf"[{_CJK}]|[^\W\d_]+(?:['’\-][^\W\d_]+)*")
+_CJK_PATTERN = re.compile(rf"[{_CJK}]")
+
+
+def level_index(level: Optional[str]) -> Optional[int]:
+    """'B1' -> 3，无法识别时返回 None"""
+    if not level:
+        return None
+    level = level.strip().upper()
+    return CEFR_LEVELS.index(level) + 1 if level in CEFR_LEVELS else None
+
+
+def level_from_rank(rank: int) -> int:
+    for index, threshold in enumerate(RANK_THRESHOLDS):
+        if rank <= threshold:
+            return index + 1
+    return len(CEFR_LEVELS)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower().replace("’", "'") for token in _TOKEN_PATTERN.findall(text)]
+
+
+class WordLevelTable:
+    """
+    某种语言的词表：按字典序排序的单词数组及对应的 CEFR 级别和频率排名，
+    以 mmap 只读方式加载，多个进程共享同一份页缓存
+    """
+
+    def __init__(self, directory: Path):
+        self.words = np.load(directory / "words.npy", mmap_mode="r")
+        self.levels = np.load(directory / "levels.npy", mmap_mode="r")
+        ranks_path = directory / "ranks.npy"
+        self.ranks = np.load(ranks_path, mmap_mode="r") if ranks_path.exists() else None
+        # 词表的文字类型，评估时忽略其他文字的词（例如英语回复中的中文解释）
+        self.cjk = len(self.words) > 0 and bool(_CJK_PATTERN.match(str(self.words[len(self.words) // 2])))
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def lookup_levels(self, tokens: List[str]) -> np.ndarray:
+        """一次性查出所有词的级别（向量化二分查找）"""
+        if not tokens:
+            return np.empty(0, dtype=np.uint8)
+        if len(self.words) == 0:
+            return np.full(len(tokens), UNKNOWN_LEVEL, dtype=np.uint8)
+        # 按查询词自身的长度建数组：用词表的定长类型会把更长的词截断，误命中词表中的短词
+        queries = np.asarray(tokens, dtype=str)
+        positions = np.searchsorted(self.words, queries)
+        positions = np.minimum(positions, len(self.words) - 1)
+        found = self.words[positions] == queries
+        return np.where(found, self.levels[positions], UNKNOWN_LEVEL).astype(np.uint8)
+
+
+def save_word_table(directory: Path, entries: List[Tuple[str, int, Optional[int]]]) -> int:
+    """把 (单词, 级别编码, 频率排名) 保存为排序后的数组，重复单词保留级别最低的一条"""
+    best: Dict[str, Tuple[int, int]] = {}
+    for word, level, rank in entries:
+        word = word.strip().lower()
+        if not word:
+            continue
+        rank = rank if rank is not None else 0
+        if word not in best or level < best[word][0]:
+            best[word] = (level, rank)
+
+    words = sorted(best)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / "words.npy", np.asarray(words, dtype=f"U{max(map(len, words), default=1)}"))
+    np.save(directory / "levels.npy", np.asarray([best[word][0] for word in words], dtype=np.uint8))
+    np.save(directory / "ranks.npy", np.asarray([best[word][1] for word in words], dtype=np.uint32))
+    return len(words)
+
+
+class DifficultyEstimator:
+    """
+    按词汇覆盖率估计文本的 CEFR 级别：
+    取能覆盖至少 coverage 比例词次的最低级别作为文本级别
+    """
+
+    def __init__(self, directory: Path, coverage: float = 0.95):
+        self.directory = directory
+        self.coverage = coverage
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Optional[WordLevelTable]] = {}
+
+    def table(self, language: str) -> Optional[WordLevelTable]:
+        language = language.lower()
+        if language not in self._tables:
+            with self._lock:
+                if language not in self._tables:
+                    table = None
+                    if (self.directory / language / "words.npy").exists():
+                        try:
+                            table = WordLevelTable(self.directory / language)
+                            logger.info(f"已加载词汇级别表: {language} ({len(table)} 词)")
+                        except Exception as e:
+                            logger.error(f"加载词汇级别表失败: {language}: {str(e)}")
+                    self._tables[language] = table
+        return self._tables[language]
+
+    def estimate(self, text: str, language: str, hard_above: Optional[int] = None,
+                 max_hard_words: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        估计文本难度；没有该语言词表或文本中没有词时返回 None。
+        hardWords 列出级别高于 hard_above（默认为文本级别）的词
+        """
+        table = self.table(language)
+        if table is None:
+            return None
+        tokens = [token for token in tokenize(text) if bool(_CJK_PATTERN.match(token)) == table.cjk]
+        if not tokens:
+            return None
+
+        levels = table.lookup_levels(tokens)
+        counts = np.bincount(levels, minlength=UNKNOWN_LEVEL + 1)[1:]
+        cumulative = np.cumsum(counts[:len(CEFR_LEVELS)]) / len(tokens)
+        reached = np.nonzero(cumulative >= self.coverage)[0]
+        index = int(reached[0]) + 1 if len(reached) else len(CEFR_LEVELS)
+
+        hard = np.nonzero(levels > (hard_above or index))[0]
+        hard_words = list(dict.fromkeys(tokens[i] for i in hard))[:max_hard_words]
+
+        return {
+            "level": CEFR_LEVELS[index - 1],
+            "levelIndex": index,
+            "tokens": len(tokens),
+            "coverage": {level: round(float(value), 4) for level, value in zip(CEFR_LEVELS, cumulative)},
+            "unknownRatio": round(float(counts[-1]) / len(tokens), 4),
+            "hardWords": hard_words,
+        }
+
+    def assess_reply(self, text: str, language: str, learner_level: Optional[str]) -> Optional[Dict[str, Any]]:
+        """估计回复难度，并判断是否明显超出学习者水平"""
+        learner_index = level_index(learner_level)
+        if learner_index is None:
+            return self.estimate(text, language)
+        result = self.estimate(text, language, hard_above=learner_index + settings.DIFFICULTY_TOLERANCE)
+        if result is None:
+            return None
+        result["learnerLevel"] = CEFR_LEVELS[learner_index - 1]
+        result["tooHard"] = result["levelIndex"] > learner_index + settings.DIFFICULTY_TOLERANCE
+        return result
+
+
+difficulty_estimator = DifficultyEstimator(Path(settings.DIFFICULTY_DIR), settings.DIFFICULTY_COVERAGE)
+
+
+def resolve_learner_level(db: Session, user: Optional[User], language: str, message: str) -> Optional[str]:
+    """确定学习者水平：已登录时使用用户设置的级别，否则根据输入估计"""
+    if user is not None:
+        level = users.get_language_level(db, user_id=user.id, language=language)
+        if level_index(level) is not None:
+            return level.upper()
+    result = difficulty_estimator.estimate(message, language)
+    # 太短的输入估计不可靠
+    if result is not None and result["tokens"] >= 8:
+        return result["level"]
+    return None
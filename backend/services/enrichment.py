@@ -0,0 +1,200 @@
+import json
+import logging
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.crud import enrichment as crud_enrichment
+from backend.crud import vocabulary
+from backend.database.database import SessionLocal
+from backend.services import llm
+from backend.services.tokens import token_estimator
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_JOB = "vocabulary_enrichment"
+GLOSS_LANGUAGE_NAMES = {"zh": "中文", "en": "英文", "ja": "日文", "ko": "韩文"}
+MAX_TRANSLATION_CHARS = 200
+MAX_EXAMPLE_CHARS = 300
+MAX_NOTES_CHARS = 300
+
+SYSTEM_PROMPT = (
+    "你是一位语言教师，为学习者的生词本补全词条。用户会给出一个 JSON 数组，元素为 {{\"id\": 序号, \"word\": 单词}}，"
+    "单词均为{language}。为每个单词给出：translation（简短的{gloss}释义，多个义项用分号分隔）、"
+    "example（一个简短自然、包含该单词的{language}例句）、notes（一句{gloss}用法说明，如词性、常见搭配或易混词）。"
+    "只返回 JSON 数组，元素格式为 {{\"id\": 序号, \"translation\": 释义, \"example\": 例句, \"notes\": 说明}}，"
+    "每个输入单词恰好对应一项。"
+)
+
+
+def word_key(word: str) -> str:
+    """共享缓存使用的规范化单词：NFKC、去掉首尾空白、合并空白并转小写"""
+    return " ".join(unicodedata.normalize("NFKC", word).split()).lower()
+
+
+def pack_words(words: List[str], budget: int, max_words: int, output_tokens: int, overhead: int) -> List[List[str]]:
+    """按 token 预算分包：每个单词计入自身及 JSON 包装的输入 token 和预计的输出 token"""
+    packs: List[List[str]] = []
+    current: List[str] = []
+    used = overhead
+    for word in words:
+        cost = token_estimator.count(word) + 8 + output_tokens
+        if current and (used + cost > budget or len(current) >= max_words):
+            packs.append(current)
+            current, used = [], overhead
+        current.append(word)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _text(value: Any, limit: int) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value if value and len(value) <= limit else None
+
+
+def validate_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """校验一个单词的结果：释义和例句必填，长度有上限；说明可以缺省"""
+    if not isinstance(entry, dict):
+        return None
+    translation = _text(entry.get("translation"), MAX_TRANSLATION_CHARS)
+    example = _text(entry.get("example"), MAX_EXAMPLE_CHARS)
+    if translation is None or example is None:
+        return None
+    return {"translation": translation, "example": example, "notes": _text(entry.get("notes"), MAX_NOTES_CHARS)}
+
+
+class VocabularyEnricher:
+    """
+    生词本批量补全：先查跨用户共享的缓存，未命中的单词按 token 预算打包成一次请求并发发给上游，
+    按序号逐个校验结果，只把失败的单词重新打包重试，最后一条 UPDATE 写回生词本
+    """
+
+    def __init__(self, pack_tokens: int, pack_words: int, output_tokens: int, concurrency: int, max_rounds: int,
+                 gloss_language: str):
+        self.pack_tokens = pack_tokens
+        self.pack_words = pack_words
+        self.output_tokens = output_tokens
+        self.concurrency = concurrency
+        self.max_rounds = max_rounds
+        self.gloss_language = gloss_language
+
+    def _system_prompt(self, language: str) -> str:
+        gloss = GLOSS_LANGUAGE_NAMES.get(self.gloss_language, self.gloss_language)
+        return SYSTEM_PROMPT.format(language=language, gloss=gloss)
+
+    def _enrich_pack(self, words: List[str], language: str, user_id: Optional[int],
+                     source: str) -> Dict[str, Dict[str, Any]]:
+        """一次请求补全一包单词，返回校验通过的 {单词: 字段}；请求或解析失败时返回空"""
+        messages = [
+            {"role": "system", "content": self._system_prompt(language)},
+            {"role": "user", "content": json.dumps([{"id": index, "word": word} for index, word in enumerate(words)],
+                                                   ensure_ascii=False)},
+        ]
+        try:
+            reply = llm.complete(messages, max_tokens=self.output_tokens * len(words) + 100, temperature=0.3,
+                                 timeout=120.0, user_id=user_id, source=source)
+            entries = llm.parse_json(reply["content"])
+        except Exception as e:
+            logger.warning(f"补全请求失败 ({len(words)} 个{language}单词): {type(e).__name__}: {e}")
+            return {}
+        results = {}
+        for entry in entries if isinstance(entries, list) else []:
+            index = entry.get("id") if isinstance(entry, dict) else None
+            if isinstance(index, int) and 0 <= index < len(words) and words[index] not in results:
+                fields = validate_entry(entry)
+                if fields is not None:
+                    results[words[index]] = fields
+        return results
+
+    def enrich(self, words: List[str], language: str, user_id: Optional[int] = None, source: str = "job",
+               progress: Optional[Callable[[int], None]] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """
+        补全一组同语言的单词，返回 ({单词: 字段}, 请求次数)；
+        每轮只重试上一轮失败的单词，progress(已完成单词数) 在调用线程中执行
+        """
+        overhead = token_estimator.count(self._system_prompt(language)) + 20
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = list(dict.fromkeys(words))
+        calls = 0
+        for round_index in range(self.max_rounds):
+            if not pending:
+                break
+            if round_index:
+                logger.info(f"重试 {len(pending)} 个补全失败的{language}单词")
+            packs = pack_words(pending, self.pack_tokens, self.pack_words, self.output_tokens, overhead)
+            calls += len(packs)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = [executor.submit(self._enrich_pack, pack, language, user_id, source) for pack in packs]
+                for future in as_completed(futures):
+                    results.update(future.result())
+                    if progress is not None:
+                        progress(len(results))
+            pending = [word for word in pending if word not in results]
+        return results, calls
+
+    def enrich_items(self, user_id: int, items: List[Tuple[int, str, str]], source: str = ENRICHMENT_JOB,
+                     progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """补全用户生词本中的词条 [(id, 单词, 语言)]，新结果写入共享缓存，再批量写回生词本"""
+        by_language: Dict[str, Dict[str, str]] = {}
+        for _, word, language in items:
+            if word_key(word):
+                by_language.setdefault(language, {}).setdefault(word_key(word), word.strip())
+
+        total = sum(len(words) for words in by_language.values())
+        found: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        cached = generated = calls = 0
+        failed: List[str] = []
+        for language, words in by_language.items():
+            with SessionLocal() as db:
+                hits = crud_enrichment.lookup(db, language, self.gloss_language, list(words))
+            cached += len(hits)
+            found.update({(language, key): fields for key, fields in hits.items()})
+            missing = [word for key, word in words.items() if key not in hits]
+            if not missing:
+                continue
+
+            done = cached + generated
+            report = None
+            if progress is not None:
+                def report(count: int, done: int = done) -> None:
+                    progress((done + count) / total, f"已补全 {done + count}/{total} 个单词")
+            results, language_calls = self.enrich(missing, language, user_id, source, report)
+            calls += language_calls
+            generated += len(results)
+            failed.extend(word for word in missing if word not in results)
+            rows = [{"language": language, "gloss_language": self.gloss_language, "word_key": word_key(word),
+                     "model": settings.LLM_MODEL, **fields} for word, fields in results.items()]
+            with SessionLocal() as db:
+                crud_enrichment.store(db, rows)
+            found.update({(language, word_key(word)): fields for word, fields in results.items()})
+
+        updates = [{"id": item_id, **found[(language, word_key(word))]}
+                   for item_id, word, language in items if (language, word_key(word)) in found]
+        with SessionLocal() as db:
+            updated = vocabulary.apply_enrichments(db, user_id, updates)
+        if progress is not None:
+            progress(1.0, f"已补全 {cached + generated}/{total} 个单词")
+        return {
+            "requested": len(items),
+            "words": total,
+            "fromCache": cached,
+            "generated": generated,
+            "failed": failed,
+            "calls": calls,
+            "updated": updated,
+        }
+
+
+vocabulary_enricher = VocabularyEnricher(
+    pack_tokens=settings.ENRICHMENT_PACK_TOKENS,
+    pack_words=settings.ENRICHMENT_PACK_WORDS,
+    output_tokens=settings.ENRICHMENT_OUTPUT_TOKENS,
+    concurrency=settings.ENRICHMENT_CONCURRENCY,
+    max_rounds=settings.ENRICHMENT_MAX_ROUNDS,
+    gloss_language=settings.DICTIONARY_GLOSS_LANGUAGE,
+)
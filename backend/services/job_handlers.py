@@ -0,0 +1,170 @@
+"""后台任务处理函数，导入本模块即完成注册"""
+import random
+from typing import Any, Dict, Optional
+
+from backend.core.config import settings
+from backend.crud import quiz as crud_quiz
+from backend.crud import vocabulary
+from backend.database.database import SessionLocal
+from backend.services import llm
+from backend.services.enrichment import ENRICHMENT_JOB, vocabulary_enricher
+from backend.services.jobs import JobContext, job_handler
+from backend.services.quiz import AVOID_SAMPLE, REFILL_JOB, generate_exercises, quiz_pools
+
+EXAMPLE_BATCH_SIZE = 10
+
+
+def _text(payload: Dict[str, Any], key: str, default: Optional[str] = None) -> Optional[str]:
+    value = payload.get(key, default)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{key} 必须是字符串")
+    return value
+
+
+def _count(payload: Dict[str, Any], key: str, default: int, maximum: int) -> int:
+    """正整数参数，超过 maximum 时取 maximum"""
+    value = payload.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} 必须是整数")
+    value = int(value)
+    if value < 1:
+        raise ValueError(f"{key} 必须大于 0")
+    return min(value, maximum)
+
+
+def _validate_examples(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"language": _text(payload, "language"), "limit": _count(payload, "limit", 50, 200)}
+
+
+def _validate_enrichment(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"language": _text(payload, "language"),
+            "limit": _count(payload, "limit", 500, settings.ENRICHMENT_MAX_WORDS)}
+
+
+def _validate_article(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "language": _text(payload, "language", "english"),
+        "level": _text(payload, "level", "B1"),
+        "topic": _text(payload, "topic", "日常生活"),
+        "length": _count(payload, "length", 400, 1500),
+    }
+
+
+def _validate_refill(payload: Dict[str, Any]) -> Dict[str, Any]:
+    key = {name: payload[name] for name in ("language", "level", "topic")}
+    if not all(isinstance(value, str) for value in key.values()):
+        raise ValueError("language、level、topic 必须是字符串")
+    return {**payload, **key, "target": _count(payload, "target", settings.QUIZ_POOL_TARGET, 10_000)}
+
+
+@job_handler("example_sentences", concurrency=2, public=True, validate=_validate_examples)
+def generate_example_sentences(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """为用户生词本中没有例句的单词批量生成例句"""
+    language = payload["language"]
+    limit = payload["limit"]
+    with SessionLocal() as db:
+        items = [(item.id, item.word, item.translation, item.language)
+                 for item in vocabulary.list_missing_examples(db, ctx.user_id, language, limit)]
+
+    generated = 0
+    for start in range(0, len(items), EXAMPLE_BATCH_SIZE):
+        ctx.progress(start / max(len(items), 1), f"已生成 {generated}/{len(items)} 个例句")
+        batch = items[start:start + EXAMPLE_BATCH_SIZE]
+        words = "\n".join(f"{index}. {word} ({item_language}): {translation}"
+                          for index, (_, word, translation, item_language) in enumerate(batch))
+        reply = llm.complete(
+            [
+                {"role": "system", "content": "你是一位语言教师。为每个单词写一个简短、自然、适合学习者的例句，"
+                                              "只返回 JSON 数组，元素格式为 {\"index\": 序号, \"example\": 例句}。"},
+                {"role": "user", "content": words},
+            ],
+            max_tokens=80 * len(batch) + 50,
+            user_id=ctx.user_id,
+            source=ctx.kind,
+        )
+        examples = {}
+        for entry in llm.parse_json(reply["content"]):
+            index = entry.get("index")
+            if isinstance(index, int) and 0 <= index < len(batch) and entry.get("example"):
+                examples[batch[index][0]] = str(entry["example"])[:500]
+        with SessionLocal() as db:
+            vocabulary.set_examples(db, ctx.user_id, examples)
+        generated += len(examples)
+
+    ctx.progress(1.0, f"已生成 {generated}/{len(items)} 个例句")
+    return {"requested": len(items), "generated": generated}
+
+
+@job_handler(ENRICHMENT_JOB, concurrency=2, public=True, validate=_validate_enrichment)
+def enrich_vocabulary(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """补全用户生词本中缺少释义、例句或用法说明的词条"""
+    language = payload["language"]
+    limit = payload["limit"]
+    with SessionLocal() as db:
+        items = [(item.id, item.word, item.language)
+                 for item in vocabulary.list_unenriched(db, ctx.user_id, language, limit)]
+    ctx.progress(0.0, f"待补全 {len(items)} 个词条")
+    return vocabulary_enricher.enrich_items(ctx.user_id, items, source=ctx.kind, progress=ctx.progress)
+
+
+@job_handler("generate_article", concurrency=2, public=True, validate=_validate_article)
+def generate_article(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """按语言、级别和主题生成一篇阅读文章"""
+    language = payload["language"]
+    level = payload["level"]
+    topic = payload["topic"]
+    length = payload["length"]
+
+    ctx.progress(0.1, "正在生成文章")
+    reply = llm.complete(
+        [
+            {"role": "system", "content": "你是一位语言教师，为学习者编写分级阅读材料。"
+                                          "只返回 JSON 对象 {\"title\": 标题, \"content\": 正文, "
+                                          "\"vocabulary\": [{\"word\": 单词, \"translation\": 中文释义}]}。"},
+            {"role": "user", "content": f"用{language}写一篇约 {length} 词、CEFR {level} 水平、主题为「{topic}」的文章，"
+                                        f"并列出 5-10 个重点词汇。"},
+        ],
+        max_tokens=length * 3 + 500,
+        timeout=180.0,
+        user_id=ctx.user_id,
+        source=ctx.kind,
+    )
+    article = llm.parse_json(reply["content"])
+    ctx.progress(1.0, "文章已生成")
+    return {
+        "language": language,
+        "level": level,
+        "topic": topic,
+        "title": article.get("title", topic),
+        "content": article.get("content", ""),
+        "vocabulary": article.get("vocabulary", []),
+    }
+
+
+@job_handler(REFILL_JOB, concurrency=2, validate=_validate_refill)
+def refill_quiz_pool(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """把一个题库补充到目标题数；已经足够时直接结束，重复提交也不会多生成"""
+    key = (payload["language"], payload["level"], payload["topic"])
+    target = payload["target"]
+    batch = settings.QUIZ_GENERATION_BATCH
+    with SessionLocal() as db:
+        pool = crud_quiz.list_pool(db, *key)
+    size = initial = len(pool)
+    avoid = [exercise["question"] for exercise in random.sample(pool, min(AVOID_SAMPLE, len(pool)))]
+
+    # 模型生成的题可能重复或不合格，轮数留出余量
+    rounds = max(target - size, 0) // batch + 3
+    rejected = 0
+    for _ in range(rounds):
+        if size >= target:
+            break
+        ctx.progress(size / target, f"题库 {size}/{target}")
+        exercises, dropped = generate_exercises(key, min(batch, target - size), avoid, source=ctx.kind)
+        rejected += dropped
+        with SessionLocal() as db:
+            size += crud_quiz.insert_exercises(db, exercises)
+        avoid = (avoid + [exercise["question"] for exercise in exercises])[-AVOID_SAMPLE:]
+
+    quiz_pools.invalidate(key)
+    ctx.progress(1.0, f"题库 {size}/{target}")
+    return {"pool": payload.get("pool"), "before": initial, "size": size, "added": size - initial, "rejected": rejected}
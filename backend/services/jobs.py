@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.crud import jobs as crud_jobs
+from backend.database.database import SessionLocal
+from backend.database.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """任务已被请求取消，由 JobContext.progress 抛出"""
+
+
+class InvalidPayload(ValueError):
+    """任务参数无效；提交时返回 400，执行时直接失败，不再重试"""
+
+
+class JobHandler:
+    def __init__(self, kind: str, func: Callable, concurrency: int, max_attempts: int, public: bool,
+                 validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        self.kind = kind
+        self.func = func
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.public = public
+        self.validate = validate
+        self.is_async = asyncio.iscoroutinefunction(func)
+
+    def parse_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """用 validate 校验并转换参数，参数无效时抛出 InvalidPayload"""
+        if self.validate is None:
+            return payload
+        try:
+            return self.validate(payload)
+        except InvalidPayload:
+            raise
+        except (ValueError, TypeError, KeyError) as e:
+            raise InvalidPayload(f"任务参数无效: {type(e).__name__}: {e}")
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, concurrency: int = 1, max_attempts: Optional[int] = None, public: bool = False,
+                validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+    """
+    注册任务处理函数 func(ctx, payload) -> 可 JSON 序列化的结果；
+    同步函数在线程池中执行，concurrency 为每个进程中该类任务的最大并发数，
+    public 为 True 时普通用户可以通过接口提交；
+    validate(payload) 返回转换后的参数，参数无效时抛出 ValueError/TypeError/KeyError，
+    在提交和执行前各调用一次
+    """
+    def decorator(func: Callable) -> Callable:
+        _handlers[kind] = JobHandler(kind, func, concurrency, max_attempts or settings.JOB_MAX_ATTEMPTS, public,
+                                     validate)
+        return func
+    return decorator
+
+
+def get_handler(kind: str) -> Optional[JobHandler]:
+    return _handlers.get(kind)
+
+
+class JobContext:
+    """传给处理函数的任务上下文，用于汇报进度和响应取消"""
+
+    def __init__(self, pool: "JobWorkerPool", job: Dict[str, Any]):
+        self.pool = pool
+        self.id = job["id"]
+        self.kind = job["kind"]
+        self.user_id = job["user_id"]
+        self.attempt = job["attempts"]
+        self._last_report = 0.0
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """汇报进度（同步，最多每 0.5 秒写一次库）；任务已被请求取消时抛出 JobCancelled"""
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._last_report < 0.5:
+            return
+        self._last_report = now
+        with SessionLocal() as db:
+            cancel_requested = crud_jobs.update_progress(
+                db, self.id, self.pool.worker_id, max(0.0, min(fraction, 1.0)), message
+            )
+        if cancel_requested:
+            raise JobCancelled()
+
+    async def aprogress(self, fraction: float, message: Optional[str] = None) -> None:
+        await asyncio.get_event_loop().run_in_executor(None, self.progress, fraction, message)
+
+
+class JobWorkerPool:
+    """
+    进程内的 asyncio 任务执行池：从 background_jobs 表领取任务执行，
+    定期续租，失败后按指数退避重试，租约过期的任务由任意进程重新排队
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, lease: float, retry_base_delay: float,
+                 reap_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retry_base_delay = retry_base_delay
+        self.reap_interval = reap_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[int, asyncio.Task] = {}
+        self._running_kinds: Counter = Counter()
+        self._waiters: Dict[int, asyncio.Event] = {}
+        self._stopping = False
+        self.counters = dict.fromkeys(["claimed", "succeeded", "retried", "failed", "cancelled", "requeued"], 0)
+
+    async def _db(self, func: Callable, *args: Any) -> Any:
+        def call():
+            with SessionLocal() as db:
+                return func(db, *args)
+        return await self._loop.run_in_executor(None, call)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [self._loop.create_task(self._dispatch()), self._loop.create_task(self._heartbeat())]
+        logger.info(f"后台任务 worker 已启动: {self.worker_id} (并发 {self.concurrency})")
+
+    def wake(self) -> None:
+        """有新任务时提前唤醒领取循环，可在任意线程中调用"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claimable_kinds(self) -> List[str]:
+        return [kind for kind, handler in _handlers.items() if self._running_kinds[kind] < handler.concurrency]
+
+    async def _dispatch(self) -> None:
+        last_reap = 0.0
+        while not self._stopping:
+            try:
+                if time.monotonic() - last_reap >= self.reap_interval:
+                    last_reap = time.monotonic()
+                    requeued = await self._db(crud_jobs.requeue_expired)
+                    if requeued:
+                        self.counters["requeued"] += requeued
+                        logger.warning(f"{requeued} 个任务租约过期，已重新排队")
+                while len(self._running) < self.concurrency:
+                    kinds = self._claimable_kinds()
+                    job = await self._db(crud_jobs.claim, self.worker_id, kinds, self.lease) if kinds else None
+                    if job is None:
+                        break
+                    self.counters["claimed"] += 1
+                    self._running_kinds[job["kind"]] += 1
+                    self._running[job["id"]] = self._loop.create_task(self._execute(job))
+            except Exception as e:
+                logger.error(f"领取后台任务失败: {str(e)}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _heartbeat(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.lease / 3)
+            if self._running:
+                try:
+                    await self._db(crud_jobs.renew_leases, self.worker_id, list(self._running), self.lease)
+                except Exception as e:
+                    logger.error(f"后台任务续租失败: {str(e)}")
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        handler = _handlers[job["kind"]]
+        context = JobContext(self, job)
+        try:
+            payload = handler.parse_payload(job["payload"])
+            if handler.is_async:
+                result = await handler.func(context, payload)
+            else:
+                result = await self._loop.run_in_executor(None, handler.func, context, payload)
+            await self._db(crud_jobs.complete, job["id"], self.worker_id, result)
+            self.counters["succeeded"] += 1
+            logger.info(f"后台任务完成: {job['kind']}#{job['id']}")
+        except JobCancelled:
+            await self._db(crud_jobs.fail, job["id"], self.worker_id, "已取消", None)
+            self.counters["cancelled"] += 1
+        except InvalidPayload as e:
+            # 参数错误重试也不会成功
+            await self._db(crud_jobs.fail, job["id"], self.worker_id, str(e), None)
+            self.counters["failed"] += 1
+            logger.error(f"后台任务参数无效: {job['kind']}#{job['id']}: {str(e)}")
+        except asyncio.CancelledError:
+            # worker 停止，任务放回队列由其他 worker 继续
+            await asyncio.shield(self._db(crud_jobs.release, job["id"], self.worker_id))
+            raise
+        except Exception as e:
+            # 指数退避加随机抖动，避免大量任务同时重试
+            delay = self.retry_base_delay * 2 ** (job["attempts"] - 1) * random.uniform(0.8, 1.2)
+            status = await self._db(crud_jobs.fail, job["id"], self.worker_id, f"{type(e).__name__}: {e}", delay)
+            self.counters["retried" if status == "queued" else "failed"] += 1
+            logger.error(f"后台任务失败: {job['kind']}#{job['id']} 第 {job['attempts']} 次, 状态 {status}: {str(e)}")
+        finally:
+            self._running.pop(job["id"], None)
+            self._running_kinds[job["kind"]] -= 1
+            waiter = self._waiters.pop(job["id"], None)
+            if waiter is not None:
+                waiter.set()
+            self.wake()
+
+    async def wait_for(self, job_id: int, timeout: float) -> None:
+        """
+        等待本进程中执行的任务结束或超时；
+        任务可能由其他进程执行，调用方需要在返回后重新查询数据库
+        """
+        if self._loop is None:
+            await asyncio.sleep(timeout)
+            return
+        waiter = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # 不在本进程执行的任务不会触发事件，超时后移除避免堆积
+            self._waiters.pop(job_id, None)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """停止领取新任务，等待执行中的任务结束，超时未结束的放回队列"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        running = list(self._running.values())
+        if running:
+            done, pending = await asyncio.wait(running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        logger.info(f"后台任务 worker 已停止: {self.worker_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": {kind: count for kind, count in self._running_kinds.items() if count},
+            "handlers": {kind: handler.concurrency for kind, handler in _handlers.items()},
+            **self.counters,
+        }
+
+
+def submit(db: Session, kind: str, payload: Dict[str, Any], user_id: Optional[int] = None,
+           priority: int = 0) -> BackgroundJob:
+    """提交任务并唤醒本进程的 worker；任务类型必须已注册，参数无效时抛出 InvalidPayload"""
+    handler = get_handler(kind)
+    if handler is None:
+        raise ValueError(f"未知的任务类型: {kind}")
+    payload = handler.parse_payload(payload)
+    job = crud_jobs.enqueue(db, kind, payload, user_id=user_id, priority=priority,
+                            max_attempts=handler.max_attempts)
+    job_pool.wake()
+    return job
+
+
+job_pool = JobWorkerPool(
+    concurrency=settings.JOB_CONCURRENCY,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    lease=settings.JOB_LEASE_SECONDS,
+    retry_base_delay=settings.JOB_RETRY_BASE_DELAY,
+    reap_interval=settings.JOB_REAP_INTERVAL,
+)
@@ -0,0 +1,302 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.crud import leaderboards as crud_leaderboards
+from backend.database.replicas import replica_router
+from backend.services.activity import activity_buffer
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("study_time", "words_learned")
+PERIODS = ("all", "week")
+# 榜单键：(指标, 周期, 语言)，语言为 None 表示不分语言
+BoardKey = Tuple[str, str, Optional[str]]
+
+
+# 有序分块的块大小：插入、删除和定位都只在一个块内移动元素
+BLOCK_SIZE = 512
+
+
+class FenwickTree:
+    """树状数组：维护各块的元素个数，前 n 块的元素总数为 O(log n)"""
+
+    def __init__(self, counts: List[int]):
+        self.size = len(counts)
+        self._tree = [0] + counts
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[index]
+
+    def add(self, index: int, delta: int) -> None:
+        index += 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count: int) -> int:
+        """前 count 个元素之和"""
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+
+class Leaderboard:
+    """
+    一个榜单：键 (-分数, 用户 id) 按序分块存放，各块人数由树状数组维护，
+    占用的内存只与上榜人数有关，与分数大小无关；
+    分数高者在前，同分并列（名次为分数更高的人数 + 1），同分内按用户 id 排列
+    """
+
+    def __init__(self, scores: Optional[Dict[int, int]] = None):
+        self._scores: Dict[int, int] = {user_id: score for user_id, score in (scores or {}).items() if score > 0}
+        keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+        self._blocks: List[List[Tuple[int, int]]] = [keys[i:i + BLOCK_SIZE] for i in range(0, len(keys), BLOCK_SIZE)]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        """块数变化后重建各块的最大键和树状数组"""
+        self._maxes: List[Tuple[int, int]] = [block[-1] for block in self._blocks]
+        self._counts = FenwickTree([len(block) for block in self._blocks])
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _block_index(self, key: Tuple[int, int]) -> int:
+        return min(bisect.bisect_left(self._maxes, key), len(self._blocks) - 1)
+
+    def _insert(self, key: Tuple[int, int]) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._reindex()
+            return
+        index = self._block_index(key)
+        block = self._blocks[index]
+        bisect.insort(block, key)
+        if len(block) > 2 * BLOCK_SIZE:
+            self._blocks[index:index + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self._reindex()
+        else:
+            self._maxes[index] = block[-1]
+            self._counts.add(index, 1)
+
+    def _delete(self, key: Tuple[int, int]) -> None:
+        index = self._block_index(key)
+        block = self._blocks[index]
+        del block[bisect.bisect_left(block, key)]
+        if block:
+            self._maxes[index] = block[-1]
+            self._counts.add(index, -1)
+        else:
+            del self._blocks[index]
+            self._reindex()
+
+    def _index(self, key: Tuple[int, int]) -> int:
+        """排在 key 之前的元素个数"""
+        if not self._blocks:
+            return 0
+        index = bisect.bisect_left(self._maxes, key)
+        if index == len(self._blocks):
+            return len(self._scores)
+        return self._counts.prefix(index) + bisect.bisect_left(self._blocks[index], key)
+
+    def set(self, user_id: int, score: int) -> None:
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._delete((-old, user_id))
+        if score <= 0:
+            return
+        self._scores[user_id] = score
+        self._insert((-score, user_id))
+
+    def add(self, user_id: int, delta: int) -> None:
+        if delta:
+            self.set(user_id, self._scores.get(user_id, 0) + delta)
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def _above(self, score: int) -> int:
+        """分数高于 score 的人数（用户 id 都不小于 0）"""
+        return self._index((-score, -1))
+
+    def position(self, user_id: int) -> Optional[Tuple[int, int, int]]:
+        """(位置, 名次, 分数)，位置从 1 开始且不并列；不在榜上时返回 None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._index((-score, user_id)) + 1, self._above(score) + 1, score
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int, int, int]]:
+        """位置 offset+1 起的 limit 个 (位置, 用户, 名次, 分数)，名次按分数计算一次"""
+        entries: List[Tuple[int, int, int, int]] = []
+        skipped = 0
+        ranks: Dict[int, int] = {}
+        for block in self._blocks:
+            if skipped + len(block) <= offset:
+                skipped += len(block)
+                continue
+            for negative_score, user_id in block[max(offset - skipped, 0):]:
+                if len(entries) >= limit:
+                    return entries
+                score = -negative_score
+                if score not in ranks:
+                    ranks[score] = self._above(score) + 1
+                entries.append((offset + len(entries) + 1, user_id, ranks[score], score))
+            skipped += len(block)
+        return entries
+
+
+class LeaderboardRegistry:
+    """
+    学习排行榜：总榜和各语言榜，分为累计和本周，按学习时长或单词数排名。
+    学习记录写入数据库后按增量更新；各进程只收到自己写入的增量，定期从数据库整体重建消除误差
+    """
+
+    def __init__(self, session_factory: Callable, tz: str = "UTC"):
+        self.session_factory = session_factory
+        self.tz = ZoneInfo(tz)
+        self.on_stale: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+        self._boards: Dict[BoardKey, Leaderboard] = {}
+        self._week = self._week_start()
+        self.built_at: Optional[datetime] = None
+        self.build_seconds: Optional[float] = None
+        self.increments = 0
+
+    def _week_start(self, day: Optional[date] = None) -> date:
+        day = day or datetime.now(timezone.utc).astimezone(self.tz).date()
+        return day - timedelta(days=day.weekday())
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def rebuild(self) -> int:
+        """
+        从数据库汇总重建全部榜单（在锁外构建，完成后整体替换），返回榜单数；
+        汇总查询走只读会话，备库延迟造成的少量误差在下次重建时消除
+        """
+        started = time.monotonic()
+        week = self._week_start()
+        scores: Dict[BoardKey, Dict[int, int]] = {}
+
+        def collect(period: str, rows: Iterable[Any], by_language: bool) -> None:
+            for row in rows:
+                for metric in METRICS:
+                    value = getattr(row, metric) or 0
+                    if value <= 0:
+                        continue
+                    if by_language and row.language:
+                        board = scores.setdefault((metric, period, row.language), {})
+                        board[row.user_id] = board.get(row.user_id, 0) + value
+                    if not by_language or period == "week":
+                        board = scores.setdefault((metric, period, None), {})
+                        board[row.user_id] = board.get(row.user_id, 0) + value
+
+        with self.session_factory() as db:
+            collect("all", crud_leaderboards.all_time_totals(db), by_language=False)
+            collect("all", crud_leaderboards.language_totals(db), by_language=True)
+            collect("week", crud_leaderboards.language_totals(db, since=week), by_language=True)
+        boards = {key: Leaderboard(board_scores) for key, board_scores in scores.items()}
+
+        with self._lock:
+            self._boards = boards
+            self._week = week
+            self.built_at = datetime.now(timezone.utc)
+            self.build_seconds = time.monotonic() - started
+        logger.info(f"排行榜已重建: {len(boards)} 个榜单, 用时 {self.build_seconds:.2f}s")
+        return len(boards)
+
+    def _check_week(self) -> None:
+        """跨周时清空本周榜单并请求重建（调用方持有锁）"""
+        week = self._week_start()
+        if week != self._week:
+            self._boards = {key: board for key, board in self._boards.items() if key[1] != "week"}
+            self._week = week
+            if self.on_stale is not None:
+                self.on_stale()
+
+    def _add(self, key: BoardKey, user_id: int, delta: int) -> None:
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = Leaderboard()
+        board.add(user_id, delta)
+
+    def apply_flush(self, deltas: Dict[int, Dict[str, int]],
+                    daily: Dict[Tuple[int, date, str], Dict[str, int]]) -> None:
+        """学习记录写入数据库后的增量更新"""
+        with self._lock:
+            self._check_week()
+            for user_id, pending in deltas.items():
+                for metric in METRICS:
+                    self._add((metric, "all", None), user_id, pending.get(metric, 0))
+            for (user_id, day, language), pending in daily.items():
+                this_week = day >= self._week
+                for metric in METRICS:
+                    value = pending.get(metric, 0)
+                    if not value:
+                        continue
+                    if language:
+                        self._add((metric, "all", language), user_id, value)
+                    if this_week:
+                        self._add((metric, "week", None), user_id, value)
+                        if language:
+                            self._add((metric, "week", language), user_id, value)
+            self.increments += len(deltas) + len(daily)
+
+    def top(self, metric: str, period: str, language: Optional[str], offset: int,
+            limit: int) -> Tuple[List[Tuple[int, int, int, int]], int]:
+        """一页榜单 [(位置, 用户, 名次, 分数)] 和上榜人数"""
+        with self._lock:
+            self._check_week()
+            board = self._boards.get((metric, period, language))
+            if board is None:
+                return [], 0
+            return board.page(offset, limit), len(board)
+
+    def around(self, metric: str, period: str, language: Optional[str], user_id: int,
+               radius: int) -> Tuple[Optional[Tuple[int, int, int]], List[Tuple[int, int, int, int]], int]:
+        """用户的 (位置, 名次, 分数) 和前后各 radius 个位置的榜单，以及上榜人数"""
+        with self._lock:
+            self._check_week()
+            board = self._boards.get((metric, period, language))
+            if board is None:
+                return None, [], 0
+            mine = board.position(user_id)
+            if mine is None:
+                return None, [], len(board)
+            start = max(mine[0] - radius, 1)
+            return mine, board.page(start - 1, mine[0] + radius - start + 1), len(board)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "builtAt": self.built_at,
+                "buildSeconds": round(self.build_seconds, 3) if self.build_seconds is not None else None,
+                "weekStart": self._week,
+                "increments": self.increments,
+                "boards": [
+                    {"metric": metric, "period": period, "language": language, "users": len(board)}
+                    for (metric, period, language), board in sorted(
+                        self._boards.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or ""))
+                ],
+            }
+
+
+leaderboards = LeaderboardRegistry(replica_router.session, tz=settings.STATS_TIMEZONE)
+leaderboard_rebuilder = PeriodicTask("leaderboards", leaderboards.rebuild, settings.LEADERBOARD_REBUILD_INTERVAL,
+                                     run_on_stop=False)
+leaderboards.on_stale = leaderboard_rebuilder.trigger
+if settings.LEADERBOARD_ENABLED:
+    activity_buffer.listeners.append(leaderboards.apply_flush)
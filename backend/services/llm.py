@@ -0,0 +1,36 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from backend.core.config import settings
+from backend.services.upstreams import llm_upstreams
+from backend.services.usage import usage_ledger
+
+_THINK = re.compile(r"<think>.*?</think>", re.DOTALL)
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def complete(messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.7,
+             timeout: float = 120.0, user_id: Optional[int] = None, source: str = "job") -> Dict[str, Any]:
+    """
+    同步调用对话接口（供后台任务在线程池中使用），由上游池选择上游并在失败时换上游重试；
+    返回去掉思维链后的 content 以及 usage、finish_reason；用量按 user_id 和 source 记账
+    """
+    if not llm_upstreams.configured:
+        raise RuntimeError("API密钥未配置")
+    data = llm_upstreams.complete(
+        {"messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        timeout=timeout,
+    )
+    choice = data["choices"][0]
+    usage_ledger.record(user_id, source, data.get("model", settings.LLM_MODEL), data.get("usage"))
+    return {
+        "content": _THINK.sub("", choice["message"]["content"]).strip(),
+        "usage": data.get("usage"),
+        "finish_reason": choice.get("finish_reason"),
+    }
+
+
+def parse_json(content: str) -> Any:
+    """解析模型返回的 JSON，允许外层带有 ``` 代码块标记"""
+    return json.loads(_CODE_FENCE.sub("", content.strip()))
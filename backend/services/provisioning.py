@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic import ValidationError
+
+from backend.core.config import settings
+from backend.core.security import hash_passwords
+from backend.crud import users
+from backend.database.database import SessionLocal
+from backend.database.schemas import UserCreate
+from backend.services.difficulty import CEFR_LEVELS
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ("username", "email", "password", "language", "level")
+
+
+class InvalidAccounts(Exception):
+    """上传内容无法解析"""
+
+
+def parse_accounts(body: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """解析 CSV（首行为列名）或 JSON（数组或 {"accounts": [...]}）格式的账号列表"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise InvalidAccounts("内容必须是 UTF-8 编码")
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        missing = {"username", "email", "password"} - set(reader.fieldnames or [])
+        if missing:
+            raise InvalidAccounts(f"CSV 缺少列: {', '.join(sorted(missing))}")
+        return [{key: (row.get(key) or "").strip() or None for key in CSV_COLUMNS} for row in reader]
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise InvalidAccounts(f"JSON 解析失败: {e}")
+    if isinstance(data, dict):
+        data = data.get("accounts")
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise InvalidAccounts("JSON 必须是账号对象数组")
+    return data
+
+
+class PasswordHasher:
+    """在进程池中并行计算 bcrypt 哈希；进程池在第一次使用时创建"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 服务进程里有事件循环和后台线程，用 spawn 避免 fork 带来的锁状态问题
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def submit(self, passwords: List[str]) -> List[Future]:
+        """把密码平均分给各个进程，返回各段的 Future"""
+        if not passwords:
+            return []
+        if self.workers <= 0:
+            future: Future = Future()
+            future.set_result(hash_passwords(passwords))
+            return [future]
+        executor = self._get_executor()
+        size = -(-len(passwords) // self.workers)
+        return [executor.submit(hash_passwords, passwords[start:start + size]) for start in range(0, len(passwords), size)]
+
+    @staticmethod
+    def collect(futures: List[Future]) -> List[str]:
+        return [hashed for future in futures for hashed in future.result()]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def _validate(index: int, raw: Dict[str, Any], default_language: Optional[str], default_level: str,
+              usernames: set, emails: set) -> Dict[str, Any]:
+    """检查一行账号，返回待插入的账号或 {"row", "status", "error"}"""
+    try:
+        account = UserCreate(username=raw.get("username"), email=raw.get("email"), password=raw.get("password"))
+    except ValidationError as e:
+        fields = ", ".join(str(error["loc"][0]) for error in e.errors())
+        return {"row": index, "status": "invalid", "error": f"字段无效: {fields}"}
+    if not account.username.strip() or not account.password:
+        return {"row": index, "status": "invalid", "error": "用户名和密码不能为空"}
+    if len(account.password.encode("utf-8")) > 72:
+        # bcrypt 只使用前 72 字节
+        return {"row": index, "status": "invalid", "error": "密码不能超过 72 字节"}
+    level = str(raw.get("level") or default_level).upper()
+    if level not in CEFR_LEVELS:
+        return {"row": index, "status": "invalid", "error": f"未知的级别: {level}"}
+    if account.username in usernames or account.email in emails:
+        return {"row": index, "status": "duplicate", "error": "与前面的行重复"}
+    usernames.add(account.username)
+    emails.add(account.email)
+    return {
+        "row": index,
+        "username": account.username,
+        "email": account.email,
+        "password": account.password,
+        "language": raw.get("language") or default_language,
+        "level": level,
+    }
+
+
+def _insert_batch(batch: List[Dict[str, Any]], hashes: List[str]) -> Iterator[Dict[str, Any]]:
+    """一个批次：多行插入用户、初始学习语言和学习统计，在同一个事务中提交"""
+    with SessionLocal() as db:
+        created = users.bulk_insert(db, [
+            {"username": account["username"], "email": account["email"], "hashed_password": hashed,
+             "is_active": True, "is_superuser": False}
+            for account, hashed in zip(batch, hashes)
+        ])
+        users.bulk_init_learning(
+            db,
+            [{"user_id": created[account["username"]], "language": account["language"], "level": account["level"],
+              "progress": 0.0}
+             for account in batch if account["username"] in created and account["language"]],
+            list(created.values()),
+        )
+        db.commit()
+
+        conflicts = [account for account in batch if account["username"] not in created]
+        taken_usernames, taken_emails = users.find_existing(
+            db, [account["username"] for account in conflicts], [account["email"] for account in conflicts]
+        ) if conflicts else (set(), set())
+
+    for account in batch:
+        if account["username"] in created:
+            yield {"row": account["row"], "status": "created", "id": created[account["username"]],
+                   "username": account["username"]}
+        else:
+            field = "username" if account["username"] in taken_usernames else "email"
+            yield {"row": account["row"], "status": "conflict", "username": account["username"],
+                   "error": f"{field} 已被使用"}
+
+
+def provision(accounts: List[Dict[str, Any]], default_language: Optional[str],
+              default_level: str) -> Iterator[Dict[str, Any]]:
+    """
+    批量开通账号，逐行产出结果，最后产出汇总；
+    下一批的密码哈希在进程池中计算的同时写入当前批次
+    """
+    results: List[Dict[str, Any]] = []
+    usernames: set = set()
+    emails: set = set()
+    valid = []
+    for index, raw in enumerate(accounts):
+        checked = _validate(index, raw, default_language, default_level, usernames, emails)
+        if "status" in checked:
+            results.append(checked)
+        else:
+            valid.append(checked)
+
+    counts = {"created": 0, "conflict": 0, "invalid": 0, "duplicate": 0}
+    for result in results:
+        counts[result["status"]] += 1
+        yield result
+
+    batch_size = settings.PROVISION_BATCH_SIZE
+    batches = [valid[start:start + batch_size] for start in range(0, len(valid), batch_size)]
+    pending = password_hasher.submit([account["password"] for account in batches[0]]) if batches else []
+    for number, batch in enumerate(batches):
+        hashes = password_hasher.collect(pending)
+        if number + 1 < len(batches):
+            pending = password_hasher.submit([account["password"] for account in batches[number + 1]])
+        for result in _insert_batch(batch, hashes):
+            counts[result["status"]] += 1
+            yield result
+
+    logger.info(f"批量开通账号: {counts}")
+    yield {"summary": {"total": len(accounts), **counts}}
+
+
+password_hasher = PasswordHasher(settings.PROVISION_HASH_WORKERS)
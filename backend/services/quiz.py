@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.crud import jobs as crud_jobs
+from backend.crud import quiz as crud_quiz
+from backend.services import llm
+from backend.services.difficulty import CEFR_LEVELS, difficulty_estimator, level_index
+from backend.services.jobs import submit
+
+logger = logging.getLogger(__name__)
+
+REFILL_JOB = "quiz_refill"
+KINDS = ("multiple_choice", "fill_blank")
+BLANK = "___"
+# 同一题库两次提交补充任务的最小间隔（秒）
+REFILL_COOLDOWN = 60.0
+# 提示词中附带的已有题目数，用于减少重复
+AVOID_SAMPLE = 15
+
+LANGUAGES = [language.strip() for language in settings.QUIZ_LANGUAGES.split(",") if language.strip()]
+TOPICS = [topic.strip() for topic in settings.QUIZ_TOPICS.split(",") if topic.strip()]
+
+SYSTEM_PROMPT = (
+    "你是一位语言教师，为学习者编写练习题。只返回 JSON 数组，每个元素格式为 "
+    "{\"kind\": \"multiple_choice\" 或 \"fill_blank\", \"question\": 题干, \"options\": 选项数组, "
+    "\"answer\": 正确答案, \"explanation\": 简短的中文解析}。"
+    "选择题给出 4 个互不相同的选项且答案必须是其中之一；填空题在题干中用 ___ 表示空格，options 为 null。"
+)
+
+PoolKey = Tuple[str, str, str]
+
+
+def pool_name(key: PoolKey) -> str:
+    return "/".join(key)
+
+
+def _normalize(value: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", value).split()).lower()
+
+
+def content_hash(question: str, answer: str) -> str:
+    return hashlib.sha256(f"{_normalize(question)}\n{_normalize(answer)}".encode("utf-8")).hexdigest()
+
+
+def validate_exercise(raw: Any, language: str, level: str) -> Optional[Dict[str, Any]]:
+    """检查模型生成的一道题，不合格时返回 None；选择题的选项顺序随机打乱"""
+    if not isinstance(raw, dict):
+        return None
+    kind, question, answer = raw.get("kind"), raw.get("question"), raw.get("answer")
+    if kind not in KINDS or not isinstance(question, str) or not isinstance(answer, str):
+        return None
+    question, answer = question.strip(), answer.strip()
+    if not 5 <= len(question) <= 500 or not 1 <= len(answer) <= 200:
+        return None
+
+    options = None
+    if kind == "multiple_choice":
+        options = raw.get("options")
+        if not isinstance(options, list) or len(options) != 4 or not all(isinstance(o, str) for o in options):
+            return None
+        options = [option.strip() for option in options]
+        if len({_normalize(option) for option in options}) != 4 or answer not in options:
+            return None
+        random.shuffle(options)
+    elif BLANK not in question:
+        return None
+
+    # 题干明显超出目标级别（高一级以内可以接受）时丢弃
+    estimate = difficulty_estimator.estimate(question.replace(BLANK, " "), language)
+    if estimate and estimate["tokens"] >= 5 and estimate["levelIndex"] > level_index(level) + 1:
+        return None
+
+    explanation = raw.get("explanation")
+    return {
+        "kind": kind,
+        "question": question,
+        "options": options,
+        "answer": answer,
+        "explanation": explanation.strip()[:500] if isinstance(explanation, str) else None,
+        "content_hash": content_hash(question, answer),
+    }
+
+
+def generate_exercises(key: PoolKey, count: int, avoid: List[str], source: str) -> Tuple[List[Dict[str, Any]], int]:
+    """调用模型生成一批题目，返回 (通过检查的题目, 被丢弃数)"""
+    language, level, topic = key
+    prompt = f"用{language}出 {count} 道 CEFR {level} 水平、主题为「{topic}」的练习题，选择题和填空题大致各半。"
+    if avoid:
+        prompt += "\n不要与以下已有题目重复：\n" + "\n".join(f"- {question}" for question in avoid)
+    reply = llm.complete(
+        [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+        max_tokens=150 * count + 100,
+        temperature=0.9,
+        timeout=120.0,
+        source=source,
+    )
+    try:
+        items = llm.parse_json(reply["content"])
+    except ValueError:
+        return [], count
+    if not isinstance(items, list):
+        return [], count
+
+    exercises, rejected, hashes = [], 0, set()
+    for item in items:
+        exercise = validate_exercise(item, language, level)
+        if exercise is None or exercise["content_hash"] in hashes:
+            rejected += 1
+            continue
+        hashes.add(exercise["content_hash"])
+        exercises.append({"language": language, "level": level, "topic": topic, **exercise})
+    return exercises, rejected
+
+
+def public_exercise(exercise: Dict[str, Any]) -> Dict[str, Any]:
+    """返回给学习者的题目，不含答案"""
+    return {"id": exercise["id"], "kind": exercise["kind"], "question": exercise["question"],
+            "options": exercise["options"]}
+
+
+class QuizPools:
+    """
+    预生成题库的进程内缓存：按 (语言, 级别, 主题) 缓存上线题目，过期后重新读取；
+    抽题时只需按主键查询用户做过的题目，题库不足时提交后台补充任务
+    """
+
+    def __init__(self, ttl: float, low_water: int, target: int):
+        self.ttl = ttl
+        self.low_water = low_water
+        self.target = target
+        self._pools: Dict[PoolKey, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._refill_requested: Dict[PoolKey, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_pool(self, db: Session, key: PoolKey) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._pools.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        pool = crud_quiz.list_pool(db, *key)
+        with self._lock:
+            self._pools[key] = (now, pool)
+        return pool
+
+    def invalidate(self, key: Optional[PoolKey] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._pools.clear()
+            else:
+                self._pools.pop(key, None)
+
+    def request_refill(self, db: Session, key: PoolKey, force: bool = False) -> bool:
+        """提交补充任务；冷却期内或已有同一题库的任务在排队时跳过"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._refill_requested.get(key, float("-inf")) < REFILL_COOLDOWN:
+                return False
+            self._refill_requested[key] = now
+        if crud_jobs.has_active(db, REFILL_JOB, "pool", pool_name(key)):
+            return False
+        language, level, topic = key
+        submit(db, REFILL_JOB, {"pool": pool_name(key), "language": language, "level": level, "topic": topic},
+               priority=-1)
+        logger.info(f"题库 {pool_name(key)} 不足，已提交补充任务")
+        return True
+
+    def draw(self, db: Session, user_id: int, key: PoolKey, count: int) -> Dict[str, Any]:
+        """为用户随机抽取一组没做过的题目；题库中的题都做过后重新开始"""
+        pool = self.get_pool(db, key)
+        if len(pool) < self.low_water:
+            self.request_refill(db, key)
+        if not pool:
+            return {"exercises": [], "poolSize": 0, "restarted": False}
+
+        seen = crud_quiz.seen_ids(db, user_id, [exercise["id"] for exercise in pool])
+        unseen = [exercise for exercise in pool if exercise["id"] not in seen]
+        chosen = random.sample(unseen, min(count, len(unseen)))
+        reset: List[int] = []
+        if len(chosen) < count:
+            # 不够一组时用做过的题补齐，并清空该题库的记录
+            reset = list(seen)
+            seen_pool = [exercise for exercise in pool if exercise["id"] in seen]
+            chosen += random.sample(seen_pool, min(count - len(chosen), len(seen_pool)))
+        crud_quiz.mark_seen(db, user_id, [exercise["id"] for exercise in chosen], reset)
+        return {
+            "exercises": [public_exercise(exercise) for exercise in chosen],
+            "poolSize": len(pool),
+            "restarted": bool(reset),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cachedPools": len(self._pools), "hits": self.hits, "misses": self.misses}
+
+
+def all_pool_keys() -> List[PoolKey]:
+    return [(language, level, topic) for language in LANGUAGES for level in CEFR_LEVELS for topic in TOPICS]
+
+
+quiz_pools = QuizPools(
+    ttl=settings.QUIZ_CACHE_TTL,
+    low_water=settings.QUIZ_POOL_LOW_WATER,
+    target=settings.QUIZ_POOL_TARGET,
+)
@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.crud import recommendations as crud_recommendations
+from backend.database.replicas import replica_router
+from backend.services.difficulty import UNKNOWN_LEVEL, difficulty_estimator, level_index
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+# 相似度按条目分块计算，限制中间结果的内存
+SIMILARITY_BLOCK = 2048
+# 流行度只用于打破平局和冷启动
+POPULARITY_WEIGHT = 1e-3
+
+
+def _top_k_rows(matrix: sparse.csr_matrix, k: int, offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """每行只保留最大的 k 个值（去掉对角线），返回 (行, 列, 值)"""
+    rows, cols, values = [], [], []
+    for r in range(matrix.shape[0]):
+        start, end = matrix.indptr[r], matrix.indptr[r + 1]
+        indices, data = matrix.indices[start:end], matrix.data[start:end]
+        keep = indices != r + offset
+        indices, data = indices[keep], data[keep]
+        if data.size > k:
+            top = np.argpartition(-data, k)[:k]
+            indices, data = indices[top], data[top]
+        rows.append(np.full(indices.size, r + offset, dtype=np.int32))
+        cols.append(indices)
+        values.append(data)
+    if not rows:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+
+class ItemIndex:
+    """
+    某种语言某类条目（单词或课程）的推荐索引：
+    用户 × 条目的稀疏交互矩阵、每个条目保留前 k 个近邻的条目相似度矩阵（余弦），
+    以及条目级别和流行度
+    """
+
+    def __init__(self, keys: List[Hashable], levels: np.ndarray, user_ids: np.ndarray,
+                 interactions: sparse.csr_matrix, neighbors: int):
+        self.keys = keys
+        self.positions = {key: i for i, key in enumerate(keys)}
+        self.levels = levels
+        self.user_ids = user_ids
+        self.interactions = interactions
+        popularity = np.asarray((interactions > 0).sum(axis=0), dtype=np.float32).ravel()
+        self.popularity = popularity / popularity.max() if popularity.size and popularity.max() > 0 else popularity
+        self.similarity = self._similarity(interactions, neighbors)
+        # 增量刷新后的用户向量，下一次全量重建前优先使用
+        self.overrides: Dict[int, sparse.csr_matrix] = {}
+
+    @staticmethod
+    def _similarity(interactions: sparse.csr_matrix, neighbors: int) -> sparse.csr_matrix:
+        n = interactions.shape[1]
+        norms = np.sqrt(np.asarray(interactions.multiply(interactions).sum(axis=0)).ravel())
+        normalized = (interactions @ sparse.diags(1.0 / np.maximum(norms, 1e-12))).astype(np.float32).tocsc()
+        transposed = normalized.T.tocsr()
+        rows, cols, values = [], [], []
+        for start in range(0, n, SIMILARITY_BLOCK):
+            block = (transposed[start:start + SIMILARITY_BLOCK] @ normalized).tocsr()
+            r, c, v = _top_k_rows(block, neighbors, start)
+            rows.append(r)
+            cols.append(c)
+            values.append(v)
+        if not rows:
+            return sparse.csr_matrix((n, n), dtype=np.float32)
+        return sparse.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n), dtype=np.float32
+        )
+
+    def user_vector(self, user_id: int) -> Optional[sparse.csr_matrix]:
+        if user_id in self.overrides:
+            return self.overrides[user_id]
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < self.user_ids.size and self.user_ids[position] == user_id:
+            return self.interactions[position]
+        return None
+
+    def vector_for(self, items: Dict[Hashable, float]) -> sparse.csr_matrix:
+        """用条目到权重的映射构造用户向量，索引中没有的新条目忽略（下次全量重建时加入）"""
+        known = [(self.positions[key], weight) for key, weight in items.items() if key in self.positions]
+        columns = np.array([c for c, _ in known], dtype=np.int32)
+        data = np.array([w for _, w in known], dtype=np.float32)
+        return sparse.csr_matrix((data, (np.zeros(len(known), dtype=np.int32), columns)),
+                                 shape=(1, len(self.keys)), dtype=np.float32)
+
+    def recommend(self, user_id: int, max_level: Optional[int], limit: int) -> List[Tuple[Hashable, int, float]]:
+        """
+        对用户已有条目的近邻相似度求和作为得分，排除已学过的和超出级别上限的条目，
+        返回 [(条目, 级别编码, 得分)]；没有交互记录的用户按流行度推荐
+        """
+        vector = self.user_vector(user_id)
+        if vector is not None and vector.nnz:
+            scores = np.asarray((vector @ self.similarity).todense(), dtype=np.float32).ravel()
+            scores += POPULARITY_WEIGHT * self.popularity
+            scores[vector.indices] = -np.inf
+        else:
+            scores = self.popularity.copy()
+        if max_level is not None:
+            scores[(self.levels > max_level) & (self.levels != UNKNOWN_LEVEL)] = -np.inf
+        limit = min(limit, scores.size)
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.keys[i], int(self.levels[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def _build_index(rows: List[Tuple[int, Hashable, float]], levels: Callable[[List[Hashable]], np.ndarray],
+                 neighbors: int) -> ItemIndex:
+    keys = sorted({key for _, key, _ in rows})
+    positions = {key: i for i, key in enumerate(keys)}
+    user_ids = np.unique(np.array([user_id for user_id, _, _ in rows], dtype=np.int64))
+    matrix = sparse.csr_matrix(
+        (np.array([weight for _, _, weight in rows], dtype=np.float32),
+         (np.searchsorted(user_ids, [user_id for user_id, _, _ in rows]),
+          np.array([positions[key] for _, key, _ in rows], dtype=np.int32))),
+        shape=(user_ids.size, len(keys)), dtype=np.float32,
+    )
+    return ItemIndex(keys, levels(keys), user_ids, matrix, neighbors)
+
+
+def _word_levels(language: str) -> Callable[[List[Hashable]], np.ndarray]:
+    def lookup(keys: List[Hashable]) -> np.ndarray:
+        table = difficulty_estimator.table(language)
+        if table is None:
+            return np.full(len(keys), UNKNOWN_LEVEL, dtype=np.uint8)
+        return table.lookup_levels(list(keys))
+    return lookup
+
+
+def _lesson_levels(keys: List[Hashable]) -> np.ndarray:
+    return np.array([level_index(key[0]) or UNKNOWN_LEVEL for key in keys], dtype=np.uint8)
+
+
+class RecommendationEngine:
+    """
+    下一步学习内容推荐（基于条目的协同过滤）：
+    - 定期从只读库全量构建每种语言的单词、课程索引并预计算条目相似度
+    - 更频繁地按 id 水位找出有新交互的用户，只重建这些用户的向量
+    - 请求时只做一次稀疏向量乘矩阵和 top-N 选择
+    """
+
+    KINDS = ("words", "lessons")
+
+    def __init__(self, neighbors: int, history_days: int, rebuild_interval: float, latency_target_ms: float):
+        self.neighbors = neighbors
+        self.history_days = history_days
+        self.rebuild_interval = rebuild_interval
+        self.latency_target_ms = latency_target_ms
+        self._indexes: Dict[Tuple[str, str], ItemIndex] = {}
+        self._watermarks: Optional[Tuple[int, int]] = None
+        self._refreshed_at: Optional[datetime] = None
+        self._built_at = 0.0
+        self._latencies: deque = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(["rebuilds", "incremental", "users_refreshed", "requests", "slow"], 0)
+
+    @property
+    def ready(self) -> bool:
+        return self._watermarks is not None
+
+    def _history_since(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=self.history_days)
+
+    @staticmethod
+    def _group(word_rows: List[tuple], lesson_rows: List[tuple]) -> Dict[Tuple[str, str], List[Tuple[int, Hashable, float]]]:
+        grouped: Dict[Tuple[str, str], List[Tuple[int, Hashable, float]]] = {}
+        for user_id, language, word in word_rows:
+            grouped.setdefault(("words", language.lower()), []).append((user_id, word, 1.0))
+        for user_id, language, level, activity_type, title, count in lesson_rows:
+            # 重复学习同一课程的权重按对数增长
+            grouped.setdefault(("lessons", language.lower()), []).append(
+                (user_id, (level.upper(), activity_type, title), float(np.log1p(count)))
+            )
+        return grouped
+
+    def rebuild(self) -> None:
+        """全量构建所有索引"""
+        started = time.perf_counter()
+        db = replica_router.session()
+        try:
+            # 先取水位再读数据，读取期间新增的交互会在下一次增量刷新中补上
+            watermarks = crud_recommendations.max_ids(db)
+            refreshed_at = datetime.now(timezone.utc)
+            word_rows = [row for batch in crud_recommendations.iter_word_interactions(db, BATCH_SIZE) for row in batch]
+            lesson_rows = [row for batch in crud_recommendations.iter_lesson_interactions(
+                db, self._history_since(), BATCH_SIZE) for row in batch]
+        finally:
+            db.close()
+
+        indexes = {}
+        for (kind, language), rows in self._group(word_rows, lesson_rows).items():
+            levels = _word_levels(language) if kind == "words" else _lesson_levels
+            indexes[(kind, language)] = _build_index(rows, levels, self.neighbors)
+        with self._lock:
+            self._indexes = indexes
+            self._watermarks = watermarks
+            self._refreshed_at = refreshed_at
+            self._built_at = time.time()
+            self.counters["rebuilds"] += 1
+        logger.info(f"推荐索引已重建: {len(indexes)} 个索引, {len(word_rows)} 条单词交互, "
+                    f"{len(lesson_rows)} 条课程交互, 耗时 {time.perf_counter() - started:.2f}s")
+
+    def refresh(self) -> int:
+        """增量刷新：重新读取水位之后有新交互的用户的全部交互，替换其用户向量"""
+        if not self.ready:
+            return 0
+        db = replica_router.session()
+        try:
+            watermarks = crud_recommendations.max_ids(db)
+            # 学习记录可能在缓冲中停留片刻才写入，时间条件留出余量
+            refreshed_at = datetime.now(timezone.utc)
+            user_ids = sorted(crud_recommendations.changed_users(
+                db, self._watermarks[0], self._watermarks[1], self._refreshed_at - timedelta(hours=1)
+            ))
+            word_rows, lesson_rows = [], []
+            for start in range(0, len(user_ids), 1000):
+                chunk = user_ids[start:start + 1000]
+                word_rows += [row for batch in crud_recommendations.iter_word_interactions(
+                    db, BATCH_SIZE, chunk) for row in batch]
+                lesson_rows += [row for batch in crud_recommendations.iter_lesson_interactions(
+                    db, self._history_since(), BATCH_SIZE, chunk) for row in batch]
+        finally:
+            db.close()
+
+        items: Dict[Tuple[str, str], Dict[int, Dict[Hashable, float]]] = {}
+        for key, rows in self._group(word_rows, lesson_rows).items():
+            for user_id, item, weight in rows:
+                items.setdefault(key, {}).setdefault(user_id, {})[item] = weight
+        with self._lock:
+            for key, users in items.items():
+                index = self._indexes.get(key)
+                if index is None:
+                    continue  # 新语言等到下一次全量重建
+                for user_id, user_items in users.items():
+                    index.overrides[user_id] = index.vector_for(user_items)
+            self._watermarks = watermarks
+            self._refreshed_at = refreshed_at
+            self.counters["incremental"] += 1
+            self.counters["users_refreshed"] += len(user_ids)
+        return len(user_ids)
+
+    def tick(self) -> None:
+        if not self.ready or time.time() - self._built_at >= self.rebuild_interval:
+            self.rebuild()
+        else:
+            self.refresh()
+
+    def recommend(self, kind: str, user_id: int, language: str, learner_level: Optional[str],
+                  limit: int) -> List[Tuple[Hashable, int, float]]:
+        """返回 [(条目, 级别编码, 得分)]；级别上限为学习者级别的下一级"""
+        started = time.perf_counter()
+        index = self._indexes.get((kind, language.lower()))
+        learner_index = level_index(learner_level)
+        max_level = learner_index + 1 if learner_index is not None else None
+        result = index.recommend(user_id, max_level, limit) if index is not None else []
+        elapsed = (time.perf_counter() - started) * 1000
+        self._latencies.append(elapsed)
+        self.counters["requests"] += 1
+        if elapsed > self.latency_target_ms:
+            self.counters["slow"] += 1
+            logger.warning(f"推荐耗时 {elapsed:.1f}ms 超过目标: {kind}/{language}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+        return {
+            "ready": self.ready,
+            "builtAt": self._built_at or None,
+            "indexes": {
+                f"{kind}/{language}": {"users": int(index.user_ids.size), "items": len(index.keys),
+                                       "interactions": int(index.interactions.nnz),
+                                       "neighbors": int(index.similarity.nnz), "overrides": len(index.overrides)}
+                for (kind, language), index in self._indexes.items()
+            },
+            "latencyMs": {"p50": float(np.percentile(latencies, 50)), "p95": float(np.percentile(latencies, 95)),
+                          "target": self.latency_target_ms},
+            **self.counters,
+        }
+
+
+recommendation_engine = RecommendationEngine(
+    neighbors=settings.RECOMMEND_NEIGHBORS,
+    history_days=settings.RECOMMEND_HISTORY_DAYS,
+    rebuild_interval=settings.RECOMMEND_REBUILD_INTERVAL,
+    latency_target_ms=settings.RECOMMEND_LATENCY_TARGET_MS,
+)
+recommendation_refresher = PeriodicTask(
+    "recommendations", recommendation_engine.tick, settings.RECOMMEND_REFRESH_INTERVAL, run_on_stop=False
+)
@@ -0,0 +1,149 @@
+import html
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.crud import search as crud_search
+
+# 有 Postgres 内置词干规则的语言，其余语言的拉丁文字部分用 simple（只转小写）
+TEXT_SEARCH_CONFIGS = {
+    "english": "english", "french": "french", "german": "german", "spanish": "spanish",
+    "italian": "italian", "portuguese": "portuguese", "russian": "russian", "dutch": "dutch",
+    "swedish": "swedish", "danish": "danish", "norwegian": "norwegian", "finnish": "finnish",
+    "hungarian": "hungarian", "turkish": "turkish",
+}
+DEFAULT_CONFIG = "simple"
+
+# 中日韩文字连续的一段；默认解析器不会切分这类文本，由应用切成单字和相邻二元组
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+_WORD = re.compile(r"\w+")
+
+
+def text_search_config(language: Optional[str]) -> str:
+    return TEXT_SEARCH_CONFIGS.get((language or "").strip().lower(), DEFAULT_CONFIG)
+
+
+def _cjk_grams(run: str) -> List[str]:
+    return list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def split_text(text: Optional[str]) -> Tuple[str, str]:
+    """拆成 (拉丁等文字部分, 中日韩单字和二元组)，分别交给对应语言的配置和 simple 配置生成 tsvector"""
+    if not text:
+        return "", ""
+    grams = [gram for run in _CJK_RUN.findall(text) for gram in _cjk_grams(run)]
+    return _CJK_RUN.sub(" ", text), " ".join(grams)
+
+
+def split_query(query: str) -> Tuple[str, str]:
+    """查询文本：中日韩部分单字查单字、多字查相邻二元组（全部命中才算匹配）"""
+    grams = []
+    for run in _CJK_RUN.findall(query):
+        grams.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+    latin = _CJK_RUN.sub(" ", query).strip()
+    return (latin if _WORD.search(latin) else ""), " ".join(grams)
+
+
+def document_row(user_id: int, source: str, language: Optional[str], title: Optional[str],
+                 content: Optional[str], created_at: Optional[datetime] = None,
+                 source_id: Optional[int] = None) -> Dict[str, Any]:
+    """生成一条检索文档的插入参数"""
+    title_text, title_cjk = split_text(title)
+    content_text, content_cjk = split_text(content)
+    return {
+        "user_id": user_id,
+        "source": source,
+        "source_id": source_id,
+        "language": language,
+        "title": title,
+        "content": content,
+        "created_at": created_at or datetime.now().astimezone(),
+        "config": text_search_config(language),
+        "title_text": title_text,
+        "title_cjk": title_cjk,
+        "content_text": content_text,
+        "content_cjk": content_cjk,
+    }
+
+
+def history_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    return document_row(row["user_id"], "history", row.get("language"), row.get("title"),
+                        row.get("activity_type"), row.get("created_at"))
+
+
+def chat_document(transcript_id: int, user_id: int, language: Optional[str], message: str, response: str,
+                  created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    return document_row(user_id, "chat", language, message[:200], f"{message}\n{response}", created_at,
+                        source_id=transcript_id)
+
+
+def record_chat(db: Session, user_id: int, language: Optional[str], mode: Optional[str], message: str,
+                response: str) -> int:
+    """保存一轮对话并写入检索文档"""
+    row = {"user_id": user_id, "language": language, "mode": mode, "message": message, "response": response}
+    transcript_id = crud_search.insert_chat(db, row)
+    crud_search.index_documents(db, [chat_document(transcript_id, user_id, language, message, response)])
+    db.commit()
+    return transcript_id
+
+
+def query_terms(query: str) -> List[str]:
+    """用于在原文中定位摘要的词"""
+    terms = [word.lower() for word in _WORD.findall(_CJK_RUN.sub(" ", query)) if len(word) > 1]
+    return terms + _CJK_RUN.findall(query)
+
+
+def make_snippet(text: Optional[str], terms: List[str], width: Optional[int] = None) -> str:
+    """截取第一个命中词附近的一段并用 <mark> 标出命中词（已做 HTML 转义）"""
+    if not text:
+        return ""
+    width = width or settings.SEARCH_SNIPPET_CHARS
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    piece = text[start:start + width]
+    snippet = html.escape(piece)
+    if terms:
+        pattern = re.compile("|".join(re.escape(html.escape(term)) for term in sorted(terms, key=len, reverse=True)),
+                             re.IGNORECASE)
+        snippet = pattern.sub(lambda match: f"<mark>{match.group(0)}</mark>", snippet)
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+def search_documents(db: Session, user_id: int, query: str, source: Optional[str] = None,
+                     language: Optional[str] = None, sort: str = "relevance", page: int = 1,
+                     page_size: int = 20) -> Dict[str, Any]:
+    """检索用户的学习历史和对话记录，返回带摘要的一页结果"""
+    latin, cjk = split_query(query)
+    if not latin and not cjk:
+        return {"total": 0, "totalCapped": False, "page": page, "pageSize": page_size, "results": []}
+    # 指定语言时只用该语言的配置解析查询，否则同时用 simple 和各语言配置（文档可能是任一语言）
+    configs = [text_search_config(language)] if language else \
+        sorted({DEFAULT_CONFIG, *TEXT_SEARCH_CONFIGS.values()})
+    rows, total = crud_search.search(
+        db, user_id, latin, cjk, configs, source, language, sort,
+        limit=page_size, offset=(page - 1) * page_size, candidates=settings.SEARCH_CANDIDATE_LIMIT,
+    )
+    terms = query_terms(query)
+    return {
+        "total": total,
+        # 匹配数达到候选上限时只是下限
+        "totalCapped": total >= settings.SEARCH_CANDIDATE_LIMIT,
+        "page": page,
+        "pageSize": page_size,
+        "results": [
+            {
+                "source": row.source,
+                "sourceId": row.source_id,
+                "language": row.language,
+                "title": row.title,
+                "snippet": make_snippet(row.content if row.source == "chat" else row.title, terms),
+                "rank": round(float(row.rank), 4),
+                "createdAt": row.created_at,
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,224 @@
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.core.config import settings
+
+# 提问开头和结尾常见的套话，去掉后 "what's the meaning of 'ubiquitous'?" 与 "meaning of ubiquitous" 归一为同一句；
+# 只去掉首尾的套话，句中的词保持不变
+_LEADING_WORDS = {
+    "what", "whats", "what's", "is", "are", "the", "a", "an", "of", "does", "do", "meaning", "definition",
+    "please", "can", "could", "you", "tell", "me", "explain", "define",
+}
+_TRAILING_WORDS = {"mean", "means", "please"}
+_CJK_PREFIX = re.compile(r"^(?:请问|请|问一下)")
+_CJK_SUFFIX = re.compile(r"(?:是)?(?:什么|啥)意思[吗呢啊]?$|[吗呢啊]$")
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+# 实词集合：中日韩文本按单字，其他文本按词，去掉虚词；只有实词完全相同的提问才可能命中，
+# 避免长提问只差一两个实词（"... with my family to buy some bread" 与 "... some rice"）时字符相似度仍超过阈值
+_CJK = "\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN = re.compile(rf"[{_CJK}]|[^\s{_CJK}]+")
+_FUNCTION_WORDS = _LEADING_WORDS | _TRAILING_WORDS | {
+    "i", "me", "my", "we", "our", "your", "he", "she", "it", "they", "them", "this", "that", "these", "those",
+    "to", "in", "on", "at", "for", "with", "from", "by", "about", "into", "and", "or", "but", "so", "if", "than",
+    "be", "been", "was", "were", "am", "has", "have", "had", "did", "will", "would", "should", "some", "any",
+    "how", "why", "when", "where", "which", "who", "not", "no", "very", "just", "there", "here",
+    "的", "了", "吗", "呢", "啊", "呀", "吧", "是", "在", "和", "与", "我", "你", "他", "她", "它", "们", "这", "那", "个",
+    "一", "下", "请", "么",
+}
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = unicodedata.normalize("NFKC", prompt).lower().replace("’", "'")
+    text = _PUNCTUATION.sub(" ", text).strip()
+    text = _CJK_SUFFIX.sub("", _CJK_PREFIX.sub("", text)).strip()
+    words = [word.strip("'") for word in _SPACES.split(text)]
+    words = [word for word in words if word]
+    while words and words[0] in _LEADING_WORDS:
+        words.pop(0)
+    while words and words[-1] in _TRAILING_WORDS:
+        words.pop()
+    return " ".join(words)
+
+
+def content_words(text: str) -> FrozenSet[str]:
+    """规范化后的提问中的实词"""
+    return frozenset(token for token in _TOKEN.findall(text) if token not in _FUNCTION_WORDS)
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    """字符级 n-gram，不依赖分词，对中日韩文本同样适用"""
+    if len(text) <= size:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+class MinHashLSH:
+    """MinHash 签名 + 分段 LSH 分桶"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        # multiply-shift 哈希：h(x) = ((a * x + b) mod 2^64) >> 32，a 为奇数
+        self._a = rng.randint(0, 2 ** 63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 2 ** 63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, items: FrozenSet[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(item.encode("utf-8")) for item in items), dtype=np.uint64, count=len(items))
+        with np.errstate(over="ignore"):
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+
+class _Entry:
+    __slots__ = ("namespace", "signature", "shingles", "words", "value", "created_at", "hits")
+
+    def __init__(self, namespace: Hashable, signature: np.ndarray, items: FrozenSet[str], words: FrozenSet[str],
+                 value: Any):
+        self.namespace = namespace
+        self.signature = signature
+        self.shingles = items
+        self.words = words
+        self.value = value
+        self.created_at = time.monotonic()
+        self.hits = 0
+
+
+class SimilarityCache:
+    """
+    近似重复问题缓存：按命名空间（语言、水平等）隔离，
+    实词集合相同且 MinHash 估计相似度超过阈值时返回已有回答，按 LRU 淘汰、按 TTL 过期；
+    按比例抽样计算精确 Jaccard 相似度，统计误命中
+    """
+
+    def __init__(self, threshold: float, capacity: int, ttl: float, audit_rate: float,
+                 num_perm: int = 64, bands: int = 16):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.audit_rate = audit_rate
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[Hashable, int, bytes], Set[int]] = {}
+        self._next_id = 0
+        self._random = random.Random()
+        self.counters = dict.fromkeys(
+            ["lookups", "hits", "misses", "stores", "evictions", "expired", "audited", "false_positives"], 0
+        )
+
+    def _fingerprint(self, prompt: str) -> Optional[Tuple[FrozenSet[str], np.ndarray, FrozenSet[str]]]:
+        text = normalize_prompt(prompt)
+        items = shingles(text)
+        if not items:
+            return None
+        return items, self.lsh.signature(items), content_words(text)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for band, key in self.lsh.band_keys(entry.signature):
+            bucket = self._buckets.get((entry.namespace, band, key))
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[(entry.namespace, band, key)]
+
+    def lookup(self, namespace: Hashable, prompt: str) -> Optional[Any]:
+        fingerprint = self._fingerprint(prompt)
+        with self._lock:
+            self.counters["lookups"] += 1
+            if fingerprint is None:
+                self.counters["misses"] += 1
+                return None
+            items, signature, words = fingerprint
+
+            candidates: Set[int] = set()
+            for band, key in self.lsh.band_keys(signature):
+                candidates |= self._buckets.get((namespace, band, key), set())
+
+            now = time.monotonic()
+            live: List[int] = []
+            for entry_id in candidates:
+                if now - self._entries[entry_id].created_at > self.ttl:
+                    self._remove(entry_id)
+                    self.counters["expired"] += 1
+                elif self._entries[entry_id].words == words:
+                    live.append(entry_id)
+            if not live:
+                self.counters["misses"] += 1
+                return None
+
+            # 一次性计算所有候选的估计相似度
+            similarities = (np.stack([self._entries[i].signature for i in live]) == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            best_id, best_similarity = live[best], float(similarities[best])
+            if best_similarity < self.threshold:
+                self.counters["misses"] += 1
+                return None
+
+            entry = self._entries[best_id]
+            if self._random.random() < self.audit_rate:
+                self.counters["audited"] += 1
+                exact = len(items & entry.shingles) / len(items | entry.shingles)
+                if exact < self.threshold:
+                    # 抽检发现误命中时不使用该结果
+                    self.counters["false_positives"] += 1
+                    self.counters["misses"] += 1
+                    return None
+
+            self._entries.move_to_end(best_id)
+            entry.hits += 1
+            self.counters["hits"] += 1
+            return entry.value
+
+    def store(self, namespace: Hashable, prompt: str, value: Any) -> None:
+        fingerprint = self._fingerprint(prompt)
+        if fingerprint is None:
+            return
+        items, signature, words = fingerprint
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(namespace, signature, items, words, value)
+            for band, key in self.lsh.band_keys(signature):
+                self._buckets.setdefault((namespace, band, key), set()).add(entry_id)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+        return {
+            **counters,
+            "size": size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hit_rate": counters["hits"] / counters["lookups"] if counters["lookups"] else 0.0,
+            "false_positive_rate": counters["false_positives"] / counters["audited"] if counters["audited"] else 0.0,
+        }
+
+
+similarity_cache = SimilarityCache(
+    threshold=settings.SIMILARITY_CACHE_THRESHOLD,
+    capacity=settings.SIMILARITY_CACHE_SIZE,
+    ttl=settings.SIMILARITY_CACHE_TTL,
+    audit_rate=settings.SIMILARITY_CACHE_AUDIT_RATE,
+)
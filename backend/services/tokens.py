@@ -0,0 +1,156 @@
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # 未安装 tokenizers 时只使用估算
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+# DeepSeek 文档给出的换算：1 个英文字符约 0.3 个 token，1 个中文字符约 0.6 个 token
+_CJK_CHARS = re.compile("[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+_SPACES = re.compile(r"\s+")
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+# 每条消息的角色、分隔符等额外开销
+MESSAGE_OVERHEAD = 4
+TRUNCATION_MARKER = "\n……（中间内容过长已省略）……\n"
+
+# 各模式的回复长度上限；translate/correct 的回复长度与输入成正比
+MODE_OUTPUT_TOKENS = {"quick": 300, "chat": 2000, "explain": 2000}
+PROPORTIONAL_MODES = {"translate": 1.5, "correct": 1.3}
+CHAT_MODES = list(MODE_OUTPUT_TOKENS) + list(PROPORTIONAL_MODES)
+
+
+class TokenEstimator:
+    """
+    本地估算 token 数：配置了 DeepSeek 的 tokenizer.json 且安装了 tokenizers 时精确计数，
+    否则按字符类型估算，并用接口返回的实际用量校准估算系数
+    """
+
+    def __init__(self, tokenizer_path: Optional[str]):
+        self._tokenizer = None
+        if tokenizer_path and Tokenizer is not None and Path(tokenizer_path).exists():
+            try:
+                self._tokenizer = Tokenizer.from_file(tokenizer_path)
+                logger.info(f"已加载本地分词器: {tokenizer_path}")
+            except Exception as e:
+                logger.error(f"加载本地分词器失败: {tokenizer_path}: {str(e)}")
+        self._lock = threading.Lock()
+        self.ratio = 1.0  # 实际 / 估算 的指数滑动平均，仅用于字符估算
+        self.counters = dict.fromkeys(["samples", "absolute_error", "length_stops", "rejected", "truncated"], 0)
+        self._completion: Dict[str, List[int]] = {}  # 各模式 [请求数, 实际回复 token 总数, max_tokens 总数]
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def _raw_count(self, text: str) -> float:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        cjk = len(_CJK_CHARS.findall(text))
+        other = len(_SPACES.sub(" ", text)) - cjk
+        return cjk * CJK_TOKENS_PER_CHAR + other * OTHER_TOKENS_PER_CHAR
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        raw = self._raw_count(text)
+        return int(raw if self.exact else raw * self.ratio + 0.5)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+    def truncate(self, text: str, budget: int) -> str:
+        """保留开头和结尾，省略中间部分，使结果不超过 budget 个 token"""
+        if self.count(text) <= budget:
+            return text
+        budget = max(budget - self.count(TRUNCATION_MARKER), 0)
+        # 二分查找能保留的最大字符数
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            head, tail = middle - middle // 3, middle // 3
+            if self.count(text[:head]) + self.count(text[len(text) - tail:] if tail else "") <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        head, tail = low - low // 3, low // 3
+        return text[:head] + TRUNCATION_MARKER + (text[len(text) - tail:] if tail else "")
+
+    def apply_input_budget(self, message: str, budget: int, overflow: str) -> Tuple[str, int, bool]:
+        """
+        检查用户输入是否超出预算，返回 (处理后的输入, token 数, 是否被截断)；
+        超出预算且策略不是 truncate 时抛出 ValueError
+        """
+        tokens = self.count(message)
+        if tokens <= budget:
+            return message, tokens, False
+        if overflow != "truncate":
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise ValueError(f"输入过长：约 {tokens} 个 token，上限为 {budget}")
+        truncated = self.truncate(message, budget)
+        with self._lock:
+            self.counters["truncated"] += 1
+        return truncated, self.count(truncated), True
+
+    def plan_max_tokens(self, mode: str, input_tokens: int, prompt_tokens: int) -> int:
+        """按模式和上下文剩余空间确定 max_tokens"""
+        if mode in PROPORTIONAL_MODES:
+            wanted = int(input_tokens * PROPORTIONAL_MODES[mode]) + 100
+        else:
+            wanted = MODE_OUTPUT_TOKENS.get(mode, MODE_OUTPUT_TOKENS["chat"])
+        remaining = settings.CHAT_CONTEXT_TOKENS - prompt_tokens - 16
+        return max(1, min(wanted, settings.CHAT_MAX_OUTPUT_TOKENS, remaining))
+
+    def record_usage(self, mode: str, estimated_prompt: int, usage: Optional[Dict[str, Any]],
+                     max_tokens: int, finish_reason: Optional[str], message_count: int = 2) -> None:
+        """记录估算值与接口返回的实际用量，更新校准系数；message_count 为请求中的消息条数"""
+        with self._lock:
+            if finish_reason == "length":
+                self.counters["length_stops"] += 1
+            if not usage or not usage.get("prompt_tokens") or estimated_prompt <= 0:
+                return
+            actual = usage["prompt_tokens"]
+            self.counters["samples"] += 1
+            self.counters["absolute_error"] += abs(actual - estimated_prompt)
+            # 每条消息的固定开销不乘校准系数，计算比例时从两边扣除
+            overhead = MESSAGE_OVERHEAD * message_count
+            if not self.exact and estimated_prompt > overhead and actual > overhead:
+                # 按未校准前的估算值计算比例
+                raw = (estimated_prompt - overhead) / self.ratio
+                self.ratio = 0.9 * self.ratio + 0.1 * ((actual - overhead) / raw)
+            stats = self._completion.setdefault(mode, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += usage.get("completion_tokens") or 0
+            stats[2] += max_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            completion = {mode: list(values) for mode, values in self._completion.items()}
+        samples = counters.pop("samples")
+        absolute_error = counters.pop("absolute_error")
+        return {
+            "exact": self.exact,
+            "ratio": round(self.ratio, 4),
+            "samples": samples,
+            "meanAbsoluteError": round(absolute_error / samples, 2) if samples else 0.0,
+            "lengthStops": counters["length_stops"],
+            "rejected": counters["rejected"],
+            "truncated": counters["truncated"],
+            "completion": {
+                mode: {"requests": n, "meanTokens": round(used / n, 1), "meanMaxTokens": round(limit / n, 1)}
+                for mode, (n, used, limit) in completion.items()
+            },
+        }
+
+
+token_estimator = TokenEstimator(settings.TOKENIZER_PATH)
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import settings
+from backend.crud import translation_memory
+from backend.services import llm
+from backend.services.tokens import token_estimator
+from backend.services.usage import usage_ledger
+
+logger = logging.getLogger(__name__)
+
+# 一个句子：到句末标点（及其后的引号、括号）为止，或到行尾为止；其后的空白作为分隔符原样保留
+_SENTENCE = re.compile(
+    r"(?P<body>[^\n]+?(?:[.!?…]+[\"'”’)\]]*(?=\s|$)|[。！？]+[」』”’）)]*|(?=\n)|$))(?P<sep>\s*)"
+)
+_LEADING_SPACE = re.compile(r"^\s*")
+_SPACES = re.compile(r"\s+")
+_LETTER = re.compile(r"[^\W\d_]")
+# 以这些缩写或 "U.S."、"p.m." 这类带点的字母缩写结尾时不算句子结束
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "no", "jr", "sr"}
+_DOTTED_ABBREVIATION = re.compile(r"\b(?:[A-Za-z]\.){2,}$")
+_FIRST_CHAR = re.compile(r"\w")
+CJK_LANGUAGES = {"chinese", "japanese", "zh", "ja", "中文", "日语"}
+
+SYSTEM_PROMPT = (
+    "你是一名专业翻译。用户会给出一个 JSON 字符串数组，每个元素是一个句子。"
+    "请把每个句子{source}翻译成{target}，只返回长度相同、顺序一一对应的 JSON 字符串数组，不要添加任何解释。"
+)
+
+
+class TranslationError(Exception):
+    """上游翻译失败"""
+
+
+class QuotaExceeded(Exception):
+    """有句子需要调用上游，但用户的 token 配额已用完"""
+
+
+def _starts_sentence(body: str) -> bool:
+    """片段的第一个字母或数字是大写字母、数字或非拉丁文字时才可能是新句子"""
+    match = _FIRST_CHAR.search(body)
+    if match is None:
+        return True
+    char = match.group(0)
+    return char.isdigit() or char.isupper() or "LATIN" not in unicodedata.name(char, "")
+
+
+def segment(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """切分为 (句子, 其后的分隔空白) 列表，返回开头的空白和句子列表；拼接后与原文完全相同"""
+    prefix = _LEADING_SPACE.match(text).group(0)
+    segments: List[Tuple[str, str]] = []
+    for match in _SENTENCE.finditer(text, len(prefix)):
+        body, separator = match.group("body"), match.group("sep")
+        if segments:
+            previous, previous_separator = segments[-1]
+            last_word = previous.rsplit(None, 1)[-1] if previous.endswith(".") else ""
+            abbreviation = (last_word.rstrip(".").lower() in _ABBREVIATIONS
+                            or (len(last_word) == 2 and last_word[0].isupper())
+                            or _DOTTED_ABBREVIATION.search(last_word))
+            # "Mr. Smith"、"J. K. Rowling"、"The U.S. is" 之类的缩写与下一句合并；
+            # 同一行中以小写拉丁字母开头的片段（"3 p.m. yesterday"）也不是新句子
+            if (previous_separator == " " and abbreviation) or \
+                    (previous_separator and "\n" not in previous_separator and not _starts_sentence(body)):
+                segments[-1] = (previous + previous_separator + body, separator)
+                continue
+        segments.append((body, separator))
+    return prefix, segments
+
+
+def normalize(sentence: str) -> str:
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", sentence)).strip()
+
+
+def segment_hash(sentence: str) -> str:
+    return hashlib.sha256(normalize(sentence).encode("utf-8")).hexdigest()
+
+
+def needs_translation(sentence: str) -> bool:
+    """只有数字、标点的片段（编号、分隔线等）原样保留"""
+    return bool(_LETTER.search(sentence))
+
+
+def chunk_segments(sentences: List[str], max_tokens: int, max_segments: int) -> List[List[str]]:
+    """按 token 数和句子数把待翻译的句子分组，超长的单句单独成组"""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in sentences:
+        tokens = token_estimator.count(sentence)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_segments):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def join_segments(prefix: str, segments: List[Tuple[str, str]], target_language: str) -> str:
+    """按原顺序拼接译文；句间的单个空格在中日文译文中去掉，换行保留"""
+    cjk = target_language.lower() in CJK_LANGUAGES
+    parts = [prefix]
+    for sentence, separator in segments:
+        parts.append(sentence)
+        parts.append("" if cjk and separator and "\n" not in separator else separator)
+    return "".join(parts)
+
+
+class Translator:
+    """
+    长文本翻译：按句切分，先查翻译记忆，只把未命中的句子分组并发发给上游，
+    新译文写回翻译记忆后按原顺序拼接
+    """
+
+    def __init__(self, chunk_tokens: int, chunk_segments: int, concurrency: int):
+        self.chunk_tokens = chunk_tokens
+        self.chunk_segments = chunk_segments
+        self.concurrency = concurrency
+
+    def _messages(self, sentences: List[str], source_language: str, target_language: str) -> List[Dict[str, str]]:
+        source = "" if source_language == "auto" else f"从{source_language}"
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT.format(source=source, target=target_language)},
+            {"role": "user", "content": json.dumps(sentences, ensure_ascii=False)},
+        ]
+
+    def _translate_chunk(self, sentences: List[str], source_language: str, target_language: str,
+                         user_id: Optional[int], retry: bool = True) -> List[str]:
+        """同步翻译一组句子（在线程池中执行）；返回数组长度不符时拆成两半重试，单句时重试一次"""
+        messages = self._messages(sentences, source_language, target_language)
+        input_tokens = sum(token_estimator.count(sentence) for sentence in sentences)
+        max_tokens = token_estimator.plan_max_tokens("translate", input_tokens, token_estimator.count_messages(messages))
+        try:
+            reply = llm.complete(messages, max_tokens, temperature=0.3, timeout=60.0, user_id=user_id, source="translate")
+        except Exception as e:
+            raise TranslationError(f"{type(e).__name__}: {e}")
+        try:
+            translations = llm.parse_json(reply["content"])
+        except ValueError:
+            translations = None
+        if isinstance(translations, list) and len(translations) == len(sentences) \
+                and all(isinstance(item, str) for item in translations):
+            return translations
+        if len(sentences) == 1:
+            # 未经校验的回复不写入翻译记忆：重试一次，仍无法解析时报错
+            if retry:
+                logger.warning("单句翻译结果无法解析，重试")
+                return self._translate_chunk(sentences, source_language, target_language, user_id, retry=False)
+            raise TranslationError("翻译结果不是有效的 JSON 字符串数组")
+        logger.warning(f"翻译结果与原文句数不一致，拆分重试 ({len(sentences)} 句)")
+        middle = len(sentences) // 2
+        return (self._translate_chunk(sentences[:middle], source_language, target_language, user_id)
+                + self._translate_chunk(sentences[middle:], source_language, target_language, user_id))
+
+    async def _translate_missing(self, sentences: List[str], source_language: str, target_language: str,
+                                 user_id: Optional[int]) -> Tuple[Dict[str, str], int, Optional[str]]:
+        """并发翻译未命中的句子，返回 ({句子: 译文}, 请求组数, 错误)；部分失败时保留成功的结果"""
+        chunks = chunk_segments(sentences, self.chunk_tokens, self.chunk_segments)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(chunk: List[str]) -> List[str]:
+            async with semaphore:
+                return await run_in_threadpool(self._translate_chunk, chunk, source_language, target_language, user_id)
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True)
+        translated: Dict[str, str] = {}
+        error = None
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                error = str(result)
+                logger.error(f"翻译请求失败 ({len(chunk)} 句): {error}")
+                continue
+            translated.update(zip(chunk, result))
+        return translated, len(chunks), error
+
+    async def translate(self, db: Session, text: str, source_language: str, target_language: str,
+                        user_id: Optional[int] = None) -> Dict[str, Any]:
+        source_language, target_language = source_language.strip().lower(), target_language.strip().lower()
+        prefix, segments = segment(text)
+
+        # 规范化后相同的句子只查询、翻译一次
+        keys = {sentence: segment_hash(sentence) for sentence, _ in segments if needs_translation(sentence)}
+        memory = await run_in_threadpool(
+            translation_memory.lookup, db, source_language, target_language, sorted(set(keys.values()))
+        )
+        missing = list({key: sentence for sentence, key in keys.items() if key not in memory}.values())
+
+        translated: Dict[str, str] = {}
+        chunks, error = 0, None
+        if missing and user_id is not None:
+            # 全部命中翻译记忆时不消耗配额
+            quota_error = usage_ledger.check_quota(user_id)
+            if quota_error:
+                raise QuotaExceeded(quota_error)
+        if missing:
+            results, chunks, error = await self._translate_missing(missing, source_language, target_language, user_id)
+            translated = {keys[sentence]: translation for sentence, translation in results.items()}
+            rows = [
+                {"source_language": source_language, "target_language": target_language,
+                 "segment_hash": keys[sentence], "source_text": normalize(sentence), "translation": translation,
+                 "model": settings.LLM_MODEL}
+                for sentence, translation in results.items()
+            ]
+            # 部分失败时也先保存成功的译文，重试时只需翻译剩下的句子
+            await run_in_threadpool(translation_memory.store, db, rows)
+        if error is not None:
+            raise TranslationError(error)
+
+        output = []
+        for sentence, separator in segments:
+            if sentence in keys:
+                key = keys[sentence]
+                sentence = memory[key] if key in memory else translated[key]
+            output.append((sentence, separator))
+        return {
+            "translation": join_segments(prefix, output, target_language),
+            "segments": len(segments),
+            "fromMemory": len(memory),
+            "translated": len(translated),
+            "chunks": chunks,
+        }
+
+translator = Translator(
+    chunk_tokens=settings.TRANSLATION_CHUNK_TOKENS,
+    chunk_segments=settings.TRANSLATION_CHUNK_SEGMENTS,
+    concurrency=settings.TRANSLATION_CONCURRENCY,
+)
@@ -0,0 +1,386 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 每分钟请求数限制的统计窗口（秒）
+RATE_WINDOW = 60.0
+# 上游满载时重新检查的间隔（秒）
+BUSY_POLL = 0.05
+# 这些状态码说明上游或其 API key 有问题，换一个上游重试；其余 4xx 是请求本身的问题
+RETRYABLE_STATUS = {401, 403, 408, 409, 429}
+
+
+class UpstreamError(Exception):
+    """没有可用上游，或所有尝试都失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Retry(Exception):
+    """可以换上游重试的失败；retry_after 为上游要求的暂停秒数"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Upstream:
+    """一个 OpenAI 兼容的上游（base_url + API key），记录并发、每分钟请求数以及延迟和错误率的滑动平均"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, models: Optional[Dict[str, str]] = None,
+                 max_concurrency: int = 16, rpm: int = 0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        # 模型名映射；为空时按请求的模型名原样转发
+        self.models = models or {}
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self._sent: Deque[float] = collections.deque()
+
+    def serves(self, model: str) -> bool:
+        return not self.models or model in self.models
+
+    def model_name(self, model: str) -> str:
+        return self.models.get(model, model)
+
+    def wait_time(self, now: float) -> float:
+        """距离可以发出下一个请求的秒数，0 表示可以立即发出"""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.in_flight >= self.max_concurrency:
+            return BUSY_POLL
+        if self.rpm:
+            while self._sent and self._sent[0] <= now - RATE_WINDOW:
+                self._sent.popleft()
+            if len(self._sent) >= self.rpm:
+                return self._sent[0] + RATE_WINDOW - now
+        return 0.0
+
+    def score(self, fallback_latency: float) -> float:
+        """预计等待时间：延迟按在途请求数放大，再按成功率折算；越小越好"""
+        latency = self.latency if self.latency is not None else fallback_latency
+        return latency * (1 + self.in_flight) / max(1 - self.error_rate, 0.05)
+
+
+class UpstreamPool:
+    """
+    多上游路由：在支持所请求模型、未暂停、未满载且未超出每分钟请求数的上游中选择预计最快的一个，
+    连接失败、5xx、限流和鉴权失败时优先换一个没试过的上游重试，都试过后退避一段时间再重试；
+    连续失败的上游暂停一段时间，限流时按 Retry-After 暂停
+    """
+
+    def __init__(self, upstreams: List[Upstream], max_attempts: int, queue_timeout: float, alpha: float,
+                 failure_threshold: int, failure_cooldown: float, explore_ratio: float, retry_backoff: float = 0.5):
+        self.upstreams = upstreams
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.queue_timeout = queue_timeout
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.failure_cooldown = failure_cooldown
+        self.explore_ratio = explore_ratio
+        self._lock = threading.Lock()
+        # 复用连接的 HTTP 客户端，避免每次请求重新建立 TCP/TLS 连接并把握手时间计入延迟
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.upstreams)
+
+    def _limits(self) -> httpx.Limits:
+        connections = sum(upstream.max_concurrency for upstream in self.upstreams) or None
+        return httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async def start(self) -> None:
+        """在事件循环中创建异步客户端（应用启动时调用）"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(limits=self._limits())
+
+    def _sync_client(self) -> httpx.Client:
+        # 同步客户端供后台任务线程使用，首次使用时创建
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self._limits())
+            return self._client
+
+    async def aclose(self) -> None:
+        """关闭两个客户端（应用关闭时调用）"""
+        client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+        with self._lock:
+            sync_client, self._client = self._client, None
+        if sync_client is not None:
+            sync_client.close()
+
+    def _acquire(self, model: str, exclude: Set[str]) -> Tuple[Optional[Upstream], Optional[float]]:
+        """
+        选择并占用一个上游；暂时都不可用时返回 (None, 需要等待的秒数)，
+        没有能处理该模型的上游时返回 (None, None)
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [upstream for upstream in self.upstreams
+                          if upstream.serves(model) and upstream.name not in exclude]
+            if not candidates:
+                return None, None
+            waits = {upstream.name: upstream.wait_time(now) for upstream in candidates}
+            ready = [upstream for upstream in candidates if waits[upstream.name] == 0]
+            if not ready:
+                return None, min(waits.values())
+            if len(ready) > 1 and random.random() < self.explore_ratio:
+                chosen = random.choice(ready)
+            else:
+                # 还没有延迟数据的上游按当前最快的算，保证新上游能被尝试
+                known = [upstream.latency for upstream in ready if upstream.latency is not None]
+                fallback = min(known) if known else 0.0
+                chosen = min(ready, key=lambda upstream: (upstream.score(fallback), upstream.in_flight,
+                                                          random.random()))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            if chosen.rpm:
+                chosen._sent.append(now)
+            return chosen, 0.0
+
+    def _next(self, model: str, tried: Set[str], retry_at: float) -> Tuple[Optional[Upstream], Optional[float]]:
+        """
+        为下一次尝试选择上游：优先选择还没试过的；所有上游都试过后，到 retry_at（退避结束）时再从全部上游中选择。
+        返回值同 _acquire
+        """
+        upstream, wait = self._acquire(model, tried)
+        if upstream is not None or wait is not None or not tried:
+            return upstream, wait
+        delay = retry_at - time.monotonic()
+        if delay > 0:
+            return None, delay
+        return self._acquire(model, set())
+
+    def _backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的退避结束时间，加随机抖动"""
+        return time.monotonic() + self.retry_backoff * 2 ** attempt * random.uniform(0.8, 1.2)
+
+    def _release(self, upstream: Upstream, ok: Optional[bool], latency: Optional[float] = None,
+                 retry_after: Optional[float] = None) -> None:
+        """释放占用的上游；ok 为 None（请求被取消或意外中断）时只释放，不计入统计"""
+        with self._lock:
+            upstream.in_flight -= 1
+            if ok is None:
+                return
+            upstream.error_rate += self.alpha * ((0.0 if ok else 1.0) - upstream.error_rate)
+            if latency is not None:
+                upstream.latency = latency if upstream.latency is None else \
+                    upstream.latency + self.alpha * (latency - upstream.latency)
+            if ok:
+                upstream.failures = 0
+                return
+            upstream.errors += 1
+            upstream.failures += 1
+            cooldown = retry_after
+            if cooldown is None and upstream.failures >= self.failure_threshold:
+                cooldown = self.failure_cooldown * 2 ** min(upstream.failures - self.failure_threshold, 4)
+            if cooldown:
+                upstream.cooldown_until = max(upstream.cooldown_until, time.monotonic() + cooldown)
+                logger.warning(f"上游 {upstream.name} 暂停 {cooldown:.0f}s (连续失败 {upstream.failures} 次)")
+
+    def _request(self, upstream: Upstream, model: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "url": f"{upstream.base_url}/chat/completions",
+            "json": {**payload, "model": upstream.model_name(model)},
+            "headers": {"Authorization": f"Bearer {upstream.api_key}", "Content-Type": "application/json"},
+        }
+
+    def _handle(self, upstream: Upstream, response: httpx.Response) -> Dict[str, Any]:
+        """处理上游响应：成功时返回 JSON；可以换上游重试时抛出 _Retry，请求本身有误时抛出 UpstreamError"""
+        status = response.status_code
+        if status == 200:
+            try:
+                data = response.json()
+                data["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                raise _Retry(f"{upstream.name}: 响应格式错误")
+            return data
+        message = f"{upstream.name}: {status} {response.text[:200]}"
+        if status >= 500 or status in RETRYABLE_STATUS:
+            retry_after = None
+            if status == 429:
+                try:
+                    retry_after = float(response.headers.get("retry-after", "1"))
+                except ValueError:
+                    retry_after = 1.0
+            raise _Retry(message, retry_after)
+        raise UpstreamError(message, status)
+
+    def _give_up(self, model: str, last_error: Optional[str]) -> UpstreamError:
+        if last_error is not None:
+            return UpstreamError(f"所有上游均调用失败: {last_error}", 502)
+        if not any(upstream.serves(model) for upstream in self.upstreams):
+            return UpstreamError(f"没有配置可以处理模型 {model} 的上游", 503)
+        return UpstreamError("所有上游都已满载或被限流", 503)
+
+    async def acomplete(self, payload: Dict[str, Any], model: Optional[str] = None,
+                        timeout: float = 30.0) -> Dict[str, Any]:
+        """调用 chat/completions，返回响应 JSON；payload 中不需要 model"""
+        model = model or settings.LLM_MODEL
+        if self._async_client is None:
+            await self.start()
+        client = self._async_client
+        deadline = time.monotonic() + self.queue_timeout
+        tried: Set[str] = set()
+        last_error = None
+        retry_at = 0.0
+        for attempt in range(self.max_attempts):
+            upstream, wait = self._next(model, tried, retry_at)
+            while upstream is None and wait is not None and time.monotonic() + wait <= deadline:
+                await asyncio.sleep(wait)
+                upstream, wait = self._next(model, tried, retry_at)
+            if upstream is None:
+                break
+            tried.add(upstream.name)
+            started = time.monotonic()
+            # 每个占用的上游在 finally 中恰好释放一次，取消或意外异常时也不会一直占着并发名额
+            release: Dict[str, Any] = {"ok": None}
+            try:
+                response = await client.post(**self._request(upstream, model, payload), timeout=timeout)
+                data = self._handle(upstream, response)
+                release = {"ok": True, "latency": time.monotonic() - started}
+                return data
+            except httpx.HTTPError as e:
+                release = {"ok": False}
+                last_error = f"{upstream.name}: {type(e).__name__}: {e}"
+            except _Retry as e:
+                release = {"ok": False, "retry_after": e.retry_after}
+                last_error = str(e)
+            except UpstreamError:
+                # 请求参数错误不计入上游的错误率，也不重试
+                release = {"ok": True}
+                raise
+            finally:
+                self._release(upstream, **release)
+            retry_at = self._backoff(attempt)
+            logger.warning(f"上游请求失败，重试: {last_error}")
+        raise self._give_up(model, last_error)
+
+    def complete(self, payload: Dict[str, Any], model: Optional[str] = None, timeout: float = 120.0) -> Dict[str, Any]:
+        """acomplete 的同步版本，供后台任务在线程池中使用"""
+        model = model or settings.LLM_MODEL
+        client = self._sync_client()
+        deadline = time.monotonic() + self.queue_timeout
+        tried: Set[str] = set()
+        last_error = None
+        retry_at = 0.0
+        for attempt in range(self.max_attempts):
+            upstream, wait = self._next(model, tried, retry_at)
+            while upstream is None and wait is not None and time.monotonic() + wait <= deadline:
+                time.sleep(wait)
+                upstream, wait = self._next(model, tried, retry_at)
+            if upstream is None:
+                break
+            tried.add(upstream.name)
+            started = time.monotonic()
+            release: Dict[str, Any] = {"ok": None}
+            try:
+                response = client.post(**self._request(upstream, model, payload), timeout=timeout)
+                data = self._handle(upstream, response)
+                release = {"ok": True, "latency": time.monotonic() - started}
+                return data
+            except httpx.HTTPError as e:
+                release = {"ok": False}
+                last_error = f"{upstream.name}: {type(e).__name__}: {e}"
+            except _Retry as e:
+                release = {"ok": False, "retry_after": e.retry_after}
+                last_error = str(e)
+            except UpstreamError:
+                release = {"ok": True}
+                raise
+            finally:
+                self._release(upstream, **release)
+            retry_at = self._backoff(attempt)
+            logger.warning(f"上游请求失败，重试: {last_error}")
+        raise self._give_up(model, last_error)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            upstreams = []
+            for upstream in self.upstreams:
+                upstream.wait_time(now)
+                upstreams.append({
+                    "name": upstream.name,
+                    "baseUrl": upstream.base_url,
+                    "apiKeyPrefix": upstream.api_key[:4] + "..." if upstream.api_key else None,
+                    "models": upstream.models or "*",
+                    "inFlight": upstream.in_flight,
+                    "maxConcurrency": upstream.max_concurrency,
+                    "rpm": upstream.rpm or None,
+                    "lastMinuteRequests": len(upstream._sent) if upstream.rpm else None,
+                    "latencyMs": round(upstream.latency * 1000, 1) if upstream.latency is not None else None,
+                    "errorRate": round(upstream.error_rate, 4),
+                    "consecutiveFailures": upstream.failures,
+                    "cooldownSeconds": round(max(upstream.cooldown_until - now, 0.0), 1),
+                    "requests": upstream.requests,
+                    "errors": upstream.errors,
+                })
+        return {"model": settings.LLM_MODEL, "upstreams": upstreams}
+
+
+def load_upstreams(raw: str) -> List[Upstream]:
+    """解析 LLM_UPSTREAMS；为空时使用 DEEPSEEK_API_KEY / DEEPSEEK_API_BASE 作为唯一上游"""
+    if not raw.strip():
+        if not settings.DEEPSEEK_API_KEY:
+            return []
+        return [Upstream("deepseek", f"{settings.DEEPSEEK_API_BASE}/v1", settings.DEEPSEEK_API_KEY,
+                         max_concurrency=settings.LLM_DEFAULT_CONCURRENCY)]
+    try:
+        entries = json.loads(raw)
+        upstreams = []
+        for index, entry in enumerate(entries):
+            api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+            upstreams.append(Upstream(
+                name=entry.get("name") or f"upstream-{index}",
+                base_url=entry["base_url"],
+                api_key=api_key,
+                models=entry.get("models"),
+                max_concurrency=int(entry.get("max_concurrency", settings.LLM_DEFAULT_CONCURRENCY)),
+                rpm=int(entry.get("rpm", 0)),
+            ))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"LLM_UPSTREAMS 配置无效: {e}")
+    names = [upstream.name for upstream in upstreams]
+    if len(set(names)) != len(names):
+        raise ValueError("LLM_UPSTREAMS 中的 name 不能重复")
+    return upstreams
+
+
+llm_upstreams = UpstreamPool(
+    load_upstreams(settings.LLM_UPSTREAMS),
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    alpha=settings.LLM_LATENCY_ALPHA,
+    failure_threshold=settings.LLM_FAILURE_THRESHOLD,
+    failure_cooldown=settings.LLM_FAILURE_COOLDOWN,
+    explore_ratio=settings.LLM_EXPLORE_RATIO,
+    retry_backoff=settings.LLM_RETRY_BACKOFF,
+)
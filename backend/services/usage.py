@@ -0,0 +1,180 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from backend.core.background import PeriodicTask
+from backend.core.config import settings
+from backend.crud import usage as crud_usage
+from backend.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLedger:
+    """
+    token 用量记账：
+    - 每次调用的用量先追加到内存，定期批量写入 token_usage
+    - 按用户维护当日/当月累计，配额检查只读内存，不访问数据库
+    - 未登录的调用按 IP 维护当日累计，只在本进程内统计
+    - 定期用数据库汇总校准累计值（包括其他进程写入的用量）
+    """
+
+    def __init__(self, session_factory: Callable, daily_quota: int, monthly_quota: int,
+                 reconcile_interval: float, tz: str = "UTC", anonymous_daily_quota: int = 0):
+        self.session_factory = session_factory
+        self.daily_quota = daily_quota
+        self.monthly_quota = monthly_quota
+        self.anonymous_daily_quota = anonymous_daily_quota
+        self.reconcile_interval = reconcile_interval
+        self.tz = ZoneInfo(tz)
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        # 用户 -> [日期, 当日用量, 月份, 当月用量]
+        self._totals: Dict[int, List[Any]] = {}
+        # IP -> [日期, 当日用量]
+        self._anonymous: Dict[str, List[Any]] = {}
+        self._last_reconcile = 0.0
+
+    def _periods(self, at: Optional[datetime] = None) -> Tuple[date, date]:
+        day = (at or datetime.now(timezone.utc)).astimezone(self.tz).date()
+        return day, day.replace(day=1)
+
+    def _add(self, user_id: int, tokens: int, day: date, month: date) -> None:
+        totals = self._totals.get(user_id)
+        if totals is None or totals[2] != month:
+            totals = self._totals[user_id] = [day, 0, month, 0]
+        elif totals[0] != day:
+            totals[0], totals[1] = day, 0
+        totals[1] += tokens
+        totals[3] += tokens
+
+    def record(self, user_id: Optional[int], source: str, model: str, usage: Optional[Dict[str, Any]],
+               client: Optional[str] = None) -> None:
+        """记录一次调用的用量，usage 为接口返回的 usage 字段；未登录的调用按 client（IP）累计"""
+        if not usage:
+            return
+        created_at = datetime.now(timezone.utc)
+        row = {
+            "user_id": user_id,
+            "source": source,
+            "model": model,
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+            # DeepSeek 返回 prompt_cache_hit_tokens，OpenAI 兼容格式为 prompt_tokens_details.cached_tokens
+            "cached_tokens": usage.get("prompt_cache_hit_tokens")
+                             or (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+            "created_at": created_at,
+        }
+        day, month = self._periods(created_at)
+        with self._lock:
+            self._pending.append(row)
+            if user_id is not None:
+                self._add(user_id, row["prompt_tokens"] + row["completion_tokens"], day, month)
+            elif client:
+                totals = self._anonymous.get(client)
+                if totals is None or totals[0] != day:
+                    totals = self._anonymous[client] = [day, 0]
+                totals[1] += row["prompt_tokens"] + row["completion_tokens"]
+
+    def usage_for(self, user_id: int) -> Tuple[int, int]:
+        """某用户当日、当月的 token 用量（内存中的值）"""
+        day, month = self._periods()
+        with self._lock:
+            totals = self._totals.get(user_id)
+        if totals is None or totals[2] != month:
+            return 0, 0
+        return (totals[1] if totals[0] == day else 0), totals[3]
+
+    def check_quota(self, user_id: int) -> Optional[str]:
+        """超出配额时返回原因，未超出返回 None；配额为 0 表示不限制"""
+        daily, monthly = self.usage_for(user_id)
+        if self.daily_quota and daily >= self.daily_quota:
+            return f"今日 token 用量已达上限 ({daily}/{self.daily_quota})"
+        if self.monthly_quota and monthly >= self.monthly_quota:
+            return f"本月 token 用量已达上限 ({monthly}/{self.monthly_quota})"
+        return None
+
+    def check_anonymous_quota(self, client: Optional[str]) -> Optional[str]:
+        """未登录调用的配额检查，超出时返回原因；配额为 0 时不允许未登录调用"""
+        if not self.anonymous_daily_quota:
+            return "请登录后使用"
+        day, _ = self._periods()
+        with self._lock:
+            totals = self._anonymous.get(client or "")
+        used = totals[1] if totals is not None and totals[0] == day else 0
+        if used >= self.anonymous_daily_quota:
+            return f"未登录用户今日 token 用量已达上限 ({used}/{self.anonymous_daily_quota})，请登录后继续使用"
+        return None
+
+    def flush(self) -> int:
+        """将用量流水写入数据库，返回写入条数"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        db = self.session_factory()
+        try:
+            crud_usage.insert_usage(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 写入失败时放回缓冲，等待下次重试
+            with self._lock:
+                self._pending[:0] = rows
+            raise
+        finally:
+            db.close()
+        logger.info(f"token 用量已写入: {len(rows)} 条")
+        return len(rows)
+
+    def reconcile(self) -> None:
+        """用数据库汇总加上本进程尚未写入的用量覆盖内存累计值"""
+        day, month = self._periods()
+        day_start = datetime.combine(day, datetime.min.time(), self.tz)
+        month_start = datetime.combine(month, datetime.min.time(), self.tz)
+        db = self.session_factory()
+        try:
+            totals = crud_usage.totals_since(db, day_start, month_start)
+        finally:
+            db.close()
+        with self._lock:
+            self._totals = {user_id: [day, daily, month, monthly] for user_id, (daily, monthly) in totals.items()}
+            self._anonymous = {client: value for client, value in self._anonymous.items() if value[0] == day}
+            for row in self._pending:
+                if row["user_id"] is not None:
+                    row_day, row_month = self._periods(row["created_at"])
+                    if row_month == month:
+                        self._add(row["user_id"], row["prompt_tokens"] + row["completion_tokens"], row_day, row_month)
+        self._last_reconcile = time.monotonic()
+
+    def tick(self) -> None:
+        """后台任务：写入流水，并按间隔校准累计值"""
+        self.flush()
+        if time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+            self.reconcile()
+
+
+usage_ledger = UsageLedger(
+    SessionLocal,
+    daily_quota=settings.USAGE_DAILY_TOKEN_QUOTA,
+    monthly_quota=settings.USAGE_MONTHLY_TOKEN_QUOTA,
+    reconcile_interval=settings.USAGE_RECONCILE_INTERVAL,
+    tz=settings.STATS_TIMEZONE,
+    anonymous_daily_quota=settings.USAGE_ANONYMOUS_DAILY_TOKEN_QUOTA,
+)
+usage_flusher = PeriodicTask("usage-flush", usage_ledger.tick, settings.USAGE_FLUSH_INTERVAL)
+
+
+def _flush_at_exit() -> None:
+    # 兜底：进程退出前未经过 shutdown 事件时也尽量写入
+    try:
+        usage_ledger.flush()
+    except Exception as e:
+        logger.error(f"退出时写入 token 用量失败: {str(e)}")
+
+
+atexit.register(_flush_at_exit)